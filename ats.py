@@ -0,0 +1,185 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+# Common English and job-posting filler words that never count as keywords
+STOP_WORDS = frozenset("""
+a about above across after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each etc few for from further had has have having he
+her here hers him his how i if in into is it its itself just may me might more most must my no nor not now of off
+on once only or other our ours out over own per same she should so some such than that the their theirs them then
+there these they this those through to too under until up upon us very via was we were what when where which while
+who whom why will with within without would you your yours
+ability able candidate candidates company experience hire hiring including job join know looking position preferred required seeking
+requirements responsibilities role strong team work working years year plus well new using use
+""".split())
+
+# Sentences and lines of a job description, the "documents" its IDF is computed over
+_SEGMENT_PATTERN = re.compile(r"(?<=[.!?;])\s+|\n+")
+
+# Words keep technical punctuation so C++, C#, Node.js and CI/CD survive
+_WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+
+
+def tokenize(text):
+    """Lowercase `text` and split it into words, dropping stop words and bare numbers."""
+    words = _WORD_PATTERN.findall(text.lower())
+    return [word for word in words if word not in STOP_WORDS and not word.isdigit()]
+
+
+def terms(text):
+    """Return the unigrams and adjacent-word bigrams of `text`."""
+    words = tokenize(text)
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def extract_keywords(job_description, top_n=30):
+    """
+    Pick the job description's most frequent terms as its keywords.
+
+    Bigrams that occur more than once are preferred over their single words,
+    so "machine learning" is kept as a phrase.
+    """
+    counts = Counter(terms(job_description))
+    bigrams = {term for term, count in counts.items() if ' ' in term and count > 1}
+    covered = {word for bigram in bigrams for word in bigram.split()}
+    candidates = [
+        (term, count) for term, count in counts.items()
+        if (' ' in term and term in bigrams) or (' ' not in term and (term not in covered or count > 2))
+    ]
+    candidates.sort(key=lambda item: (-item[1], item[0]))
+    return [term for term, _ in candidates[:top_n]]
+
+
+class ATSScorer:
+    """
+    Scores documents against one job description without calling an LLM.
+
+    Each document gets its keyword coverage (share of the job description's
+    keywords it contains) and the TF-IDF cosine similarity of its terms to the
+    job description's. All documents passed to `score` are vectorized
+    together as one sparse matrix, so thousands are scored in one pass.
+    IDF comes from the job description's own sentences, so a document's
+    score does not depend on the other documents scored with it.
+    """
+
+    def __init__(self, job_description, top_n=30):
+        self.job_description = job_description
+        self.keywords = extract_keywords(job_description, top_n)
+        self._job_terms = Counter(terms(job_description))
+
+        # Smoothed IDF over the job description's sentences; terms it never uses get the highest weight
+        segments = [set(terms(segment)) for segment in _SEGMENT_PATTERN.split(job_description)]
+        segments = [segment for segment in segments if segment]
+        document_frequency = np.array([sum(term in segment for segment in segments) for term in self._job_terms], dtype=float)
+        self._job_idf = np.log((1 + len(segments)) / (1 + document_frequency)) + 1
+        self._unseen_idf = np.log(1 + len(segments)) + 1
+
+    def score(self, documents):
+        """
+        Score each document and return a list of dicts with `score` (0-100),
+        `coverage`, `similarity`, `matched` and `missing` keywords.
+        """
+        if not documents:
+            return []
+
+        # Map every term to a column; the job description's terms come first
+        vocabulary = {term: index for index, term in enumerate(self._job_terms)}
+        rows, cols = [], []
+        for row, document in enumerate(documents):
+            for term in terms(document):
+                column = vocabulary.setdefault(term, len(vocabulary))
+                rows.append(row)
+                cols.append(column)
+
+        size = len(vocabulary)
+        count = len(documents)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+
+        # Collapse repeated (row, term) pairs into counts: a sparse COO matrix
+        pairs, counts = np.unique(rows * size + cols, return_counts=True)
+        rows, cols = pairs // size, pairs % size
+
+        # IDF is fixed by the job description, whatever else is in this call
+        job_columns = np.arange(len(self._job_terms))
+        idf = np.full(size, self._unseen_idf)
+        idf[job_columns] = self._job_idf
+
+        # Sublinear TF-IDF weights for documents and the job description
+        weights = (1 + np.log(counts)) * idf[cols]
+        job_vector = np.zeros(size)
+        job_counts = np.fromiter(self._job_terms.values(), dtype=float, count=len(self._job_terms))
+        job_vector[job_columns] = (1 + np.log(job_counts)) * idf[job_columns]
+
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=count))
+        dots = np.bincount(rows, weights=weights * job_vector[cols], minlength=count)
+        job_norm = np.linalg.norm(job_vector)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarity = np.where(norms > 0, dots / (norms * job_norm), 0.0) if job_norm else np.zeros(count)
+
+        # Keyword coverage: how many distinct keywords each document contains
+        keyword_columns = np.array([vocabulary[keyword] for keyword in self.keywords], dtype=np.int64)
+        is_keyword = np.zeros(size, dtype=bool)
+        is_keyword[keyword_columns] = True
+        matched_counts = np.bincount(rows, weights=is_keyword[cols], minlength=count)
+        coverage = matched_counts / len(self.keywords) if self.keywords else np.zeros(count)
+
+        scores = np.rint(100 * (0.6 * coverage + 0.4 * similarity)).astype(int)
+
+        # Matched keyword lists, from the sparse entries that hit a keyword column
+        keyword_names = {vocabulary[keyword]: keyword for keyword in self.keywords}
+        matched = [set() for _ in range(count)]
+        hits = is_keyword[cols]
+        for row, column in zip(rows[hits].tolist(), cols[hits].tolist()):
+            matched[row].add(keyword_names[column])
+
+        return [
+            {
+                'score': int(scores[row]),
+                'coverage': float(coverage[row]),
+                'similarity': float(similarity[row]),
+                'matched': [keyword for keyword in self.keywords if keyword in matched[row]],
+                'missing': [keyword for keyword in self.keywords if keyword not in matched[row]],
+            }
+            for row in range(count)
+        ]
+
+
+def local_report(documents, names=None):
+    """
+    Build a markdown ATS report for a candidate without calling an LLM.
+
+    `documents` follow the CLI's file order: the last one is the job
+    description and the others (resume, cover letter) are the candidate's.
+    """
+    if len(documents) < 2:
+        raise Exception("Local analysis needs at least one candidate document and a job description (last file).")
+    names = names or [f"Document {index + 1}" for index in range(len(documents))]
+    candidate_documents = documents[:-1]
+    scorer = ATSScorer(documents[-1])
+    overall, *per_document = scorer.score(['\n'.join(candidate_documents)] + list(candidate_documents))
+    return format_report(overall, len(scorer.keywords), zip(names, per_document))
+
+
+def format_report(overall, keyword_count, per_document=()):
+    """Render a candidate's overall score (and optional per-document scores) as markdown."""
+    lines = [
+        "**Local ATS Analysis**",
+        "",
+        f"Estimated ATS match: {overall['score']}%",
+        f"- Keyword coverage: {overall['coverage']:.0%} ({len(overall['matched'])} of {keyword_count} job keywords)",
+        f"- Similarity to the job description: {overall['similarity']:.2f}",
+    ]
+    per_document = list(per_document)
+    if per_document:
+        lines.append("")
+    for name, result in per_document:
+        lines.append(f"- {name}: {result['score']}% (coverage {result['coverage']:.0%}, similarity {result['similarity']:.2f})")
+    lines += [
+        "",
+        f"**Matched keywords**: {', '.join(overall['matched']) or 'none'}",
+        f"**Missing keywords**: {', '.join(overall['missing']) or 'none'}",
+    ]
+    return '\n'.join(lines)
@@ -0,0 +1,314 @@
+import csv
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, wait, ALL_COMPLETED, FIRST_COMPLETED
+
+import click
+
+from utils import get_api_key, read_documents, process_content, configure_clients, configure_input_limits, coalesce_stats
+from cache import open_cache
+from ledger import open_ledger
+from scheduler import configure_scheduler
+
+# Manifest columns holding input file paths, in the order they are sent to the model
+DOCUMENT_COLUMNS = ['resume', 'cover_letter', 'job_description']
+
+# Rows read and prescreened together in one vectorized pass
+PRESCREEN_CHUNK = 512
+
+# ATS scorers of recently seen job descriptions, so each one is only analyzed once
+_scorers = {}
+
+
+def _json_rows(file):
+    # A malformed line becomes one invalid row instead of ending the whole manifest
+    for line in file:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield e
+
+
+def read_manifest(manifest_path):
+    """
+    Yield manifest rows one at a time from a .csv or .jsonl file.
+
+    Each row needs an `id` (defaults to its line number) and the `resume`,
+    `cover_letter` and `job_description` file paths. Relative paths are
+    resolved against the manifest's directory. An invalid row is yielded
+    with an `error` instead of `files`, so it is recorded as failed without
+    stopping the rows around it.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    ext = os.path.splitext(manifest_path)[1].lower()
+
+    with open(manifest_path, 'r', encoding='utf-8', newline='') as file:
+        if ext == '.csv':
+            rows = csv.DictReader(file)
+        elif ext in ('.jsonl', '.ndjson'):
+            rows = _json_rows(file)
+        else:
+            raise Exception(f"Unsupported manifest format: {ext}. Supported formats are: .csv, .jsonl")
+
+        for line_number, row in enumerate(rows, start=1):
+            if isinstance(row, json.JSONDecodeError):
+                yield {'id': str(line_number), 'error': f"Manifest row {line_number} is not valid JSON: {row}"}
+                continue
+            if not isinstance(row, dict):
+                yield {'id': str(line_number), 'error': f"Manifest row {line_number} is not a JSON object"}
+                continue
+            row_id = str(row.get('id') or line_number)
+            missing = [column for column in DOCUMENT_COLUMNS if not row.get(column)]
+            if missing:
+                yield {'id': row_id, 'error': f"Manifest row {line_number} is missing: {', '.join(missing)}"}
+                continue
+            files = [os.path.join(base_dir, row[column]) for column in DOCUMENT_COLUMNS]
+            yield {'id': row_id, 'files': files}
+
+
+def load_completed_ids(results_path):
+    """
+    Return the ids already scored successfully in a results file.
+
+    A partially written last line (from a crash mid-write) is ignored so
+    that row is simply processed again.
+    """
+    completed = set()
+    if not os.path.exists(results_path):
+        return completed
+    with open(results_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('status') in ('ok', 'screened_out'):
+                completed.add(record['id'])
+    return completed
+
+
+def score_row(row, api_key, model, provider, analysis_mode, cache=None, text_cache=None, max_prompt_tokens=None, documents=None, ats=None, job_profile=False, profile_cache=None):
+    """Score one manifest row and return its results record."""
+    record = {'id': row['id'], 'model': model, 'provider': provider, 'analysis_mode': analysis_mode}
+    if ats is not None:
+        record['ats'] = ats
+    try:
+        content = documents or read_documents(row['files'], cache=text_cache)
+        if job_profile:
+            # Every row sharing a job description reuses one requirements profile
+            from job_profile import profile_documents
+            content, profile_info = profile_documents(content, api_key, model, provider, cache=profile_cache)
+            record['job_profile'] = {'profiled': profile_info['profiled'], 'cached': profile_info['cached']}
+        analysis, token_info = process_content(content, api_key, model, analysis_mode, True, provider, cache=cache, max_prompt_tokens=max_prompt_tokens)
+        record.update(status='ok', analysis=analysis, token_usage=token_info)
+    except Exception as e:
+        record.update(status='failed', error=str(e))
+    return record
+
+
+def prescreen_rows(rows, text_cache=None):
+    """
+    Score a chunk of rows locally, one vectorized pass per job description.
+
+    Yields (row, documents, ats result, error) in the order the rows were given.
+    """
+    from ats import ATSScorer
+
+    loaded = []
+    groups = {}
+    for row in rows:
+        try:
+            documents = read_documents(row['files'], cache=text_cache)
+        except Exception as e:
+            loaded.append((row, None, str(e)))
+            continue
+        loaded.append((row, documents, None))
+        groups.setdefault(documents[-1], []).append(len(loaded) - 1)
+
+    results = {}
+    for job_description, positions in groups.items():
+        scorer = _scorers.get(job_description)
+        if scorer is None:
+            scorer = _scorers[job_description] = ATSScorer(job_description)
+            if len(_scorers) > 64:
+                _scorers.pop(next(iter(_scorers)))
+        scores = scorer.score(['\n'.join(loaded[position][1][:-1]) for position in positions])
+        for position, result in zip(positions, scores):
+            result['keyword_count'] = len(scorer.keywords)
+            results[position] = result
+
+    for position, (row, documents, error) in enumerate(loaded):
+        yield row, documents, results.get(position), error
+
+
+def run_batch(manifest_path, results_path, model, provider, analysis_mode, workers, on_record=None, cache=None, text_cache=None, max_prompt_tokens=None, prescreen_threshold=None, job_profile=False, profile_cache=None):
+    """
+    Score every manifest row not already in the results file.
+
+    Rows are pulled from the manifest lazily and at most `workers * 2` are in
+    flight at once, so memory stays bounded however long the manifest is.
+    Each finished record is appended and flushed to the results file right
+    away. With `prescreen_threshold`, rows whose local ATS score is below it
+    are recorded as `screened_out` without calling the model; the `local`
+    analysis mode records the local score for every row instead. With
+    `job_profile`, each job description is condensed into a requirements
+    profile once and rows are compared against that.
+    Returns a dict of ok/failed/screened_out/skipped counts.
+    """
+    local = analysis_mode == 'local'
+    api_key = None if local else get_api_key(provider)
+    completed = load_completed_ids(results_path)
+    counts = {'ok': 0, 'failed': 0, 'screened_out': 0, 'skipped': 0}
+    max_in_flight = workers * 2
+
+    with open(results_path, 'a', encoding='utf-8') as results, ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+
+        def emit(record):
+            results.write(json.dumps(record) + '\n')
+            results.flush()
+            counts[record['status']] += 1
+            if on_record:
+                on_record(record)
+
+        def drain(return_when):
+            nonlocal pending
+            done, pending = wait(pending, return_when=return_when)
+            for future in done:
+                emit(future.result())
+
+        def submit(row, documents=None, ats=None):
+            if len(pending) >= max_in_flight:
+                drain(FIRST_COMPLETED)
+            pending.add(executor.submit(score_row, row, api_key, model, provider, analysis_mode, cache, text_cache, max_prompt_tokens, documents, ats, job_profile, profile_cache))
+
+        def remaining_rows():
+            for row in read_manifest(manifest_path):
+                if row['id'] in completed:
+                    counts['skipped'] += 1
+                elif 'error' in row:
+                    emit({'id': row['id'], 'model': model, 'provider': provider, 'analysis_mode': analysis_mode, 'status': 'failed', 'error': row['error']})
+                else:
+                    yield row
+
+        try:
+            if not local and prescreen_threshold is None:
+                for row in remaining_rows():
+                    submit(row)
+            else:
+                from ats import format_report
+                rows = remaining_rows()
+                while True:
+                    chunk = list(itertools.islice(rows, PRESCREEN_CHUNK))
+                    if not chunk:
+                        break
+                    for row, documents, ats, error in prescreen_rows(chunk, text_cache):
+                        record = {'id': row['id'], 'model': model, 'provider': provider, 'analysis_mode': analysis_mode}
+                        if error:
+                            emit(dict(record, status='failed', error=error))
+                        elif local:
+                            emit(dict(record, status='ok', ats=ats, analysis=format_report(ats, ats['keyword_count'])))
+                        elif ats['score'] < prescreen_threshold:
+                            emit(dict(record, status='screened_out', ats=ats))
+                        else:
+                            submit(row, documents, ats)
+        finally:
+            # Record the rows already in flight even when reading the manifest stops early
+            # (e.g. Ctrl+C), so a re-run does not pay for them again
+            if pending:
+                drain(ALL_COMPLETED)
+
+    return counts
+
+
+@click.command()
+@click.option('--model', '-m', default=None, help='Model used to score every row.')
+@click.option('--provider', '-p', default=None, type=click.Choice(['groq', 'openrouter']), help='Provider serving the model.')
+@click.option('--analysis_mode', '-a', type=click.Choice(['basic', 'detailed', 'local'], case_sensitive=False), default='basic', help='Choose between basic or detailed analysis, or local keyword scoring only.')
+@click.option('--prescreen-threshold', type=click.IntRange(0, 100), default=None, help='Skip the model for rows whose local ATS score (0-100) is below this.')
+@click.option('--results', '-r', 'results_path', default='batch_results.jsonl', help='JSONL file results are appended to; re-running resumes from it.')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=4, help='Number of rows scored at the same time.')
+@click.option('--requests-per-minute', type=click.IntRange(min=1), default=None, help="Cap on the provider's requests per minute.")
+@click.option('--tokens-per-minute', type=click.IntRange(min=1), default=None, help="Cap on the provider's tokens per minute.")
+@click.option('--max-prompt-tokens', type=click.IntRange(min=1), default=None, help="Trim the longest documents so each prompt fits this many tokens.")
+@click.option('--job-profile', is_flag=True, help='Condense each job description into a cached requirements profile once and compare candidates against it.')
+@click.option('--no-cache', is_flag=True, help='Always call the provider instead of reusing cached responses.')
+@click.option('--cache-dir', default=None, type=click.Path(file_okay=False), help='Directory for cached responses (default: ~/.cache/tailor4job).')
+@click.option('--report', 'report_path', default=None, type=click.Path(dir_okay=False), help='Also render every successful analysis into this .zip (one file per candidate) or combined .pdf/.docx.')
+@click.option('--report-format', type=click.Choice(['pdf', 'docx']), default='pdf', show_default=True, help='Format of the per-candidate files in a --report .zip.')
+@click.option('--offline', is_flag=True, help="Submit every prompt through the provider's batch API (cheaper, finishes within 24h) instead of calling it row by row.")
+@click.option('--poll-interval', type=click.FloatRange(min=0), default=30.0, show_default=True, help='Seconds between batch status checks with --offline.')
+@click.option('--no-wait', is_flag=True, help='With --offline, submit (or check on) the batches and exit; run again to collect the results.')
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+def batch(model, provider, analysis_mode, prescreen_threshold, results_path, workers, requests_per_minute, tokens_per_minute, max_prompt_tokens, job_profile, no_cache, cache_dir, report_path, report_format, offline, poll_interval, no_wait, manifest):
+    """Score every resume/cover letter/job description row of MANIFEST (.csv or .jsonl)."""
+    def report(record):
+        if record['status'] == 'failed':
+            click.echo(f"Row {record['id']} failed: {record['error']}", err=True)
+
+    if analysis_mode != 'local' and not (model and provider):
+        click.echo('Error: --model and --provider are required unless --analysis_mode is local.', err=True)
+        sys.exit(1)
+    if offline and (analysis_mode == 'local' or prescreen_threshold is not None or job_profile):
+        click.echo('Error: --offline cannot be combined with --analysis_mode local, --prescreen-threshold or --job-profile.', err=True)
+        sys.exit(1)
+    if no_wait and not offline:
+        click.echo('Error: --no-wait only applies to --offline runs.', err=True)
+        sys.exit(1)
+
+    def batch_status(batch):
+        requests = batch.get('request_counts') or {}
+        click.echo(f"Batch {batch['id']}: {batch['status']} ({requests.get('completed', 0)} of {requests.get('total', '?')} done)", err=True)
+
+    from main import load_config
+
+    config = load_config()
+    cache_dir = cache_dir or config.get('cache_dir')
+
+    # Record every provider call in the usage ledger unless the config turns it off
+    ledger = open_ledger(cache_dir).attach() if config.get('ledger', True) else None
+    try:
+        configure_input_limits(**config.get('input_limits', {}))
+        configure_clients(pool_size=max(workers, config.get('pool_size', 10)), connect_timeout=config.get('connect_timeout'), read_timeout=config.get('request_timeout'))
+        if provider:
+            # The [rate_limits.<provider>] config table, overridden by the command-line caps
+            settings = dict(config.get('rate_limits', {}).get(provider, {}))
+            if requests_per_minute:
+                settings['requests_per_minute'] = requests_per_minute
+            if tokens_per_minute:
+                settings['tokens_per_minute'] = tokens_per_minute
+            settings.setdefault('max_in_flight', workers)
+            configure_scheduler(provider, **settings)
+        cache = None if no_cache else open_cache(cache_dir, max_mb=config.get('cache_max_mb'), ttl=config.get('cache_ttl'))
+        text_cache = None if no_cache else open_cache(cache_dir, namespace='text', max_mb=config.get('cache_max_mb'))
+        profile_cache = None if no_cache else open_cache(cache_dir, namespace='profiles', max_mb=config.get('cache_max_mb'))
+        if offline:
+            from offline import run_offline_batch
+            counts = run_offline_batch(manifest, results_path, model, provider, analysis_mode, on_record=report, on_status=batch_status, cache=cache,
+                                       text_cache=text_cache, max_prompt_tokens=max_prompt_tokens, poll_interval=poll_interval, wait=not no_wait)
+        else:
+            counts = run_batch(manifest, results_path, model, provider, analysis_mode, workers, on_record=report, cache=cache, text_cache=text_cache, max_prompt_tokens=max_prompt_tokens, prescreen_threshold=prescreen_threshold, job_profile=job_profile, profile_cache=profile_cache)
+    except Exception as e:
+        click.echo(f'Error: {e}', err=True)
+        sys.exit(1)
+    finally:
+        if ledger is not None:
+            ledger.close()
+
+    if counts.get('pending'):
+        click.echo(f"Submitted: {counts['pending']} rows are still running in the provider's batch API. Run the same command again to collect them.", err=True)
+    click.echo(f"Batch finished: {counts['ok']} ok, {counts['failed']} failed, {counts.get('screened_out', 0)} screened out, {counts['skipped']} already done. Results in {results_path}", err=True)
+    if coalesce_stats()['coalesced']:
+        click.echo(f"Coalesced requests: {coalesce_stats()['coalesced']} rows shared a provider call already in flight", err=True)
+    if report_path:
+        from bulk import render_results
+        try:
+            render_results(results_path, report_path, report_format)
+        except Exception as e:
+            click.echo(f'Error: {e}', err=True)
+            sys.exit(1)
+    if counts['failed']:
+        sys.exit(1)
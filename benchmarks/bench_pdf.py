@@ -0,0 +1,61 @@
+"""
+Measure PDF rendering throughput in documents per second.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf --documents 200
+
+The native renderer is always measured; the wkhtmltopdf backend is measured
+too when its binary is installed. Results are printed as JSON.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import click
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from prompt import PROMPT_TEMPLATES
+from utils import generate_pdf
+
+# A report shaped like a detailed analysis from the model
+SAMPLE_REPORT = '\n'.join([
+    "# Analysis Report",
+    "",
+    PROMPT_TEMPLATES['detailed'],
+    "",
+] + [f"- **Keyword {index}**: add it to the Experience section with a measurable result." for index in range(40)])
+
+
+def measure(backend, documents, directory):
+    """Render `documents` reports one after another and return documents/sec."""
+    start = time.perf_counter()
+    for index in range(documents):
+        generate_pdf(SAMPLE_REPORT, os.path.join(directory, f"{backend}_{index}.pdf"), backend=backend)
+    elapsed = time.perf_counter() - start
+    return {'documents': documents, 'seconds': round(elapsed, 4), 'documents_per_second': round(documents / elapsed, 2)}
+
+
+@click.command()
+@click.option('--documents', default=200, show_default=True, help='Reports rendered in the batched run.')
+def bench_pdf(documents):
+    backends = ['native']
+    if shutil.which('wkhtmltopdf'):
+        backends.append('wkhtmltopdf')
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in backends:
+            results[backend] = {
+                'single': measure(backend, 1, directory),
+                'batch': measure(backend, documents, directory),
+            }
+    click.echo(json.dumps({'benchmark': 'pdf', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    bench_pdf()
@@ -0,0 +1,69 @@
+"""
+Measure CLI startup: import time of `main` and wall time of `--version`.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup
+
+Each measurement spawns a fresh interpreter, the way the npm wrapper does.
+Results are printed as JSON, with the slowest modules by cumulative import time.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+import click
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Modules that only the code paths needing them should load
+HEAVY_MODULES = ('groq', 'httpx', 'pydantic', 'requests', 'docx', 'pdfkit', 'numpy', 'dotenv')
+
+
+def import_profile(module='main'):
+    """
+    Import `module` in a fresh interpreter with `-X importtime`.
+
+    Returns {imported module name: cumulative import time in microseconds}.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def command_seconds(*args):
+    """Wall time of running `python main.py *args` in a fresh interpreter."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, 'main.py', *args], cwd=ROOT, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option('--runs', default=5, show_default=True, help='Fresh interpreters started per command.')
+@click.option('--top', default=10, show_default=True, help='Slowest modules to list.')
+def bench_startup(runs, top):
+    profile = import_profile()
+    slowest = sorted(profile.items(), key=lambda item: -item[1])[:top]
+    results = {
+        'import_main_ms': round(profile['main'] / 1000, 2),
+        'heavy_modules_loaded': [name for name in HEAVY_MODULES if name in profile],
+        'slowest_imports_ms': {name: round(micros / 1000, 2) for name, micros in slowest},
+    }
+    for args in (['--version'], ['--help']):
+        timings = sorted(command_seconds(*args) for _ in range(runs))
+        results[' '.join(args) + '_ms'] = {'min': round(timings[0] * 1000, 1), 'median': round(timings[len(timings) // 2] * 1000, 1)}
+    click.echo(json.dumps({'benchmark': 'startup', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    bench_startup()
@@ -0,0 +1,323 @@
+"""
+A local stand-in for the OpenRouter and Groq chat-completions APIs.
+
+It answers `POST .../chat/completions` like the real services, including
+server-sent-event streaming with usage on the final chunk and 429 responses
+carrying Retry-After, with configurable latency, jitter, token rate and error
+rates. The OpenAI-style batch API (`/files`, `/batches`) is served too, with
+batches completing `batch_delay` seconds after they are created. Point the
+CLI at it with OPENROUTER_BASE_URL (or GROQ_BASE_URL):
+
+    python -m benchmarks.fake_provider --port 8090 --latency 0.2
+    OPENROUTER_BASE_URL=http://127.0.0.1:8090/api/v1 OPENROUTER_API_KEY=fake \\
+        python main.py --model fake-model --provider openrouter ...
+"""
+import email.parser
+import email.policy
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+DEFAULT_REPLY = (
+    "**Brief Introduction**: The candidate applies for the advertised role. "
+    "**Summary**: Estimated ATS match 72%. Add the missing keywords to the Experience section."
+)
+
+
+class FakeProvider:
+    """
+    An OpenAI-compatible chat-completions server running in a background thread.
+
+    `latency` (+ up to `jitter`) seconds pass before the first byte of every
+    response, or `model_latency[model]` for the models listed there; streamed
+    replies then emit `tokens_per_second` words per second.
+    `error_rate` and `rate_limit_rate` are the chances of answering 500 or 429.
+    `reply` is the answer text, or a function of the request body returning it.
+    Batch jobs complete `batch_delay` seconds after creation, answering
+    each line like a chat-completions request without the latency.
+    Counters of the requests served are kept in `stats`.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, tokens_per_second=None,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=0, reply=DEFAULT_REPLY, seed=None, model_latency=None,
+                 batch_delay=0.0):
+        self.latency = latency
+        self.model_latency = dict(model_latency or {})
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.reply = reply
+        self.random = random.Random(seed)
+        self.batch_delay = batch_delay
+        # Uploads still to be answered with a 503, to exercise retries
+        self.upload_errors = 0
+        self.stats = {'requests': 0, 'streamed': 0, 'rate_limited': 0, 'errors': 0, 'batches': 0}
+        self.files = {}
+        self.batches = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openrouter_base_url(self):
+        return self.url + '/api/v1'
+
+    @property
+    def groq_base_url(self):
+        # The Groq SDK appends /openai/v1/... to its base URL
+        return self.url
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _draw(self, model):
+        """Pick this request's outcome and delay."""
+        with self._lock:
+            self.stats['requests'] += 1
+            roll = self.random.random()
+            delay = self.model_latency.get(model, self.latency) + self.random.uniform(0, self.jitter)
+            if roll < self.rate_limit_rate:
+                self.stats['rate_limited'] += 1
+                return 429, delay
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats['errors'] += 1
+                return 500, delay
+        return 200, delay
+
+    def _completion(self, request):
+        """Answer one chat-completions request body: (reply, reply words, usage)."""
+        prompt = ''.join(str(message.get('content', '')) for message in request.get('messages', []))
+        reply = self.reply(request) if callable(self.reply) else self.reply
+        words = reply.split(' ')
+        return reply, words, _usage(prompt, words)
+
+    def add_file(self, data, purpose):
+        with self._lock:
+            file_id = f"file-{next(self._ids)}"
+            self.files[file_id] = data
+        return {'id': file_id, 'object': 'file', 'bytes': len(data), 'created_at': int(time.time()), 'purpose': purpose}
+
+    def create_batch(self, request):
+        with self._lock:
+            if request.get('input_file_id') not in self.files:
+                return None
+            batch_id = f"batch_{next(self._ids)}"
+            self.stats['batches'] += 1
+            self.batches[batch_id] = {
+                'id': batch_id, 'object': 'batch', 'endpoint': request.get('endpoint'),
+                'input_file_id': request['input_file_id'], 'completion_window': request.get('completion_window', '24h'),
+                'status': 'validating', 'output_file_id': None, 'error_file_id': None,
+                'created_at': int(time.time()), 'completed_at': None, 'metadata': request.get('metadata'),
+                'request_counts': {'total': len(self.files[request['input_file_id']].splitlines()), 'completed': 0, 'failed': 0},
+                '_ready_at': time.monotonic() + self.batch_delay,
+            }
+        return self.batch(batch_id)
+
+    def batch(self, batch_id):
+        """Return a batch's public state, running it once its delay has passed."""
+        with self._lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+        if batch['status'] == 'validating':
+            batch['status'] = 'in_progress'
+        elif batch['status'] == 'in_progress' and time.monotonic() >= batch['_ready_at']:
+            self._run_batch(batch)
+        return {key: value for key, value in batch.items() if not key.startswith('_')}
+
+    def _run_batch(self, batch):
+        lines, counts = [], batch['request_counts']
+        for line in self.files[batch['input_file_id']].decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            status, _ = self._draw(item['body'].get('model', 'fake-model'))
+            if status == 200:
+                reply, _, usage = self._completion(item['body'])
+                counts['completed'] += 1
+                body = {'id': 'chatcmpl-fake', 'object': 'chat.completion', 'model': item['body'].get('model'),
+                        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+                        'usage': usage}
+            else:
+                counts['failed'] += 1
+                body = {'error': {'message': 'Internal server error' if status == 500 else 'Rate limit exceeded'}}
+            lines.append(json.dumps({'id': f"batch_req_{len(lines) + 1}", 'custom_id': item['custom_id'],
+                                     'response': {'status_code': status, 'body': body}, 'error': None}))
+        batch['output_file_id'] = self.add_file(('\n'.join(lines) + '\n').encode('utf-8'), 'batch_output')['id']
+        batch.update(status='completed', completed_at=int(time.time()))
+
+
+def _usage(prompt, words):
+    # Roughly four characters per prompt token, one token per reply word
+    prompt_tokens = max(1, len(prompt) // 4)
+    return {'prompt_tokens': prompt_tokens, 'completion_tokens': len(words), 'total_tokens': prompt_tokens + len(words)}
+
+
+def _handler(provider):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            parts = self.path.rstrip('/').split('/')
+            if len(parts) >= 2 and parts[-2] == 'batches':
+                batch = provider.batch(parts[-1])
+                if batch is not None:
+                    return self._json(200, batch)
+            elif len(parts) >= 3 and parts[-3] == 'files' and parts[-1] == 'content' and parts[-2] in provider.files:
+                data = provider.files[parts[-2]]
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                return self.wfile.write(data)
+            self._json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if self.path.endswith('/files'):
+                return self._upload(body)
+            if not self.path.endswith(('/chat/completions', '/batches')):
+                return self._json(404, {'error': {'message': f'Unknown path {self.path}'}})
+            try:
+                request = json.loads(body or b'{}')
+            except ValueError:
+                return self._json(400, {'error': {'message': 'Request body is not JSON'}})
+            if self.path.endswith('/batches'):
+                batch = provider.create_batch(request)
+                if batch is None:
+                    return self._json(400, {'error': {'message': 'Unknown input_file_id'}})
+                return self._json(200, batch)
+
+            model = request.get('model', 'fake-model')
+            status, delay = provider._draw(model)
+            time.sleep(delay)
+            if status == 429:
+                return self._json(429, {'error': {'message': 'Rate limit exceeded', 'type': 'rate_limit'}},
+                                  {'Retry-After': str(provider.retry_after)})
+            if status != 200:
+                return self._json(status, {'error': {'message': 'Internal server error'}})
+
+            reply, words, usage = provider._completion(request)
+            if request.get('stream'):
+                self._stream(model, words, usage)
+            else:
+                self._json(200, {
+                    'id': 'chatcmpl-fake',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+                    'usage': usage,
+                })
+
+        def _upload(self, body):
+            # multipart/form-data with a `purpose` field and a `file` part
+            message = email.parser.BytesParser(policy=email.policy.default).parsebytes(
+                b'Content-Type: ' + self.headers.get('Content-Type', '').encode('latin-1') + b'\r\n\r\n' + body)
+            fields = {part.get_param('name', header='content-disposition'): part.get_payload(decode=True) for part in message.iter_parts()}
+            with provider._lock:
+                failing = provider.upload_errors > 0
+                provider.upload_errors -= failing
+            if failing:
+                return self._json(503, {'error': {'message': 'Service unavailable'}})
+            if not fields.get('file'):
+                return self._json(400, {'error': {'message': 'Missing or empty file'}})
+            self._json(200, provider.add_file(fields['file'], (fields.get('purpose') or b'batch').decode('utf-8')))
+
+        def _json(self, status, payload, headers=None):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream(self, model, words, usage):
+            with provider._lock:
+                provider.stats['streamed'] += 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            # OpenRouter sends comment lines as keep-alives
+            self.wfile.write(b': FAKE PROVIDER PROCESSING\n\n')
+            for index, word in enumerate(words):
+                chunk = {
+                    'id': 'chatcmpl-fake',
+                    'object': 'chat.completion.chunk',
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': word if index == 0 else ' ' + word}, 'finish_reason': None}],
+                }
+                self.wfile.write(b'data: ' + json.dumps(chunk).encode('utf-8') + b'\n\n')
+                self.wfile.flush()
+                if provider.tokens_per_second:
+                    time.sleep(1 / provider.tokens_per_second)
+            final = {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion.chunk',
+                'model': model,
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+                'usage': usage,
+                # Groq reports streamed usage here instead
+                'x_groq': {'usage': usage},
+            }
+            self.wfile.write(b'data: ' + json.dumps(final).encode('utf-8') + b'\n\n')
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.wfile.flush()
+
+    return Handler
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=8090, show_default=True)
+@click.option('--latency', default=0.0, show_default=True, help='Seconds before every response.')
+@click.option('--jitter', default=0.0, show_default=True, help='Extra random delay of up to this many seconds.')
+@click.option('--tokens-per-second', type=float, default=None, help='Pace of streamed reply words.')
+@click.option('--error-rate', default=0.0, show_default=True, help='Share of requests answered with 500.')
+@click.option('--rate-limit-rate', default=0.0, show_default=True, help='Share of requests answered with 429.')
+@click.option('--retry-after', default=0, show_default=True, help='Retry-After seconds sent with 429s.')
+def fake_provider(host, port, latency, jitter, tokens_per_second, error_rate, rate_limit_rate, retry_after):
+    provider = FakeProvider(host, port, latency, jitter, tokens_per_second, error_rate, rate_limit_rate, retry_after)
+    click.echo(f"Fake provider listening on {provider.url} (OpenRouter base URL: {provider.openrouter_base_url})")
+    try:
+        provider._server.serve_forever()
+    except KeyboardInterrupt:
+        provider.stop()
+
+
+if __name__ == '__main__':
+    fake_provider()
@@ -0,0 +1,212 @@
+"""
+Benchmark suite: provider round trips against the local fake provider,
+document parsing and report rendering.
+
+Run from the repository root:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare results.json
+
+Provider scenarios go through the real HTTP path (requests session, SSE
+parsing, scheduler retries) against `benchmarks.fake_provider`, so no API key
+or network is needed. Results are JSON; `--compare` prints each metric next
+to the one in an earlier results file.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import utils
+from benchmarks.bench_pdf import SAMPLE_REPORT
+from benchmarks.fake_provider import FakeProvider
+from batch import run_batch
+from main import run_pairs
+from scheduler import configure_scheduler
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PROVIDER = 'openrouter'
+DOCUMENTS = [
+    "Jane Doe\nSenior Python developer. Built data pipelines with SQL, Docker and AWS.\n" * 20,
+    "Dear hiring manager, I am excited to apply for the Python developer role.\n" * 5,
+    "Senior Python Developer. Must have SQL, Docker, AWS and machine learning experience.\n" * 10,
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(seconds):
+    """Milliseconds p50/p95/max of a list of durations in seconds."""
+    return {
+        'p50_ms': round(percentile(seconds, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(seconds, 0.95) * 1000, 2),
+        'max_ms': round(max(seconds) * 1000, 2),
+    }
+
+
+def rate(count, elapsed):
+    return round(count / elapsed, 2) if elapsed else None
+
+
+def bench_single_run(requests):
+    """Latency of one analysis, buffered and streamed (time to first chunk)."""
+    buffered, first_chunk = [], []
+    for _ in range(requests):
+        start = time.perf_counter()
+        utils.process_content(DOCUMENTS, 'fake-key', 'fake-model', 'basic', False, PROVIDER)
+        buffered.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        arrivals = []
+        utils.process_content(DOCUMENTS, 'fake-key', 'fake-model', 'basic', False, PROVIDER,
+                              on_chunk=lambda text: arrivals.append(time.perf_counter()))
+        first_chunk.append(arrivals[0] - start)
+    return {'requests': requests, 'buffered': summarize(buffered), 'stream_first_chunk': summarize(first_chunk)}
+
+
+def bench_fan_out(models, concurrency):
+    """Wall time of sending one analysis to several models at once."""
+    pairs = [(f'fake-model-{index}', PROVIDER) for index in range(models)]
+    start = time.perf_counter()
+    for _, _, future in run_pairs(pairs, DOCUMENTS, 'basic', False, concurrency):
+        future.result()
+    elapsed = time.perf_counter() - start
+    return {'models': models, 'concurrency': concurrency, 'seconds': round(elapsed, 4)}
+
+
+def bench_batch(candidates, workers):
+    """
+    Candidates screened per second by `run_batch`.
+
+    Every candidate has their own resume, so identical rows are not coalesced
+    into one provider call and each row costs a real request.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for name, text in zip(('cover_letter.txt', 'job_description.txt'), DOCUMENTS[1:]):
+            with open(os.path.join(directory, name), 'w', encoding='utf-8') as file:
+                file.write(text)
+        manifest = os.path.join(directory, 'manifest.jsonl')
+        with open(manifest, 'w', encoding='utf-8') as file:
+            for index in range(candidates):
+                resume = f'resume_{index}.txt'
+                with open(os.path.join(directory, resume), 'w', encoding='utf-8') as resume_file:
+                    resume_file.write(f'Candidate {index}.\n{DOCUMENTS[0]}')
+                file.write(json.dumps({'id': str(index), 'resume': resume, 'cover_letter': 'cover_letter.txt',
+                                       'job_description': 'job_description.txt'}) + '\n')
+        start = time.perf_counter()
+        counts = run_batch(manifest, os.path.join(directory, 'results.jsonl'), 'fake-model', PROVIDER, 'basic', workers)
+        elapsed = time.perf_counter() - start
+    return {'candidates': candidates, 'workers': workers, 'failed': counts['failed'],
+            'seconds': round(elapsed, 4), 'candidates_per_second': rate(candidates, elapsed)}
+
+
+def bench_parsing(rounds):
+    """Documents extracted per second, with the text cache emptied each round."""
+    with tempfile.TemporaryDirectory() as directory:
+        text_file = os.path.join(directory, 'job_description.txt')
+        with open(text_file, 'w', encoding='utf-8') as file:
+            file.write(DOCUMENTS[2] * 50)
+        docx_file = os.path.join(directory, 'resume.docx')
+        utils.generate_docx(DOCUMENTS[0] * 5, docx_file)
+        results = {}
+        for name, path in (('docx', docx_file), ('txt', text_file)):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                utils._text_cache.clear()
+                utils.read_documents([path])
+            results[name] = {'documents_per_second': rate(rounds, time.perf_counter() - start)}
+    return results
+
+
+def bench_rendering(documents):
+    """Reports rendered per second to each output format."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in ('pdf', 'docx'):
+            start = time.perf_counter()
+            for index in range(documents):
+                utils.generate_output(SAMPLE_REPORT, os.path.join(directory, f'report_{index}.{extension}'))
+            results[extension] = {'documents_per_second': rate(documents, time.perf_counter() - start)}
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def flatten(results, prefix=''):
+    """Yield (dotted.metric.name, value) for every numeric leaf."""
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            yield from flatten(value, name + '.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+@click.command()
+@click.option('--scale', default=1.0, show_default=True, help='Multiplier for every scenario size.')
+@click.option('--latency', default=0.05, show_default=True, help='Fake provider latency in seconds.')
+@click.option('--jitter', default=0.02, show_default=True, help='Fake provider jitter in seconds.')
+@click.option('--tokens-per-second', default=2000.0, show_default=True, help='Fake provider streaming pace.')
+@click.option('--rate-limit-rate', default=0.05, show_default=True, help='Share of requests answered with 429.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the JSON results to this file.')
+@click.option('--compare', 'baseline', type=click.Path(exists=True, dir_okay=False), help='Earlier results file to compare with.')
+def run(scale, latency, jitter, tokens_per_second, rate_limit_rate, output, baseline):
+    def size(count):
+        return max(1, int(count * scale))
+
+    fake = FakeProvider(latency=latency, jitter=jitter, tokens_per_second=tokens_per_second,
+                        rate_limit_rate=rate_limit_rate, seed=0)
+    os.environ['OPENROUTER_BASE_URL'] = fake.openrouter_base_url
+    os.environ['OPENROUTER_API_KEY'] = 'fake-key'
+    # Retry the fake 429s quickly so backoff does not dominate the timings
+    configure_scheduler(PROVIDER, base_delay=0.01, max_delay=0.1)
+
+    with fake:
+        results = {
+            'single_run': bench_single_run(size(20)),
+            'fan_out': bench_fan_out(size(8), size(8)),
+            'batch': bench_batch(size(200), 8),
+        }
+    results['fake_provider'] = dict(fake.stats)
+    results['parsing'] = bench_parsing(size(200))
+    results['rendering'] = bench_rendering(size(100))
+
+    report = {
+        'suite': 'tailor4job',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'settings': {'scale': scale, 'latency': latency, 'jitter': jitter,
+                     'tokens_per_second': tokens_per_second, 'rate_limit_rate': rate_limit_rate},
+        'results': results,
+    }
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        click.echo(json.dumps(report, indent=2))
+
+    if baseline:
+        with open(baseline, 'r', encoding='utf-8') as file:
+            previous = dict(flatten(json.load(file)['results']))
+        for name, value in flatten(results):
+            if name in previous and previous[name]:
+                click.echo(f"{name}: {previous[name]} -> {value} ({value / previous[name]:.2f}x)", err=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,369 @@
+import io
+import json
+import os
+import re
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+import click
+
+from pdf_render import layout, layout_contents, parse_markdown, inline_runs, render_pdf_bytes, check_characters, substitute_symbols, PdfWriter, UnsupportedCharacters
+from tracing import span
+
+BULK_FORMATS = ('pdf', 'docx')
+
+# Below this many reports, rendering in this process beats starting a process pool
+MIN_POOL_REPORTS = 8
+
+# Characters XML 1.0 does not allow, which model output occasionally contains
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_UNSAFE_NAME = re.compile(r'[^\w.-]+')
+
+
+class DocxTemplate:
+    """
+    A .docx package loaded once and filled with many documents.
+
+    Every part of python-docx's default template is kept in memory; only
+    `word/document.xml` is generated per document, so no `Document()` is
+    built or parsed per report.
+    """
+
+    def __init__(self):
+        from utils import _lazy
+
+        buffer = io.BytesIO()
+        _lazy('Document')().save(buffer)
+        with zipfile.ZipFile(buffer) as package:
+            self.parts = [(info, package.read(info.filename)) for info in package.infolist()]
+        document = dict((info.filename, data) for info, data in self.parts)['word/document.xml'].decode('utf-8')
+        body = document.index('<w:body>') + len('<w:body>')
+        self.head, self.tail = document[:body], document[document.index('<w:sectPr', body):]
+
+    def write(self, file, body_chunks):
+        """Write a .docx to `file` whose body is the concatenated `body_chunks` XML, streamed into the package."""
+        with zipfile.ZipFile(file, 'w', zipfile.ZIP_DEFLATED) as package:
+            for info, data in self.parts:
+                if info.filename != 'word/document.xml':
+                    package.writestr(info, data, zipfile.ZIP_DEFLATED)
+            with package.open('word/document.xml', 'w') as document:
+                document.write(self.head.encode('utf-8'))
+                for chunk in body_chunks:
+                    document.write(chunk.encode('utf-8'))
+                document.write(self.tail.encode('utf-8'))
+
+    def render(self, content):
+        """Return the bytes of a .docx holding `content`."""
+        output = io.BytesIO()
+        self.write(output, [report_xml(content)])
+        return output.getvalue()
+
+
+def _run_xml(text, bold=False):
+    properties = '<w:rPr><w:b/></w:rPr>' if bold else ''
+    return f'<w:r>{properties}<w:t xml:space="preserve">{escape(_XML_INVALID.sub("", text))}</w:t></w:r>'
+
+
+def _paragraph_xml(runs, style=None):
+    properties = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ''
+    return f'<w:p>{properties}{"".join(_run_xml(text, bold) for text, bold in runs)}</w:p>'
+
+
+def report_xml(content, title=None):
+    """
+    WordprocessingML paragraphs for one report: markdown headings become
+    heading styles and `**bold**` becomes bold runs.
+    """
+    paragraphs = [_paragraph_xml([(title, False)], 'Heading1')] if title else []
+    for line in content.replace('\r\n', '\n').split('\n'):
+        heading = re.match(r'^(#{1,6})\s+(.*)$', line)
+        if heading:
+            level = min(len(heading.group(1)) + (1 if title else 0), 9)
+            paragraphs.append(_paragraph_xml([(heading.group(2).replace('**', ''), False)], f'Heading{level}'))
+        else:
+            paragraphs.append(_paragraph_xml(inline_runs(line)))
+    return ''.join(paragraphs)
+
+
+_PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+# One template per process, built on first use
+_template = None
+
+
+def _docx_template():
+    global _template
+    if _template is None:
+        _template = DocxTemplate()
+    return _template
+
+
+def render_report(content, output_format):
+    """Render one report to the bytes of a .pdf or .docx file."""
+    if output_format == 'pdf':
+        return render_pdf_bytes(content)
+    return _docx_template().render(content)
+
+
+def _layout_report(title, content):
+    # Returns (pages, None), or (None, error) for a report the built-in PDF fonts cannot show
+    title, content = substitute_symbols(title), substitute_symbols(content)
+    try:
+        _check_report(title, content)
+    except UnsupportedCharacters as e:
+        return None, str(e)
+    # A heading with the report's title starts its first page
+    return layout([{'kind': 'heading', 'level': 1, 'runs': [(title, True)]}, {'kind': 'blank'}] + parse_markdown(content)), None
+
+
+def _report_xml(title, content):
+    return _PAGE_BREAK + report_xml(content, title)
+
+
+def _check_report(title, content):
+    # Name the report whose text the built-in PDF fonts cannot show
+    try:
+        check_characters(substitute_symbols(f"{title}\n{content}"))
+    except UnsupportedCharacters as e:
+        raise UnsupportedCharacters(f"Report {title}: {e}") from None
+
+
+def _render_entry(title, content, output_format):
+    # Returns (title, format, bytes, error); a PDF the built-in fonts cannot show is written as a .docx instead
+    if output_format == 'pdf':
+        try:
+            _check_report(title, content)
+        except UnsupportedCharacters as e:
+            return title, 'docx', render_report(content, 'docx'), str(e)
+    return title, output_format, render_report(content, output_format), None
+
+
+def parallel_map(function, items, workers=None):
+    """
+    Yield `function(*item)` for every item, in order.
+
+    With more than one worker and at least MIN_POOL_REPORTS items, the work
+    runs in a process pool with at most `workers * 4` items in flight, so
+    results are consumed as they finish instead of piling up in memory.
+    """
+    workers = workers or os.cpu_count() or 1
+    items = iter(items)
+    first = [item for _, item in zip(range(MIN_POOL_REPORTS), items)]
+    if workers <= 1 or len(first) < MIN_POOL_REPORTS:
+        for item in first:
+            yield function(*item)
+        for item in items:
+            yield function(*item)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in first:
+            pending.append(executor.submit(function, *item))
+        for item in items:
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+            pending.append(executor.submit(function, *item))
+        while pending:
+            yield pending.popleft().result()
+
+
+def _entry_name(title, output_format, used):
+    name = _UNSAFE_NAME.sub('_', str(title)).strip('._') or 'report'
+    candidate, index = name, 2
+    while candidate in used:
+        candidate = f"{name}_{index}"
+        index += 1
+    used.add(candidate)
+    return f"{candidate}.{output_format}"
+
+
+def render_archive(reports, output_file, output_format='pdf', workers=None, on_skip=None):
+    """
+    Render (title, content) reports into a zip with one file per report.
+
+    Reports may be any iterable; each rendered file is written into the
+    archive as soon as it is ready. A report the built-in PDF fonts cannot
+    show is written as a .docx and passed to `on_skip(title, error, 'docx')`.
+    Returns the number of files written.
+    """
+    used, count = set(), 0
+    # Rendered PDFs and .docx packages are compressed already
+    with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_STORED) as archive:
+        items = ((title, content, output_format) for title, content in reports)
+        for title, entry_format, data, error in parallel_map(_render_entry, items, workers):
+            if error and on_skip:
+                on_skip(title, error, entry_format)
+            archive.writestr(_entry_name(title, entry_format, used), data)
+            count += 1
+    return count
+
+
+def render_combined_pdf(reports, output_file, workers=None, title='Contents', on_skip=None):
+    """
+    Render (title, content) reports into one PDF, each starting on a new page,
+    after a table of contents with page numbers and a bookmark per report.
+
+    Reports the built-in PDF fonts cannot show are left out and passed to
+    `on_skip(title, error, None)`. Returns the number of reports rendered.
+    """
+    entries, report_page_ids = [], []
+    with open(output_file, 'wb') as file:
+        writer = PdfWriter(file)
+        for (report_title, _), (pages, error) in zip(reports, parallel_map(_layout_report, reports, workers)):
+            if error:
+                if on_skip:
+                    on_skip(report_title, error, None)
+                continue
+            entries.append((substitute_symbols(report_title), len(report_page_ids)))
+            report_page_ids.extend(writer.add_page(runs) for runs in pages)
+
+        # The contents pages come first, so they shift every report's page number
+        contents_length = len(layout_contents([(report_title, 0) for report_title, _ in entries], title))
+        contents = layout_contents([(report_title, contents_length + index + 1) for report_title, index in entries], title)
+        contents_ids = [writer.add_page(runs) for runs in contents]
+        outline = [(report_title, report_page_ids[index]) for report_title, index in entries if index < len(report_page_ids)]
+        writer.close(contents_ids + report_page_ids, outline)
+    return len(entries)
+
+
+def render_combined_docx(reports, output_file, workers=None, title='Contents'):
+    """
+    Render (title, content) reports into one .docx, each under a Heading 1
+    on a new page, after a table of contents.
+
+    The contents are a Word TOC field listing the report titles; Word
+    offers to update it with page numbers when the file is opened.
+    """
+    toc = ''.join(_paragraph_xml([(report_title, False)]) for report_title, _ in reports)
+    head = (
+        _paragraph_xml([(title, False)], 'Title')
+        + '<w:p><w:r><w:fldChar w:fldCharType="begin" w:dirty="true"/></w:r>'
+        + '<w:r><w:instrText xml:space="preserve"> TOC \\o "1-1" \\h \\z \\u </w:instrText></w:r>'
+        + '<w:r><w:fldChar w:fldCharType="separate"/></w:r></w:p>'
+        + toc
+        + '<w:p><w:r><w:fldChar w:fldCharType="end"/></w:r></w:p>'
+    )
+    with open(output_file, 'wb') as file:
+        body = parallel_map(_report_xml, reports, workers)
+        _docx_template().write(file, _chain([head], body))
+    return len(reports)
+
+
+def _chain(*iterables):
+    for iterable in iterables:
+        yield from iterable
+
+
+def render_bulk(reports, output_file, output_format='pdf', workers=None, on_skip=None):
+    """
+    Render many (title, content) reports in one pass.
+
+    A `.zip` output gets one `output_format` file per report; a `.pdf` or
+    `.docx` output gets one combined document with a table of contents.
+    Reports a PDF cannot show are passed to `on_skip(title, error, fallback)`
+    instead of failing the run: a .zip holds them as .docx files (fallback
+    'docx'), a combined PDF leaves them out (fallback None). The output is
+    written to a temporary file and only replaces `output_file` once
+    complete. Returns the number of reports rendered.
+    """
+    ext = os.path.splitext(output_file)[1].lower()
+    if ext == '.zip' and output_format not in BULK_FORMATS:
+        raise Exception(f"Unsupported report format: {output_format}. Please use pdf or docx.")
+    if ext not in ('.zip', '.pdf', '.docx'):
+        raise Exception('Unsupported file format. Please use .zip, .pdf or .docx.')
+
+    temporary = output_file + '.tmp'
+    with span('render_bulk', file=os.path.basename(output_file)) as current:
+        try:
+            if ext == '.zip':
+                count = render_archive(reports, temporary, output_format, workers, on_skip)
+            else:
+                # Combined documents walk the reports twice; results files are re-read rather than held in memory
+                if not hasattr(reports, '__len__'):
+                    reports = list(reports)
+                if ext == '.pdf':
+                    count = render_combined_pdf(reports, temporary, workers, on_skip=on_skip)
+                else:
+                    count = render_combined_docx(reports, temporary, workers)
+            os.replace(temporary, output_file)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        current.set(reports=count, bytes=os.path.getsize(output_file))
+    return count
+
+
+def render_results(results_path, output_file, output_format='pdf', workers=None):
+    """Render a batch results file for the CLI, naming every report a PDF cannot show on stderr."""
+    skipped = []
+
+    def on_skip(title, error, fallback):
+        if fallback:
+            click.echo(f"Warning: {error} (written to the archive as .{fallback})", err=True)
+        else:
+            skipped.append(title)
+            click.echo(f"Skipped: {error}", err=True)
+
+    count = render_bulk(load_reports(results_path), output_file, output_format, workers, on_skip)
+    message = f"Rendered {count} reports to {output_file}"
+    if skipped:
+        message += f"; skipped {len(skipped)} the built-in PDF fonts cannot show"
+    click.echo(message, err=True)
+    return count
+
+
+class ResultsReports:
+    """
+    The latest successful analysis of every row of a batch results file.
+
+    Only each row's file offset is kept; analyses are read back from disk on
+    every iteration, so memory does not grow with the number of candidates
+    and the reports can be iterated more than once (contents, then bodies).
+    """
+
+    def __init__(self, results_path):
+        self.results_path = results_path
+        self._offsets = {}
+        offset = 0
+        with open(results_path, 'rb') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                # When a row was run more than once, its latest successful analysis is used
+                if isinstance(record, dict) and record.get('status') == 'ok' and record.get('analysis'):
+                    self._offsets[str(record['id'])] = offset
+                offset += len(line)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        with open(self.results_path, 'rb') as file:
+            for row_id, offset in self._offsets.items():
+                file.seek(offset)
+                yield row_id, json.loads(file.readline())['analysis']
+
+
+def load_reports(results_path):
+    """Return the (id, analysis) reports of a batch results file, read lazily."""
+    return ResultsReports(results_path)
+
+
+@click.command()
+@click.option('--output', '-o', required=True, type=click.Path(dir_okay=False), help='A .zip of per-candidate files, or one combined .pdf or .docx.')
+@click.option('--format', 'output_format', type=click.Choice(BULK_FORMATS), default='pdf', show_default=True, help='Format of the files inside a .zip output.')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=None, help='Processes rendering reports (default: one per CPU).')
+@click.argument('results', type=click.Path(exists=True, dir_okay=False))
+def render(output, output_format, workers, results):
+    """Render every successful analysis of a batch RESULTS file (.jsonl) in one pass."""
+    try:
+        render_results(results, output, output_format, workers)
+    except Exception as e:
+        click.echo(f'Error: {e}', err=True)
+        sys.exit(1)
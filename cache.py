@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Default bound on the on-disk size of a cache directory
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+def default_cache_dir():
+    """Return the per-user cache directory, honoring XDG_CACHE_HOME."""
+    base = os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'tailor4job')
+
+
+def open_cache(cache_dir=None, namespace='responses', max_mb=None, ttl=None):
+    """Open the `namespace` cache under `cache_dir` (default: the per-user cache directory)."""
+    directory = os.path.join(cache_dir or default_cache_dir(), namespace)
+    max_bytes = int(max_mb * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+    return DiskCache(directory, max_bytes=max_bytes, ttl=ttl)
+
+
+def make_key(*parts):
+    """Build a content-addressed cache key from JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """
+    Persistent JSON cache stored as one file per key.
+
+    Entries older than `ttl` seconds are treated as misses. When the
+    directory grows past `max_bytes`, the least recently used entries are
+    evicted first (a hit refreshes the entry's modification time).
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, ttl=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached value for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            self._count(hit=False)
+            return None
+
+        if self.ttl is not None and time.time() - entry['created'] > self.ttl:
+            self._remove(path)
+            self._count(hit=False)
+            return None
+
+        # Mark the entry as recently used for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count(hit=True)
+        return entry['value']
+
+    def set(self, key, value):
+        """Store `value` under `key`, evicting old entries if over the size bound."""
+        path = self._path(key)
+        data = json.dumps({'created': time.time(), 'value': value}, ensure_ascii=False).encode('utf-8')
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def stats(self):
+        """Return hit/miss counters for this cache instance."""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._size -= size
+
+    def _evict(self):
+        # Called with the lock held: drop least recently used entries until under the bound
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._size -= size
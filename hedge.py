@@ -0,0 +1,179 @@
+import re
+import threading
+import time
+
+from cache import make_key
+from prompt import estimate_tokens, prepare_prompt
+from tracing import record_span, span
+from utils import get_api_key, process_content
+
+# Hedge delay used until a pair has enough recorded latencies for a percentile
+DEFAULT_HEDGE_DELAY = 2.0
+MIN_LATENCY_SAMPLES = 5
+MAX_LATENCY_SAMPLES = 200
+
+_PERCENTILE = re.compile(r'^p(\d{1,2}(?:\.\d+)?)$')
+
+
+class Cancelled(Exception):
+    """Raised inside a losing request to stop reading its response."""
+
+
+def parse_delay(value):
+    """
+    Parse a hedge delay: seconds ("1.5") or a latency percentile ("p95").
+
+    Returns ('seconds', float) or ('percentile', float).
+    """
+    value = str(value).strip().lower()
+    match = _PERCENTILE.match(value)
+    if match:
+        return 'percentile', float(match.group(1))
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise Exception(f"Invalid race delay: {value}. Use seconds (e.g. 1.5) or a percentile (e.g. p95).")
+    if seconds < 0:
+        raise Exception("The race delay cannot be negative.")
+    return 'seconds', seconds
+
+
+def _latency_key(model, provider):
+    return make_key('latency', model, provider)
+
+
+def record_latency(cache, model, provider, seconds):
+    """Remember a successful request's latency for `model`/`provider` in `cache`."""
+    if cache is None:
+        return
+    key = _latency_key(model, provider)
+    samples = (cache.get(key) or [])[-(MAX_LATENCY_SAMPLES - 1):]
+    cache.set(key, samples + [seconds])
+
+
+def latency_percentile(cache, model, provider, percentile):
+    """Return the recorded `percentile` latency of a pair, or None without enough samples."""
+    samples = sorted(cache.get(_latency_key(model, provider)) or []) if cache is not None else []
+    if len(samples) < MIN_LATENCY_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+
+def hedge_delay(delay, primary, latency_cache=None):
+    """Seconds to wait for the primary pair before also starting the backup."""
+    kind, value = parse_delay(delay)
+    if kind == 'seconds':
+        return value
+    recorded = latency_percentile(latency_cache, primary[0], primary[1], value)
+    return DEFAULT_HEDGE_DELAY if recorded is None else recorded
+
+
+def race_pairs(primary, backup, content, analysis_mode, delay, cache=None, max_prompt_tokens=None, latency_cache=None):
+    """
+    Send the same documents to a primary and, after `delay` seconds, a backup pair.
+
+    The backup starts early if the primary fails. The first successful
+    response wins and the other request is cancelled: its stream is closed
+    at the next chunk and its usage is estimated from the prompt and the
+    text received so far. A cancelled request is recorded as a `request`
+    span with that estimate before returning, so the usage ledger sees it
+    even when its connection is still open when the run ends. Returns a dict with the winning `pair`,
+    `content`, `usage` and an `attempts` list with every pair's status,
+    latency and usage.
+    """
+    lock = threading.Lock()
+    decided = threading.Event()
+    primary_finished = threading.Event()
+    attempts = [
+        {'model': model, 'provider': provider, 'role': role, 'status': 'not_started', 'latency': None, 'usage': None, 'received': []}
+        for (model, provider), role in ((primary, 'primary'), (backup, 'backup'))
+    ]
+    outcome = {}
+
+    def cancel_loser(loser):
+        # Estimate what the provider bills for a request abandoned mid-flight
+        if loser['status'] != 'running':
+            return
+        prompt_tokens = loser['estimated_tokens']
+        completion_tokens = estimate_tokens(''.join(loser['received']))
+        loser.update(status='cancelled', latency=time.perf_counter() - loser['started'],
+                     usage={'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                            'total_tokens': prompt_tokens + completion_tokens, 'estimated': True})
+
+    def attempt(index, start_after):
+        current = attempts[index]
+        if start_after:
+            # The backup starts early if the primary fails before the delay is up
+            primary_finished.wait(start_after)
+        if decided.is_set():
+            return
+
+        def on_chunk(text):
+            if decided.is_set() and outcome.get('index') != index:
+                raise Cancelled()
+            current['received'].append(text)
+
+        _, prompt_info = prepare_prompt(content, analysis_mode, current['model'], max_prompt_tokens)
+        with lock:
+            current.update(status='running', started=time.perf_counter(), estimated_tokens=prompt_info['estimated_tokens'])
+        try:
+            with span('race_attempt', model=current['model'], provider=current['provider'], role=current['role']):
+                api_key = get_api_key(current['provider'])
+                text, usage = process_content(content, api_key, current['model'], analysis_mode, True, current['provider'],
+                                              cache=cache, on_chunk=on_chunk, max_prompt_tokens=max_prompt_tokens)
+        except Cancelled:
+            return
+        except Exception as e:
+            with lock:
+                if current['status'] == 'running':
+                    current.update(status='failed', error=str(e), latency=time.perf_counter() - current['started'])
+            return
+        finally:
+            if index == 0:
+                primary_finished.set()
+
+        latency = time.perf_counter() - current['started']
+        record_latency(latency_cache, current['model'], current['provider'], latency)
+        with lock:
+            if decided.is_set():
+                # Finished after the winner was chosen: its usage is real, not estimated
+                current.update(status='finished_late', latency=latency, usage=usage)
+                return
+            current.update(status='won', latency=latency, usage=usage)
+            outcome.update(index=index, content=text, usage=usage)
+            decided.set()
+            cancel_loser(attempts[1 - index])
+
+    threads = [
+        threading.Thread(target=attempt, args=(0, 0), daemon=True),
+        threading.Thread(target=attempt, args=(1, delay), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Wait for a winner, or for both pairs to give up
+    while not decided.wait(0.05):
+        if not any(thread.is_alive() for thread in threads):
+            break
+
+    with lock:
+        # Snapshot the attempts; a cancelled request may still be winding down
+        report = [
+            {key: value for key, value in current.items() if key not in ('received', 'started', 'estimated_tokens')}
+            for current in attempts
+        ]
+    for current in report:
+        if current['status'] == 'cancelled':
+            record_span('request', current['latency'], model=current['model'], provider=current['provider'], mode=analysis_mode,
+                        stream=True, error='Cancelled', **current['usage'])
+
+    if not decided.is_set():
+        errors = '; '.join(f"{current['model']} ({current['provider']}): {current.get('error', current['status'])}" for current in report)
+        raise Exception(f"Both raced pairs failed: {errors}")
+    winner = report[outcome['index']]
+    return {
+        'pair': (winner['model'], winner['provider']),
+        'content': outcome['content'],
+        'usage': outcome['usage'],
+        'attempts': report,
+    }
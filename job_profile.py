@@ -0,0 +1,141 @@
+import json
+import re
+import textwrap
+import threading
+
+from cache import make_key
+from prompt import compact_text, estimate_tokens
+from scheduler import SingleFlight, get_scheduler
+from tracing import span
+from utils import call_provider
+
+# Bump when the instructions or the profile fields change, so cached profiles are rebuilt
+PROFILE_VERSION = 1
+
+PROFILE_INSTRUCTIONS = textwrap.dedent("""
+    You extract hiring requirements from a job description for an applicant tracking system.
+
+    Reply with only a JSON object, without commentary or code fences, with these keys:
+    - "title": the job title.
+    - "seniority": one of "intern", "junior", "mid", "senior", "lead", "principal" or "unknown".
+    - "must_have": required skills, tools and qualifications, each a short phrase.
+    - "nice_to_have": preferred but optional skills, each a short phrase.
+    - "keywords": the terms an ATS would match on, most important first, at most 30.
+    - "responsibilities": the main duties, each a short phrase, at most 8.
+    - "summary": one sentence describing the role.
+    """).strip()
+
+PROFILE_FIELDS = ('title', 'seniority', 'must_have', 'nice_to_have', 'keywords', 'responsibilities', 'summary')
+
+_JSON_OBJECT = re.compile(r'\{.*\}', re.S)
+
+# Profiles built by this process, keyed like the disk cache
+_profiles = {}
+_profiles_lock = threading.Lock()
+_profile_flights = SingleFlight()
+
+
+def parse_profile(text):
+    """
+    Parse the model's JSON reply into a profile dict with every field present.
+
+    Code fences and text around the JSON object are ignored. Returns None
+    when no usable object is found.
+    """
+    match = _JSON_OBJECT.search(text or '')
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    profile = {}
+    for field in PROFILE_FIELDS:
+        value = data.get(field)
+        if field in ('title', 'seniority', 'summary'):
+            profile[field] = str(value).strip() if value else ('unknown' if field == 'seniority' else '')
+        else:
+            values = value if isinstance(value, list) else [value] if value else []
+            profile[field] = [str(item).strip() for item in values if str(item).strip()]
+    if not (profile['must_have'] or profile['keywords']):
+        return None
+    return profile
+
+
+def format_profile(profile):
+    """Render a profile as the compact text that stands in for the job description."""
+    lines = ["Job Description (requirements profile extracted from the posting):"]
+    if profile['title']:
+        lines.append(f"Title: {profile['title']}")
+    lines.append(f"Seniority: {profile['seniority']}")
+    if profile['summary']:
+        lines.append(f"Summary: {profile['summary']}")
+    for label, field in (('Must have', 'must_have'), ('Nice to have', 'nice_to_have'),
+                         ('Responsibilities', 'responsibilities'), ('Keywords', 'keywords')):
+        if profile[field]:
+            lines.append(f"{label}: {'; '.join(profile[field])}")
+    return '\n'.join(lines)
+
+
+def build_job_profile(job_description, api_key, model, provider_name, cache=None):
+    """
+    Turn a job description into a requirements profile, once per posting.
+
+    Profiles are kept in memory and, when `cache` (a `cache.DiskCache`) is
+    given, on disk, keyed by the compacted job description, model and
+    provider. Concurrent calls for the same posting share one extraction.
+    Returns (profile, info) where info has `cached` and the `usage` of the
+    extraction call; the profile is None if the model's reply could not be
+    parsed.
+    """
+    job_description = compact_text(job_description)
+    key = make_key('job_profile', PROFILE_VERSION, job_description, model, provider_name)
+
+    with _profiles_lock:
+        profile = _profiles.get(key)
+    if profile is None and cache is not None:
+        profile = cache.get(key)
+    if profile is not None:
+        with _profiles_lock:
+            _profiles[key] = profile
+        # False records a reply that could not be parsed, so it is not requested again
+        return profile or None, {'cached': True, 'usage': None}
+
+    def extract():
+        messages = [{'role': 'system', 'content': PROFILE_INSTRUCTIONS}, {'role': 'user', 'content': job_description}]
+        estimated_tokens = estimate_tokens(PROFILE_INSTRUCTIONS) + estimate_tokens(job_description)
+        scheduler = get_scheduler(provider_name)
+        with span('job_profile', model=model, provider=provider_name, estimated_tokens=estimated_tokens) as current:
+            text, usage = scheduler.run(lambda: call_provider(messages, api_key, model, provider_name, mode='job_profile'), estimated_tokens=estimated_tokens)
+            scheduler.record_usage(estimated_tokens, (usage or {}).get('total_tokens'))
+            profile = parse_profile(text)
+            current.set(parsed=profile is not None)
+
+        with _profiles_lock:
+            _profiles[key] = profile or False
+        if profile is not None and cache is not None:
+            cache.set(key, profile)
+        return profile, usage
+
+    # Rows of a batch sharing a posting wait for the one extraction already running
+    (profile, usage), shared = _profile_flights.do(key, extract)
+    if shared:
+        return profile, {'cached': True, 'usage': None}
+    return profile, {'cached': False, 'usage': usage}
+
+
+def profile_documents(documents, api_key, model, provider_name, cache=None):
+    """
+    Replace the job description (the last document) with its requirements profile.
+
+    Returns (documents, info) from `build_job_profile`; the documents are
+    returned unchanged when the profile could not be built.
+    """
+    profile, info = build_job_profile(documents[-1], api_key, model, provider_name, cache=cache)
+    info['profiled'] = profile is not None
+    if profile is None:
+        return list(documents), info
+    return list(documents[:-1]) + [format_profile(profile)], info
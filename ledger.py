@@ -0,0 +1,276 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import click
+
+from cache import default_cache_dir
+from tracing import add_metrics_hook, remove_metrics_hook
+
+LEDGER_FILE = 'ledger.sqlite3'
+
+# USD per million prompt and completion tokens; override or extend with the [prices] config table
+DEFAULT_PRICES = {
+    'llama3-8b-8192': (0.05, 0.08),
+    'llama3-70b-8192': (0.59, 0.79),
+    'llama-3.1-8b-instant': (0.05, 0.08),
+    'llama-3.1-70b-versatile': (0.59, 0.79),
+    'mixtral-8x7b-32768': (0.24, 0.24),
+    'gemma2-9b-it': (0.20, 0.20),
+}
+
+# --model auto: calls a pair needs before its latency is trusted, and how often slower pairs are re-probed
+MIN_SAMPLES = 3
+DEFAULT_REPROBE_AFTER = 24 * 60 * 60
+RECENT_CALLS = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    model TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    mode TEXT,
+    stream INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    error TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    total_tokens INTEGER,
+    latency REAL NOT NULL,
+    ttft REAL
+);
+CREATE INDEX IF NOT EXISTS calls_pair ON calls (model, provider, ts);
+"""
+
+
+def open_ledger(cache_dir=None):
+    """Open the ledger in `cache_dir` (default: the per-user cache directory)."""
+    directory = cache_dir or default_cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    return Ledger(os.path.join(directory, LEDGER_FILE))
+
+
+def percentile(values, percent):
+    """Return the nearest-rank `percent` percentile of `values`, or None if there are none."""
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def call_cost(model, prompt_tokens, completion_tokens, prices=None):
+    """Return the USD cost of a call, or None when the model's price is unknown."""
+    price = (prices or {}).get(model) or DEFAULT_PRICES.get(model)
+    if model.endswith(':free'):
+        price = (0, 0)
+    if price is None:
+        return None
+    if isinstance(price, dict):
+        price = (price.get('prompt', 0), price.get('completion', 0))
+    return ((prompt_tokens or 0) * price[0] + (completion_tokens or 0) * price[1]) / 1e6
+
+
+class Ledger:
+    """
+    One row per provider request: model, provider, mode, tokens, latency,
+    time to first token and outcome.
+
+    `attach` registers `observe` as a tracing metrics hook, so every
+    request made until `close` is recorded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._warned = False
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        # Write-ahead logging lets concurrent runs append while `stats` reads
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(_SCHEMA)
+
+    def attach(self):
+        add_metrics_hook(self.observe)
+        return self
+
+    def close(self):
+        remove_metrics_hook(self.observe)
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def observe(self, name, duration, args):
+        """Metrics hook recording each finished 'request' span."""
+        if name != 'request' or not args.get('model'):
+            return
+        error = args.get('error')
+        if error == 'Cancelled' and not args.get('estimated'):
+            # A raced request is recorded with its estimated usage when it is cancelled (hedge.race_pairs);
+            # its own span may only end long after, once the ledger is closed
+            return
+        status = 'ok' if error is None else 'cancelled' if error == 'Cancelled' else 'error'
+        ttft = args['ttfb_ms'] / 1000 if args.get('ttfb_ms') is not None else None
+        try:
+            self.record(args['model'], args.get('provider'), duration, mode=args.get('mode'), stream=args.get('stream', False),
+                        status=status, error=error, ttft=ttft, usage=args)
+        except sqlite3.Error as e:
+            # The hook runs as the request span ends; a locked or broken ledger must not fail a paid-for response
+            if not self._warned:
+                self._warned = True
+                click.echo(f"Warning: could not record calls in the usage ledger {self.path}: {e}", err=True)
+
+    def record(self, model, provider, latency, mode=None, stream=False, status='ok', error=None, ttft=None, usage=None, ts=None):
+        usage = usage or {}
+        row = (time.time() if ts is None else ts, model, provider, mode, int(bool(stream)), status, error,
+               usage.get('prompt_tokens'), usage.get('completion_tokens'), usage.get('total_tokens'), latency, ttft)
+        with self._lock:
+            # A request still winding down after `close` is not recorded
+            if self._connection is None:
+                return
+            self._connection.execute(
+                'INSERT INTO calls (ts, model, provider, mode, stream, status, error, prompt_tokens, completion_tokens, '
+                'total_tokens, latency, ttft) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', row)
+            self._connection.commit()
+
+    def calls(self, since=None, model=None, provider=None, limit=None):
+        """Return recorded calls as dicts, newest first."""
+        query, params = 'SELECT * FROM calls WHERE 1=1', []
+        for column, operator, value in (('ts', '>=', since), ('model', '=', model), ('provider', '=', provider)):
+            if value is not None:
+                query += f' AND {column} {operator} ?'
+                params.append(value)
+        query += ' ORDER BY ts DESC, id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            cursor = self._connection.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def summary(self, since=None, model=None, provider=None, prices=None):
+        """
+        Summarize calls per model/provider pair.
+
+        Returns a list of dicts with call and error counts, latency and time
+        to first token percentiles (seconds), token totals and the cost in
+        USD (None when a model's price is unknown), busiest pair first.
+        """
+        pairs = {}
+        for call in self.calls(since=since, model=model, provider=provider):
+            pairs.setdefault((call['model'], call['provider']), []).append(call)
+
+        summary = []
+        for (model_name, provider_name), calls in pairs.items():
+            succeeded = [call for call in calls if call['status'] == 'ok']
+            costs = [call_cost(model_name, call['prompt_tokens'], call['completion_tokens'], prices) for call in calls]
+            latencies = [call['latency'] for call in succeeded]
+            ttfts = [call['ttft'] for call in succeeded]
+            summary.append({
+                'model': model_name,
+                'provider': provider_name,
+                'calls': len(calls),
+                'errors': sum(call['status'] == 'error' for call in calls),
+                'cancelled': sum(call['status'] == 'cancelled' for call in calls),
+                'latency_p50': percentile(latencies, 50),
+                'latency_p95': percentile(latencies, 95),
+                'latency_p99': percentile(latencies, 99),
+                'ttft_p50': percentile(ttfts, 50),
+                'ttft_p95': percentile(ttfts, 95),
+                'prompt_tokens': sum(call['prompt_tokens'] or 0 for call in calls),
+                'completion_tokens': sum(call['completion_tokens'] or 0 for call in calls),
+                'total_tokens': sum(call['total_tokens'] or 0 for call in calls),
+                'cost': None if any(cost is None for cost in costs) else sum(costs),
+                'last_call': max(call['ts'] for call in calls),
+            })
+        summary.sort(key=lambda pair: (-pair['calls'], pair['model'], pair['provider']))
+        return summary
+
+
+def select_pair(ledger, candidates, objective='latency', latency_slo=None, reprobe_after=DEFAULT_REPROBE_AFTER, prices=None, now=None):
+    """
+    Pick the model/provider pair for `--model auto` from the ledger's recent calls.
+
+    Pairs with fewer than MIN_SAMPLES recorded calls are probed first, then
+    any pair not used for `reprobe_after` seconds, so a slower pair that
+    recovered is noticed. Otherwise the pairs whose p95 latency meets
+    `latency_slo` (seconds) compete on `objective`: 'latency' (lowest p95)
+    or 'cost' (lowest mean cost per call). Pairs failing at least half of
+    their recent calls are only used when every pair is failing. When none
+    meets the SLO, the fastest pair is used. Returns (model, provider, reason).
+    """
+    now = time.time() if now is None else now
+    stats = []
+    for model, provider in candidates:
+        calls = ledger.calls(model=model, provider=provider, limit=RECENT_CALLS)
+        # Failed calls count as probes too, so a pair that always fails is not probed forever
+        if len(calls) < MIN_SAMPLES:
+            return model, provider, f"probing: {len(calls)} of {MIN_SAMPLES} calls recorded"
+        succeeded = [call for call in calls if call['status'] == 'ok']
+        costs = [call_cost(model, call['prompt_tokens'], call['completion_tokens'], prices) for call in succeeded]
+        p95 = percentile([call['latency'] for call in succeeded], 95)
+        stats.append({
+            'pair': (model, provider),
+            'p95': float('inf') if p95 is None else p95,
+            'cost': None if not costs or any(cost is None for cost in costs) else sum(costs) / len(costs),
+            'errors': sum(call['status'] == 'error' for call in calls) / len(calls),
+            'last_call': calls[0]['ts'],
+        })
+
+    stale = [pair for pair in stats if now - pair['last_call'] > reprobe_after]
+    if stale:
+        pair = min(stale, key=lambda pair: pair['last_call'])
+        return pair['pair'] + (f"re-probing: unused for {(now - pair['last_call']) / 3600:.1f}h",)
+
+    # Pairs failing most of their recent calls only serve as a last resort
+    healthy = [pair for pair in stats if pair['errors'] < 0.5] or stats
+    within_slo = [pair for pair in healthy if latency_slo is None or pair['p95'] <= latency_slo]
+    if not within_slo:
+        pair = min(healthy, key=lambda pair: pair['p95'])
+        return pair['pair'] + (f"no pair meets the {latency_slo}s SLO; fastest p95 {pair['p95']:.2f}s",)
+    if objective == 'cost':
+        pair = min(within_slo, key=lambda pair: (float('inf') if pair['cost'] is None else pair['cost'], pair['p95']))
+        cost = 'unknown cost' if pair['cost'] is None else f"${pair['cost']:.6f} per call"
+        return pair['pair'] + (f"cheapest within SLO: {cost}, p95 {pair['p95']:.2f}s",)
+    pair = min(within_slo, key=lambda pair: pair['p95'])
+    return pair['pair'] + (f"fastest: p95 {pair['p95']:.2f}s",)
+
+
+def _seconds(value):
+    return '-' if value is None else f'{value:.2f}s'
+
+
+@click.command()
+@click.option('--since', type=click.FloatRange(min=0), default=None, help='Only include calls from the last this many days.')
+@click.option('--model', '-m', default=None, help='Only include calls to this model.')
+@click.option('--provider', '-p', default=None, help='Only include calls to this provider.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the summary as JSON.')
+@click.option('--cache-dir', default=None, type=click.Path(file_okay=False), help='Directory holding the ledger (default: ~/.cache/tailor4job).')
+def stats(since, model, provider, as_json, cache_dir):
+    """Summarize recorded provider calls: latency percentiles, tokens and cost per model."""
+    from main import load_config
+
+    config = load_config()
+    ledger = open_ledger(cache_dir or config.get('cache_dir'))
+    try:
+        summary = ledger.summary(since=time.time() - since * 86400 if since is not None else None,
+                                 model=model, provider=provider, prices=config.get('prices'))
+    finally:
+        ledger.close()
+
+    if as_json:
+        click.echo(json.dumps(summary, indent=2))
+        return
+    if not summary:
+        click.echo('No provider calls recorded yet.', err=True)
+        return
+
+    click.echo(f"{'Model (provider)':<48} {'Calls':>6} {'Errors':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'TTFT p50':>9} {'Tokens':>9} {'Cost':>10}")
+    for pair in summary:
+        name = f"{pair['model']} ({pair['provider']})"
+        cost = '-' if pair['cost'] is None else f"${pair['cost']:.4f}"
+        click.echo(f"{name:<48} {pair['calls']:>6} {pair['errors']:>6} {_seconds(pair['latency_p50']):>7} {_seconds(pair['latency_p95']):>7} "
+                   f"{_seconds(pair['latency_p99']):>7} {_seconds(pair['ttft_p50']):>9} {pair['total_tokens']:>9} {cost:>10}")
@@ -1,22 +1,14 @@
 import click
 import os
 import sys
+import importlib
 import toml
-from utils import process_files, generate_output
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Function to get the correct API key based on the provider
-def get_api_key(provider_name):
-    """Fetch the correct API key based on the provider."""
-    if provider_name == 'groq':
-        return os.getenv('GROQ_API_KEY')
-    elif provider_name == 'openrouter':
-        return os.getenv('OPENROUTER_API_KEY')
-    else:
-        raise Exception(f"Unsupported provider: {provider_name}")
+from concurrent.futures import ThreadPoolExecutor
+from utils import get_api_key, read_documents, process_content, generate_output, configure_clients, configure_input_limits, coalesce_stats
+from prompt import prepare_prompt
+from cache import open_cache
+from scheduler import configure_scheduler
+from tracing import span, start_trace, write_trace
 
 # Path to the TOML config file in the home directory
 def load_config():
@@ -30,21 +22,151 @@ def load_config():
         sys.exit(1)
 
 # Function to process model and provider pairs
-def process_model_provider(model_name, provider_name, files, api_key, analysis_mode, token_usage):
+def process_model_provider(model_name, provider_name, content, api_key, analysis_mode, token_usage, cache=None, on_chunk=None, timing=None, max_prompt_tokens=None):
     click.echo(f"Processing files using {model_name} model and {provider_name} provider", err=True)
-    tailored_content, token_info = process_files(files, api_key, model_name, analysis_mode, token_usage, provider_name)
+    with span('model_provider', model=model_name, provider=provider_name):
+        tailored_content, token_info = process_content(content, api_key, model_name, analysis_mode, token_usage, provider_name, cache=cache, on_chunk=on_chunk, timing=timing, max_prompt_tokens=max_prompt_tokens)
     return tailored_content, token_info
 
-@click.command()
+def run_model_provider(model_name, provider_name, content, analysis_mode, token_usage, cache=None, on_chunk=None, max_prompt_tokens=None, job_profile=False, profile_cache=None):
+    """
+    Resolve the API key and process one model/provider pair, returning its result and timing.
+
+    With `job_profile`, the job description is first condensed into a cached
+    requirements profile, which is sent in its place.
+    """
+    api_key = get_api_key(provider_name)
+    timing = {}
+    if job_profile:
+        from job_profile import profile_documents
+        content, timing['job_profile'] = profile_documents(content, api_key, model_name, provider_name, cache=profile_cache)
+    tailored_content, token_info = process_model_provider(model_name, provider_name, content, api_key, analysis_mode, token_usage, cache=cache, on_chunk=on_chunk, timing=timing, max_prompt_tokens=max_prompt_tokens)
+    return tailored_content, token_info, timing
+
+def run_pairs(pairs, content, analysis_mode, token_usage, concurrency, cache=None, on_chunk=None, max_prompt_tokens=None, job_profile=False, profile_cache=None):
+    """
+    Send the same content to every model/provider pair, at most `concurrency` at a time.
+
+    Yields (model_name, provider_name, future) in the order the pairs were given,
+    so callers can emit results deterministically while later pairs still run.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            (model_name, provider_name, executor.submit(run_model_provider, model_name, provider_name, content, analysis_mode, token_usage, cache, on_chunk, max_prompt_tokens, job_profile, profile_cache))
+            for model_name, provider_name in pairs
+        ]
+        for model_name, provider_name, future in futures:
+            yield model_name, provider_name, future
+
+def run_race(pairs, content, analysis_mode, token_usage, cache, max_prompt_tokens, race_delay, latency_cache, output, pdf_backend):
+    """Race the two pairs, emit the winning analysis and report every pair's latency and usage."""
+    from hedge import hedge_delay, race_pairs
+
+    delay = hedge_delay(race_delay, pairs[0], latency_cache)
+    click.echo(f"Racing {pairs[0][0]} ({pairs[0][1]}) against {pairs[1][0]} ({pairs[1][1]}) after {delay:.2f}s", err=True)
+    result = race_pairs(pairs[0], pairs[1], content, analysis_mode, delay, cache=cache, max_prompt_tokens=max_prompt_tokens, latency_cache=latency_cache)
+
+    if output:
+        generate_output(result['content'], output, pdf_backend=pdf_backend)
+        click.echo(f"Output saved to {output}", err=True)
+    else:
+        click.echo(result['content'])
+
+    click.echo(f"Race winner: {result['pair'][0]} ({result['pair'][1]})", err=True)
+    for attempt in result['attempts']:
+        latency = f", {attempt['latency']:.2f}s" if attempt['latency'] is not None else ''
+        line = f"  {attempt['role']} {attempt['model']} ({attempt['provider']}): {attempt['status']}{latency}"
+        if token_usage and attempt['usage']:
+            estimated = ' (estimated)' if attempt['usage'].get('estimated') else ''
+            line += f", {attempt['usage']['total_tokens']} tokens{estimated}"
+        click.echo(line, err=True)
+
+def run_watch(model_name, provider_name, files, analysis_mode, token_usage, cache, text_cache, max_prompt_tokens, output, pdf_backend, debounce):
+    """
+    Analyze the files, then re-analyze and re-render the report whenever one changes.
+
+    A detailed analysis is split into sections that are only re-requested
+    when their own documents changed.
+    """
+    from watch import analyze_sections, watch_files
+
+    api_key = get_api_key(provider_name)
+    memo = {}
+    output_filename = f"{model_name.replace('/', '_').replace(':', '_')}_{output}" if output else None
+
+    def analyze(changed=None):
+        if changed:
+            click.echo(f"Changed: {', '.join(changed)}", err=True)
+        try:
+            content = read_documents(files, cache=text_cache)
+            with span('model_provider', model=model_name, provider=provider_name):
+                report, info = analyze_sections(content, api_key, model_name, analysis_mode, provider_name, cache=cache, memo=memo, max_prompt_tokens=max_prompt_tokens)
+            if output_filename:
+                generate_output(report, output_filename, pdf_backend=pdf_backend)
+                click.echo(f"Output saved to {output_filename}", err=True)
+            else:
+                click.echo(report)
+        except Exception as e:
+            # Keep watching: the next save may fix the problem
+            click.echo(f'Error: {e}', err=True)
+            return
+        click.echo('Sections: ' + ', '.join(f'{name} {status}' for name, status in info['sections'].items()), err=True)
+        if token_usage and info['usage']:
+            click.echo(f"Prompt Tokens: {info['usage']['prompt_tokens']}\nCompletion Tokens: {info['usage']['completion_tokens']}\nTotal Tokens: {info['usage']['total_tokens']}", err=True)
+
+    analyze()
+    click.echo(f"Watching {len(files)} files for changes (Ctrl+C to stop)", err=True)
+    try:
+        watch_files(list(files), analyze, debounce=debounce)
+    except KeyboardInterrupt:
+        pass
+
+def auto_pair(config, ledger, provider=None):
+    """Pick the pair for --model auto among the [auto] config candidates, using the ledger."""
+    from ledger import DEFAULT_REPROBE_AFTER, select_pair
+
+    settings = config.get('auto', {})
+    candidates = [tuple(candidate) for candidate in settings.get('candidates', []) if not provider or candidate[1] == provider]
+    if not candidates:
+        raise Exception('--model auto needs candidate pairs in the [auto] table of ~/.tailor4job_config.toml, e.g. candidates = [["llama3-8b-8192", "groq"]]')
+    if ledger is None:
+        raise Exception('--model auto needs the usage ledger; remove "ledger = false" from ~/.tailor4job_config.toml.')
+    model_name, provider_name, reason = select_pair(
+        ledger, candidates, objective=settings.get('objective', 'latency'), latency_slo=settings.get('latency_slo'),
+        reprobe_after=settings.get('reprobe_after', DEFAULT_REPROBE_AFTER), prices=config.get('prices'))
+    click.echo(f"Auto-selected {model_name} ({provider_name}): {reason}", err=True)
+    return model_name, provider_name
+
+# Subcommands dispatched ahead of the default analysis command: name -> (module, command)
+SUBCOMMANDS = {
+    'batch': ('batch', 'batch'),
+    'serve': ('server', 'serve'),
+    'stats': ('ledger', 'stats'),
+    'render': ('bulk', 'render'),
+}
+
+@click.command(epilog="Subcommands: 'tailor4job batch --help' screens many candidates from a manifest; 'tailor4job serve --help' runs an HTTP job API; 'tailor4job stats --help' summarizes recorded provider calls; 'tailor4job render --help' renders batch results into one document or archive.")
 @click.option('--version', '-v', is_flag=True, help='Prints the tool’s name and current version.')
-@click.option('--model', '-m', default=None, help='Specify the model(s) to use, comma-separated for multiple models.')
+@click.option('--model', '-m', default=None, help="Specify the model(s) to use, comma-separated for multiple models, or 'auto' to pick from the [auto] config candidates.")
 @click.option('--provider', '-p', default=None, help='Specify the provider(s) to use, comma-separated for multiple providers.')
 @click.option('--output', '-o', default=None, help='Specify an output filename (base name for multiple models).')
-@click.option('--analysis_mode', '-a', type=click.Choice(['basic', 'detailed'], case_sensitive=False), default=None, help='Choose between basic or detailed analysis.')
+@click.option('--analysis_mode', '-a', type=click.Choice(['basic', 'detailed', 'local'], case_sensitive=False), default=None, help='Choose between basic or detailed analysis, or a local keyword-based ATS score without calling a model.')
 @click.option('--token-usage', '-t', is_flag=True, help='Show token usage information.')
+@click.option('--concurrency', '-c', type=click.IntRange(min=1), default=None, help='Maximum number of model/provider pairs processed at the same time (default: 4).')
+@click.option('--stream', '-s', is_flag=True, help='Print the analysis to stdout as it is generated.')
+@click.option('--max-prompt-tokens', type=click.IntRange(min=1), default=None, help="Trim the longest documents so the prompt fits this many tokens (default: the model's context window).")
+@click.option('--dry-run', is_flag=True, help='Print the estimated prompt size for each model without calling any provider.')
+@click.option('--no-cache', is_flag=True, help='Always call the provider instead of reusing cached responses.')
+@click.option('--cache-dir', default=None, type=click.Path(file_okay=False), help='Directory for cached responses (default: ~/.cache/tailor4job).')
+@click.option('--job-profile', is_flag=True, default=None, help='Condense the job description into a cached requirements profile first and compare the candidate against that.')
+@click.option('--race', is_flag=True, help='Hedge two model/provider pairs: start the second if the first is slow, keep the first answer and cancel the other.')
+@click.option('--race-delay', default=None, help="Seconds to wait before starting the backup pair, or a latency percentile of the primary such as p95 (default: p95).")
+@click.option('--profile', default=None, type=click.Path(dir_okay=False), help='Write a Chrome trace (JSON) of every stage of the run to this file.')
+@click.option('--watch', '-w', is_flag=True, help='Keep running and re-analyze when an input file changes, re-requesting only the sections whose documents changed.')
+@click.option('--debounce', type=click.FloatRange(min=0), default=None, help='Seconds the files must stay unchanged before --watch re-analyzes them (default: 1).')
 @click.argument('files', nargs=-1, type=click.Path(exists=True))
 
-def main(version, model, provider, output, files, analysis_mode, token_usage):
+def main(version, model, provider, output, files, analysis_mode, token_usage, concurrency, stream, max_prompt_tokens, dry_run, no_cache, cache_dir, job_profile, race, race_delay, profile, watch, debounce):
     # Load default config from the TOML file if available
     config = load_config()
 
@@ -65,8 +187,40 @@ def main(version, model, provider, output, files, analysis_mode, token_usage):
     provider = provider or config.get('provider')
     analysis_mode = analysis_mode or config.get('analysis_mode')
     output = output or config.get('output')
+    concurrency = concurrency or config.get('concurrency', 4)
+    cache_dir = cache_dir or config.get('cache_dir')
+    max_prompt_tokens = max_prompt_tokens or config.get('max_prompt_tokens')
+    job_profile = job_profile or config.get('job_profile', False)
+
+    # Record timed spans of every stage when profiling
+    if profile:
+        start_trace()
+
+    # Record every provider call in the usage ledger unless the config turns it off
+    ledger = None
+    if config.get('ledger', True):
+        from ledger import open_ledger
+        ledger = open_ledger(cache_dir).attach()
 
     try:
+        # Cap the size of input files, from the [input_limits] config table
+        configure_input_limits(**config.get('input_limits', {}))
+
+        # Local analysis scores keywords on this machine, without any model or provider
+        if analysis_mode == 'local':
+            from ats import local_report
+            report = local_report(read_documents(files), names=list(files))
+            if output:
+                generate_output(report, output, pdf_backend=config.get('pdf_backend'))
+                click.echo(f"Output saved to {output}", err=True)
+            else:
+                click.echo(report)
+            return
+
+        # Let the ledger pick the fastest or cheapest configured pair
+        if model == 'auto':
+            model, provider = auto_pair(config, ledger, provider)
+
         # Split the model and provider strings into lists
         model_name_list = model.split(',')
         provider_name_list = provider.split(',')
@@ -76,29 +230,134 @@ def main(version, model, provider, output, files, analysis_mode, token_usage):
             click.echo('Error: The number of models must match the number of providers.', err=True)
             sys.exit(1)
 
-        # Loop through each model and provider pair
-        for model_name, provider_name in zip(model_name_list, provider_name_list):
-            api_key = get_api_key(provider_name)
-            tailored_content, token_info = process_model_provider(model_name, provider_name, files, api_key, analysis_mode, token_usage)
+        if race and (len(model_name_list) != 2 or stream):
+            click.echo('Error: --race needs exactly two model/provider pairs (primary first) and cannot be combined with --stream.', err=True)
+            sys.exit(1)
 
-            # Sanitize model name for the output filename
-            sanitized_model_name = model_name.replace('/', '_').replace(':', '_')
+        if watch and (len(model_name_list) != 1 or race or stream or dry_run):
+            click.echo('Error: --watch needs a single model/provider pair and cannot be combined with --race, --stream or --dry-run.', err=True)
+            sys.exit(1)
 
-            # Generate a unique output filename for each model
-            if output:
-                output_filename = f"{sanitized_model_name}_{output}"
-                generate_output(tailored_content, output_filename)
-                click.echo(f"Output saved to {output_filename}", err=True)
-            else:
-                click.echo(tailored_content)
+        # Share one rate-limit budget per provider, from the [rate_limits.<provider>] config tables
+        for provider_name in set(provider_name_list):
+            configure_scheduler(provider_name, **config.get('rate_limits', {}).get(provider_name, {}))
+
+        # Size the shared provider connection pools for the pairs run at once
+        configure_clients(pool_size=max(concurrency, config.get('pool_size', 10)), connect_timeout=config.get('connect_timeout'), read_timeout=config.get('request_timeout'))
+
+        # Reuse parsed documents and responses for unchanged inputs unless caching is disabled
+        text_cache = None if no_cache else open_cache(cache_dir, namespace='text', max_mb=config.get('cache_max_mb'))
+        cache = None if no_cache else open_cache(cache_dir, max_mb=config.get('cache_max_mb'), ttl=config.get('cache_ttl'))
+
+        # Re-analyze on every change until interrupted
+        if watch:
+            run_watch(model_name_list[0], provider_name_list[0], files, analysis_mode, token_usage, cache, text_cache, max_prompt_tokens,
+                      output, config.get('pdf_backend'), debounce if debounce is not None else config.get('watch_debounce', 1.0))
+            return
+
+        # Read and parse the input files once for every pair
+        content = read_documents(files, cache=text_cache)
+
+        # Report the prompt each pair would send, then stop before any provider call
+        if dry_run:
+            for model_name in model_name_list:
+                _, prompt_info = prepare_prompt(content, analysis_mode, model_name, max_prompt_tokens)
+                limit = prompt_info['limit'] or 'unknown'
+                trimmed = ', '.join(files[index] for index in prompt_info['trimmed']) or 'none'
+                click.echo(f"{model_name}: ~{prompt_info['estimated_tokens']} prompt tokens (limit: {limit}, trimmed: {trimmed})")
+            return
+
+        # Hedge the primary pair with the backup and keep whichever answers first
+        if race:
+            run_race(list(zip(model_name_list, provider_name_list)), content, analysis_mode, token_usage, cache, max_prompt_tokens,
+                     race_delay or config.get('race_delay', 'p95'), None if no_cache else open_cache(cache_dir, namespace='latency'),
+                     output, config.get('pdf_backend'))
+            return
 
-            # Show token usage information if flag is set
-            if token_usage and token_info:
-                click.echo(f"Prompt Tokens: {token_info['prompt_tokens']}\nCompletion Tokens: {token_info['completion_tokens']}\nTotal Tokens: {token_info['total_tokens']}", err=True)
+        # Streamed pairs run one at a time so their output does not interleave
+        on_chunk = None
+        if stream:
+            concurrency = 1
+            def on_chunk(text):
+                click.echo(text, nl=False)
+
+        # Run the model and provider pairs concurrently, reporting in the given order
+        statuses = []
+        pairs = list(zip(model_name_list, provider_name_list))
+        profile_cache = None if no_cache else open_cache(cache_dir, namespace='profiles', max_mb=config.get('cache_max_mb'))
+        for model_name, provider_name, future in run_pairs(pairs, content, analysis_mode, token_usage, concurrency, cache, on_chunk, max_prompt_tokens, job_profile, profile_cache):
+            try:
+                tailored_content, token_info, timing = future.result()
+
+                # Sanitize model name for the output filename
+                sanitized_model_name = model_name.replace('/', '_').replace(':', '_')
+
+                # Finish the line of streamed text, which was printed as it arrived
+                if stream:
+                    click.echo()
+
+                # Generate a unique output filename for each model
+                if output:
+                    output_filename = f"{sanitized_model_name}_{output}"
+                    generate_output(tailored_content, output_filename, pdf_backend=config.get('pdf_backend'))
+                    click.echo(f"Output saved to {output_filename}", err=True)
+                elif not stream:
+                    click.echo(tailored_content)
+
+                # Show token usage information if flag is set
+                if token_usage and token_info:
+                    click.echo(f"Prompt Tokens: {token_info['prompt_tokens']}\nCompletion Tokens: {token_info['completion_tokens']}\nTotal Tokens: {token_info['total_tokens']}", err=True)
+                if token_usage and timing.get('job_profile'):
+                    profile_info = timing['job_profile']
+                    if not profile_info['profiled']:
+                        click.echo("Job Profile: could not be parsed, the full job description was sent", err=True)
+                    elif profile_info['cached']:
+                        click.echo("Job Profile: reused", err=True)
+                    else:
+                        click.echo(f"Job Profile Tokens: {(profile_info['usage'] or {}).get('total_tokens', 'unknown')}", err=True)
+                if token_usage and 'queue_wait' in timing:
+                    click.echo(f"Queue Wait: {timing['queue_wait']:.2f}s\nRequest Time: {timing['request_time']:.2f}s\nAttempts: {timing['attempts']}", err=True)
+                statuses.append((model_name, provider_name, 'ok'))
+            except Exception as e:
+                # A failing pair should not abort the others
+                click.echo(f'Error ({model_name}, {provider_name}): {e}', err=True)
+                statuses.append((model_name, provider_name, f'failed: {e}'))
+
+        # Print a final status summary when more than one pair was run
+        if len(statuses) > 1:
+            click.echo('Summary:', err=True)
+            for model_name, provider_name, status in statuses:
+                click.echo(f'  {model_name} ({provider_name}): {status}', err=True)
+
+        if token_usage and cache is not None:
+            stats = cache.stats()
+            click.echo(f"Cache: {stats['hits']} hits, {stats['misses']} misses", err=True)
+        if token_usage and coalesce_stats()['coalesced']:
+            click.echo(f"Coalesced Requests: {coalesce_stats()['coalesced']}", err=True)
+
+        if any(status != 'ok' for _, _, status in statuses):
+            sys.exit(1)
 
     except Exception as e:
         click.echo(f'Error: {e}', err=True)
         sys.exit(1)
 
+    finally:
+        if ledger is not None:
+            ledger.close()
+        if profile:
+            write_trace(profile)
+            click.echo(f"Profile saved to {profile}", err=True)
+
+def cli(args=None):
+    """Entry point that routes to a subcommand or the default analysis command."""
+    args = sys.argv[1:] if args is None else list(args)
+    if args and args[0] in SUBCOMMANDS:
+        module_name, command_name = SUBCOMMANDS[args[0]]
+        command = getattr(importlib.import_module(module_name), command_name)
+        command(args[1:], prog_name=f"tailor4job {args[0]}")
+    else:
+        main(args)
+
 if __name__ == '__main__':
-    main()
+    cli()
@@ -0,0 +1,265 @@
+import json
+import os
+import time
+
+from cache import make_key
+from prompt import prepare_prompt
+from scheduler import ProviderError, get_scheduler, parse_retry_after
+from tracing import span
+from utils import get_api_key, get_http_session, read_documents, usage_to_dict, _client_settings, _lazy
+
+# Providers with an OpenAI-style batch API: (base URL variable, default host, API root under it)
+BATCH_APIS = {'groq': ('GROQ_BASE_URL', 'https://api.groq.com', '/openai/v1')}
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+COMPLETION_WINDOW = '24h'
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+# Requests per submitted batch file; longer manifests are split into several batches
+MAX_BATCH_REQUESTS = 50000
+
+
+def batch_url(provider_name, path):
+    """Return the URL of `path` under the provider's batch API root."""
+    if provider_name not in BATCH_APIS:
+        raise Exception(f"The {provider_name} provider has no batch API. Offline runs support: {', '.join(BATCH_APIS)}")
+    variable, default, root = BATCH_APIS[provider_name]
+    return (os.getenv(variable) or default).rstrip('/') + root + path
+
+
+def _call(provider_name, api_key, method, path, **kwargs):
+    # Batch API calls share the provider's scheduler, so 429s and 5xxs are retried with backoff
+    def request():
+        session = get_http_session(provider_name, api_key)
+        try:
+            response = session.request(method, batch_url(provider_name, path),
+                                       timeout=(_client_settings['connect_timeout'], _client_settings['read_timeout']), **kwargs)
+        except _lazy('requests').exceptions.RequestException as e:
+            raise ProviderError(f"Could not reach the provider: {e}") from e
+        if response.status_code != 200:
+            raise ProviderError(f"Batch API request {method} {path} failed with status code {response.status_code}: {response.text}",
+                                response.status_code, parse_retry_after(response.headers))
+        return response
+    return get_scheduler(provider_name).run(request)
+
+
+def batch_line(custom_id, messages, model):
+    """One request line of a batch input file."""
+    return json.dumps({'custom_id': custom_id, 'method': 'POST', 'url': BATCH_ENDPOINT, 'body': {'model': model, 'messages': messages}})
+
+
+def upload_batch_file(path, api_key, provider_name='groq'):
+    """Upload a batch input .jsonl and return its file id."""
+    # Read once so a retried upload sends the same bytes (an open file would already be at EOF)
+    with open(path, 'rb') as file:
+        data = file.read()
+    response = _call(provider_name, api_key, 'POST', '/files', data={'purpose': 'batch'},
+                     files={'file': (os.path.basename(path), data, 'application/jsonl')})
+    return response.json()['id']
+
+
+def create_batch(input_file_id, api_key, provider_name='groq', metadata=None):
+    """Start a batch over an uploaded input file and return the batch object."""
+    body = {'input_file_id': input_file_id, 'endpoint': BATCH_ENDPOINT, 'completion_window': COMPLETION_WINDOW}
+    if metadata:
+        body['metadata'] = metadata
+    return _call(provider_name, api_key, 'POST', '/batches', json=body).json()
+
+
+def get_batch(batch_id, api_key, provider_name='groq'):
+    return _call(provider_name, api_key, 'GET', f'/batches/{batch_id}').json()
+
+
+def wait_for_batch(batch_id, api_key, provider_name='groq', poll_interval=30.0, on_status=None, sleep=time.sleep):
+    """Poll a batch every `poll_interval` seconds until it finishes and return the final batch object."""
+    while True:
+        batch = get_batch(batch_id, api_key, provider_name)
+        if on_status:
+            on_status(batch)
+        if batch['status'] in TERMINAL_STATUSES:
+            return batch
+        sleep(poll_interval)
+
+
+def iter_batch_results(batch, api_key, provider_name='groq'):
+    """Yield the parsed lines of a finished batch's output and error files, streamed."""
+    for file_id in (batch.get('output_file_id'), batch.get('error_file_id')):
+        if not file_id:
+            continue
+        response = _call(provider_name, api_key, 'GET', f'/files/{file_id}/content', stream=True)
+        try:
+            for line in response.iter_lines():
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            response.close()
+
+
+def result_record(line, record):
+    """Fill the batch results `record` from one line of a batch output or error file."""
+    response = line.get('response') or {}
+    body = response.get('body') or {}
+    if response.get('status_code') == 200 and body.get('choices'):
+        return dict(record, status='ok', analysis=body['choices'][0]['message']['content'], token_usage=usage_to_dict(body.get('usage')))
+    error = line.get('error') or body.get('error') or {}
+    message = error.get('message') if isinstance(error, dict) else str(error)
+    return dict(record, status='failed', error=f"Batch request failed with status code {response.get('status_code')}: {message}")
+
+
+def state_path(results_path):
+    """The file remembering submitted batches, so an interrupted run resumes instead of paying twice."""
+    return results_path + '.offline.json'
+
+
+def _save_state(path, state):
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+    os.replace(temporary, path)
+
+
+def prepare_batches(rows, results_path, model, provider, analysis_mode, api_key, emit, cache=None, text_cache=None, max_prompt_tokens=None):
+    """
+    Write, upload and start batches for `rows`; return the submission state.
+
+    Rows whose files cannot be read are emitted as failed and rows already in
+    the response cache are emitted straight away, so only new prompts are
+    submitted. Input files hold at most MAX_BATCH_REQUESTS lines each.
+    """
+    state = {'model': model, 'provider': provider, 'analysis_mode': analysis_mode, 'batches': [], 'keys': {}}
+    record = {'model': model, 'provider': provider, 'analysis_mode': analysis_mode}
+    file, lines = None, 0
+
+    def submit():
+        file.close()
+        with span('offline_submit', requests=lines):
+            batch = create_batch(upload_batch_file(file.name, api_key, provider), api_key, provider)
+        state['batches'].append({'id': batch['id'], 'input_file': file.name, 'status': batch['status']})
+        _save_state(state_path(results_path), state)
+
+    for row in rows:
+        try:
+            documents = read_documents(row['files'], cache=text_cache)
+            _, prompt_info = prepare_prompt(documents, analysis_mode, model, max_prompt_tokens)
+        except Exception as e:
+            emit(dict(record, id=row['id'], status='failed', error=str(e)))
+            continue
+        key = make_key(prompt_info['messages'], model, provider, analysis_mode)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            emit(dict(record, id=row['id'], status='ok', analysis=cached['content'], token_usage=cached['usage']))
+            continue
+
+        if row['id'] in state['keys']:
+            # Custom ids must be unique within a batch; the row's first occurrence is scored
+            continue
+        if file is None:
+            file = open(f"{results_path}.offline-{len(state['batches']) + 1}.jsonl", 'w', encoding='utf-8')
+        file.write(batch_line(row['id'], prompt_info['messages'], model) + '\n')
+        state['keys'][row['id']] = key
+        lines += 1
+        if lines >= MAX_BATCH_REQUESTS:
+            submit()
+            file, lines = None, 0
+    if file is not None:
+        submit()
+    return state
+
+
+def collect_batch(batch, state, api_key, emit, cache=None):
+    """Emit a record for every request of a finished batch, caching each successful response."""
+    record = {'model': state['model'], 'provider': state['provider'], 'analysis_mode': state['analysis_mode'], 'batch_id': batch['id']}
+    seen = set()
+    with span('offline_collect', batch=batch['id'], status=batch['status']) as current:
+        for line in iter_batch_results(batch, api_key, state['provider']):
+            row_id = line.get('custom_id')
+            if row_id in seen:
+                continue
+            seen.add(row_id)
+            result = result_record(line, dict(record, id=row_id))
+            key = state['keys'].get(row_id)
+            if cache is not None and key and result['status'] == 'ok':
+                cache.set(key, {'content': result['analysis'], 'usage': result['token_usage']})
+            emit(result)
+
+        # Requests an expired or failed batch never ran are recorded as failed, so a re-run retries them
+        with open(batch['input_file'], 'r', encoding='utf-8') as file:
+            for line in file:
+                row_id = json.loads(line)['custom_id']
+                if row_id not in seen:
+                    seen.add(row_id)
+                    emit(dict(record, id=row_id, status='failed', error=f"Batch {batch['status']} before this request ran"))
+        current.set(requests=len(seen))
+
+
+def run_offline_batch(manifest_path, results_path, model, provider, analysis_mode, on_record=None, on_status=None, cache=None,
+                      text_cache=None, max_prompt_tokens=None, poll_interval=30.0, wait=True, sleep=time.sleep):
+    """
+    Score every manifest row not already in the results file through the provider's batch API.
+
+    Prompts are built exactly as `run_batch` builds them, written to batch
+    input files next to the results file, uploaded and submitted. The run
+    then polls until every batch finishes and appends one record per row to
+    the results file in the same format as `run_batch`. Submitted batches
+    are remembered in `state_path(results_path)`: with `wait=False`, or after
+    an interruption, running again resumes polling instead of resubmitting.
+    Returns a dict of ok/failed/skipped/pending counts, plus the latest
+    state of each batch under `batches`.
+    """
+    from batch import load_completed_ids, read_manifest
+
+    # Fail before any prompt is written when the provider has no batch API
+    batch_url(provider, '')
+    api_key = get_api_key(provider)
+    completed = load_completed_ids(results_path)
+    counts = {'ok': 0, 'failed': 0, 'skipped': 0, 'pending': 0}
+    saved_state = state_path(results_path)
+
+    with open(results_path, 'a', encoding='utf-8') as results:
+        def emit(record):
+            results.write(json.dumps(record) + '\n')
+            results.flush()
+            counts[record['status']] += 1
+            if on_record:
+                on_record(record)
+
+        if os.path.exists(saved_state):
+            with open(saved_state, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            if (state['model'], state['provider'], state['analysis_mode']) != (model, provider, analysis_mode):
+                raise Exception(f"{saved_state} holds batches for {state['model']} ({state['provider']}, {state['analysis_mode']}); "
+                                "finish that run first or delete the file to discard it.")
+        else:
+            def remaining_rows():
+                for row in read_manifest(manifest_path):
+                    if row['id'] in completed:
+                        counts['skipped'] += 1
+                    elif 'error' in row:
+                        emit({'id': row['id'], 'model': model, 'provider': provider, 'analysis_mode': analysis_mode, 'status': 'failed', 'error': row['error']})
+                    else:
+                        yield row
+            state = prepare_batches(remaining_rows(), results_path, model, provider, analysis_mode, api_key, emit,
+                                    cache=cache, text_cache=text_cache, max_prompt_tokens=max_prompt_tokens)
+
+        batches = []
+        for submitted in list(state['batches']):
+            if wait:
+                batch = wait_for_batch(submitted['id'], api_key, provider, poll_interval, on_status, sleep)
+            else:
+                batch = get_batch(submitted['id'], api_key, provider)
+                if on_status:
+                    on_status(batch)
+            batches.append(batch)
+            if batch['status'] not in TERMINAL_STATUSES:
+                with open(submitted['input_file'], 'r', encoding='utf-8') as file:
+                    counts['pending'] += sum(1 for _ in file)
+                continue
+            collect_batch(dict(batch, input_file=submitted['input_file']), state, api_key, emit, cache)
+            state['batches'].remove(submitted)
+            _save_state(saved_state, state)
+            os.remove(submitted['input_file'])
+
+    if not state['batches'] and os.path.exists(saved_state):
+        os.remove(saved_state)
+    counts['batches'] = batches
+    return counts
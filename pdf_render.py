@@ -0,0 +1,395 @@
+import io
+import re
+import zlib
+
+# US Letter page and layout settings, in points
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 72
+BODY_SIZE = 11
+HEADING_SIZES = {1: 18, 2: 15, 3: 13}
+LINE_SPACING = 1.35
+INDENT = 18
+
+FONTS = {False: ('F1', 'Helvetica'), True: ('F2', 'Helvetica-Bold')}
+
+# Advance widths (per 1000 units of font size) of printable ASCII, from the standard Helvetica AFM files
+_ASCII = ''.join(chr(code) for code in range(32, 127))
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD_WIDTHS = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+WIDTHS = {
+    False: dict(zip(_ASCII, _HELVETICA_WIDTHS), **{'•': 350}),
+    True: dict(zip(_ASCII, _HELVETICA_BOLD_WIDTHS), **{'•': 350}),
+}
+
+
+
+# Typographic symbols common in model output that the built-in fonts lack, and the
+# plain text shown in their place; letters of other scripts are never substituted
+SYMBOL_SUBSTITUTES = {
+    '\u2192': '->',   # → rightwards arrow
+    '\u2190': '<-',   # ← leftwards arrow
+    '\u2194': '<->',  # ↔ left right arrow
+    '\u21d2': '=>',   # ⇒ rightwards double arrow
+    '\u2265': '>=',   # ≥
+    '\u2264': '<=',   # ≤
+    '\u2260': '!=',   # ≠
+    '\u2248': '~',    # ≈
+    '\u2713': '[x]',  # ✓ check mark
+    '\u2714': '[x]',  # ✔ heavy check mark
+    '\u2705': '[x]',  # ✅ check mark button
+    '\u2717': '[ ]',  # ✗ ballot x
+    '\u2718': '[ ]',  # ✘ heavy ballot x
+    '\u274c': '[ ]',  # ❌ cross mark
+    '\u2212': '-',    # − minus sign
+    '\u2010': '-',    # ‐ hyphen
+    '\u2011': '-',    # non-breaking hyphen
+    '\u2009': ' ',    # thin space
+    '\u202f': ' ',    # narrow no-break space
+    '\u200b': '',     # zero width space
+    '\ufe0f': '',     # emoji variation selector
+}
+_SUBSTITUTES = str.maketrans(SYMBOL_SUBSTITUTES)
+
+
+def substitute_symbols(text):
+    """Replace the typographic symbols in SYMBOL_SUBSTITUTES with their plain-text equivalents."""
+    return text.translate(_SUBSTITUTES)
+
+
+class UnsupportedCharacters(Exception):
+    """Raised when text holds characters the built-in fonts cannot show."""
+
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*)$')
+_NUMBERED = re.compile(r'^(\s*)(\d+[.)])\s+(.*)$')
+_BULLET = re.compile(r'^(\s*)[-*+]\s+(.*)$')
+
+
+def text_width(text, bold, size):
+    """Width of `text` in points when set in Helvetica (bold) at `size`."""
+    widths = WIDTHS[bold]
+    return sum(widths.get(char, 556) for char in text) * size / 1000
+
+
+def inline_runs(text):
+    """Split `**bold**` markdown into (text, bold) runs."""
+    parts = text.split('**')
+    # An unmatched ** is kept as literal text
+    if len(parts) % 2 == 0:
+        parts[-2] = parts[-2] + '**' + parts.pop()
+    return [(part, index % 2 == 1) for index, part in enumerate(parts) if part]
+
+
+def parse_markdown(content):
+    """
+    Turn model output into layout blocks.
+
+    Returns dicts with `kind` (heading, numbered, bullet, paragraph or
+    blank), indent `level`, list `marker` and inline (text, bold) `runs`.
+    Every source line stays its own block so line breaks are preserved.
+    """
+    blocks = []
+    for line in content.replace('\r\n', '\n').split('\n'):
+        if not line.strip():
+            blocks.append({'kind': 'blank'})
+            continue
+        heading = _HEADING.match(line)
+        numbered = _NUMBERED.match(line)
+        bullet = _BULLET.match(line)
+        if heading:
+            blocks.append({'kind': 'heading', 'level': len(heading.group(1)), 'runs': [(heading.group(2).replace('**', ''), True)]})
+        elif numbered:
+            level = len(numbered.group(1).expandtabs(4)) // 2
+            blocks.append({'kind': 'numbered', 'level': level, 'marker': numbered.group(2), 'runs': inline_runs(numbered.group(3))})
+        elif bullet:
+            level = len(bullet.group(1).expandtabs(4)) // 2
+            blocks.append({'kind': 'bullet', 'level': level, 'marker': '•', 'runs': inline_runs(bullet.group(2))})
+        else:
+            level = (len(line) - len(line.lstrip())) // 4
+            blocks.append({'kind': 'paragraph', 'level': level, 'runs': inline_runs(line.strip())})
+    return blocks
+
+
+def _wrap(runs, bold_default, size, max_width):
+    """
+    Break (text, bold) runs into lines of (word, bold, attached) tokens that fit `max_width`.
+
+    `attached` marks a word that continues the previous one without a space,
+    as in "**Summary**:" where the colon follows the bold run directly.
+    """
+    space = text_width(' ', False, size)
+    lines, line, line_width = [], [], 0.0
+    previous_ends_word = False
+    for text, bold in runs:
+        bold = bold or bold_default
+        words = text.split()
+        for position, word in enumerate(words):
+            attached = position == 0 and previous_ends_word and not text[0].isspace()
+            word_width = text_width(word, bold, size)
+            # Hard-break words wider than a whole line
+            while word_width > max_width and len(word) > 1:
+                cut = len(word)
+                while cut > 1 and text_width(word[:cut], bold, size) > max_width:
+                    cut -= 1
+                if line:
+                    lines.append(line)
+                lines.append([(word[:cut], bold, False)])
+                line, line_width = [], 0.0
+                word = word[cut:]
+                word_width = text_width(word, bold, size)
+            needed = word_width + (space if line and not attached else 0)
+            if line and line_width + needed > max_width:
+                lines.append(line)
+                line, line_width = [], 0.0
+                needed = word_width
+            line.append((word, bold, attached and bool(line)))
+            line_width += needed
+        if words:
+            previous_ends_word = not text[-1].isspace()
+    if line:
+        lines.append(line)
+    return lines
+
+
+def layout(blocks):
+    """
+    Position blocks on pages.
+
+    Returns a list of pages, each a list of (x, y, bold, size, text) runs.
+    """
+    pages = [[]]
+    y = PAGE_HEIGHT - MARGIN
+
+    for block in blocks:
+        if block['kind'] == 'blank':
+            y -= BODY_SIZE * 0.6
+            continue
+
+        is_heading = block['kind'] == 'heading'
+        size = HEADING_SIZES.get(block.get('level'), BODY_SIZE + 1) if is_heading else BODY_SIZE
+        leading = size * LINE_SPACING
+        x = MARGIN + (0 if is_heading else block['level'] * INDENT)
+        marker = block.get('marker')
+        text_x = x + (max(INDENT, text_width(marker, False, size) + 6) if marker else 0)
+        if is_heading:
+            y -= size * 0.4
+
+        for index, line in enumerate(_wrap(block['runs'], is_heading, size, PAGE_WIDTH - MARGIN - text_x) or [[]]):
+            if y - leading < MARGIN:
+                pages.append([])
+                y = PAGE_HEIGHT - MARGIN
+            y -= leading
+            if marker and index == 0:
+                pages[-1].append((x, y, False, size, marker))
+            # Merge neighbouring words in the same font into one text run
+            run_text, run_bold, run_x = '', None, text_x
+            for word, bold, attached in line:
+                if run_bold is not None and bold != run_bold:
+                    pages[-1].append((run_x, y, run_bold, size, run_text))
+                    run_x += text_width(run_text if attached else run_text + ' ', run_bold, size)
+                    run_text = ''
+                if run_text and not attached:
+                    run_text += ' '
+                run_text += word
+                run_bold = bold
+            if run_text:
+                pages[-1].append((run_x, y, run_bold, size, run_text))
+    return pages
+
+
+def unsupported_characters(text):
+    """
+    Return the characters of `text` the built-in Helvetica fonts cannot show,
+    in order of first appearance. They cover Windows-1252 (Western European)
+    text only; other scripts, most symbols and emoji are not included.
+    """
+    try:
+        text.encode('cp1252')
+        return ''
+    except UnicodeEncodeError:
+        return ''.join(dict.fromkeys(char for char in text if not _encodable(char)))
+
+
+def _encodable(char):
+    try:
+        char.encode('cp1252')
+        return True
+    except UnicodeEncodeError:
+        return False
+
+
+def check_characters(text):
+    """Raise UnsupportedCharacters naming every character of `text` the built-in fonts cannot show."""
+    missing = unsupported_characters(text)
+    if missing:
+        shown = ', '.join(missing[:10]) + (', ...' if len(missing) > 10 else '')
+        raise UnsupportedCharacters(f"The built-in PDF renderer only supports Western European (Windows-1252) text and cannot show: {shown}. "
+                                    "Save a .docx instead.")
+
+
+def _escape(text):
+    try:
+        data = text.encode('cp1252')
+    except UnicodeEncodeError:
+        # Never print '?' in place of a name: fail and let the caller pick another format or backend
+        check_characters(text)
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _text_string(text):
+    """A PDF text string for document metadata such as bookmark titles, in UTF-16 when it needs to be."""
+    if unsupported_characters(text):
+        return b'<FEFF%s>' % text.encode('utf-16-be').hex().upper().encode('ascii')
+    return b'(%s)' % _escape(text)
+
+
+class PdfWriter:
+    """
+    Write a PDF to a binary file object by object, so a long document is
+    never held in memory at once.
+
+    Pages are written as they are added; `close` writes the page tree (in
+    the order given to it, which may differ from the order pages were
+    added), the optional outline and the cross-reference table.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.position = 0
+        self.offsets = {}
+        self.next_id = 1
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self.catalog_id = self.reserve()
+        self.pages_id = self.reserve()
+        font_ids = {
+            bold: self.add(f"<< /Type /Font /Subtype /Type1 /BaseFont /{name} /Encoding /WinAnsiEncoding >>".encode('ascii'))
+            for bold, (_, name) in FONTS.items()
+        }
+        self.resources = ' '.join(f"/{FONTS[bold][0]} {font_ids[bold]} 0 R" for bold in FONTS)
+
+    def _write(self, data):
+        self.file.write(data)
+        self.position += len(data)
+
+    def reserve(self):
+        """Allocate an object number to be written later."""
+        object_id = self.next_id
+        self.next_id += 1
+        return object_id
+
+    def add(self, body, object_id=None):
+        """Write one object and return its number."""
+        object_id = object_id or self.reserve()
+        self.offsets[object_id] = self.position
+        self._write(b'%d 0 obj\n%s\nendobj\n' % (object_id, body))
+        return object_id
+
+    def add_page(self, runs):
+        """Write a page of (x, y, bold, size, text) runs and return its object number."""
+        stream = b''.join(
+            b'BT /%s %g Tf %.2f %.2f Td (%s) Tj ET\n' % (FONTS[bold][0].encode('ascii'), size, x, y, _escape(text))
+            for x, y, bold, size, text in runs
+        )
+        compressed = zlib.compress(stream)
+        content_id = self.add(b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(compressed), compressed))
+        return self.add(
+            f"<< /Type /Page /Parent {self.pages_id} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << {self.resources} >> >> /Contents {content_id} 0 R >>".encode('ascii')
+        )
+
+    def close(self, page_ids, outline=None):
+        """
+        Finish the file with `page_ids` as the page order.
+
+        `outline` is an optional list of (title, page id) bookmarks shown in
+        the viewer's sidebar.
+        """
+        kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+        self.add(f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode('ascii'), self.pages_id)
+
+        outlines = ''
+        if outline:
+            root_id = self.reserve()
+            item_ids = [self.reserve() for _ in outline]
+            for index, (title, page_id) in enumerate(outline):
+                links = b''.join(
+                    b' /%s %d 0 R' % (key, item_ids[other])
+                    for key, other in ((b'Prev', index - 1), (b'Next', index + 1)) if 0 <= other < len(item_ids)
+                )
+                self.add(b'<< /Title %s /Parent %d 0 R /Dest [%d 0 R /XYZ null null null]%s >>'
+                         % (_text_string(title), root_id, page_id, links), item_ids[index])
+            self.add(f"<< /Type /Outlines /First {item_ids[0]} 0 R /Last {item_ids[-1]} 0 R /Count {len(item_ids)} >>".encode('ascii'), root_id)
+            outlines = f" /Outlines {root_id} 0 R /PageMode /UseOutlines"
+        self.add(f"<< /Type /Catalog /Pages {self.pages_id} 0 R{outlines} >>".encode('ascii'), self.catalog_id)
+
+        xref = self.position
+        count = self.next_id
+        self._write(b'xref\n0 %d\n0000000000 65535 f \n' % count)
+        self._write(b''.join(b'%010d 00000 n \n' % self.offsets[object_id] for object_id in range(1, count)))
+        self._write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (count, self.catalog_id, xref))
+
+
+def build_pdf(pages):
+    """Serialize laid-out pages into PDF bytes using the standard Helvetica fonts."""
+    output = io.BytesIO()
+    writer = PdfWriter(output)
+    writer.close([writer.add_page(runs) for runs in pages])
+    return output.getvalue()
+
+
+def layout_contents(entries, title='Contents'):
+    """
+    Lay out a table of contents: one line per (title, page number) entry,
+    with the page numbers right-aligned.
+    """
+    pages = [[]]
+    y = PAGE_HEIGHT - MARGIN
+    heading_size = HEADING_SIZES[1]
+    y -= heading_size * LINE_SPACING
+    pages[-1].append((MARGIN, y, True, heading_size, title))
+    y -= BODY_SIZE
+
+    leading = BODY_SIZE * LINE_SPACING
+    right = PAGE_WIDTH - MARGIN
+    for entry_title, page_number in entries:
+        if y - leading < MARGIN:
+            pages.append([])
+            y = PAGE_HEIGHT - MARGIN
+        y -= leading
+        number = str(page_number)
+        number_x = right - text_width(number, False, BODY_SIZE)
+        # Shorten titles that would run into the page number
+        max_width = number_x - MARGIN - INDENT
+        while entry_title and text_width(entry_title, False, BODY_SIZE) > max_width:
+            entry_title = entry_title[:-2] + '…' if len(entry_title) > 1 else ''
+        pages[-1].append((MARGIN, y, False, BODY_SIZE, entry_title))
+        pages[-1].append((number_x, y, False, BODY_SIZE, number))
+    return pages
+
+
+def render_pdf_bytes(content):
+    """Render markdown `content` to PDF bytes, or raise UnsupportedCharacters."""
+    content = substitute_symbols(content)
+    check_characters(content)
+    return build_pdf(layout(parse_markdown(content)))
+
+
+def render_pdf(content, output_file):
+    """Render markdown `content` (headings, lists, bold) to a PDF file."""
+    with open(output_file, 'wb') as file:
+        file.write(render_pdf_bytes(content))
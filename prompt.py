@@ -0,0 +1,211 @@
+import math
+import re
+import textwrap
+
+# Instructions sent ahead of the documents for each analysis mode
+PROMPT_TEMPLATES = {
+    'detailed': textwrap.dedent("""
+        Attached are the Resume, Cover Letter, and Job Description for which the candidate is applying for the job.
+
+        What I want from you is to analyze the Resume and Cover Letter and compare them to the Job Description.
+
+        1. **Brief Introduction**:
+           - Introduce the job and the candidate (mention the name of the candidate from the Resume).
+
+        2. **Analysis Results**:
+           - Compare the Resume to the Job Description:
+             - Is the candidate a good fit or not?
+             - What are the candidate's strong points for this job?
+             - What are the candidate's weaknesses?
+             - How can the candidate improve the Resume?
+           - Compare the Cover Letter to the Job Description:
+             - Is the cover letter aligned with the job requirements?
+             - What improvements can be made?
+
+        3. **Summary**:
+           - Estimate the percentage chance that this Resume and Cover Letter can pass the ATS system for this job.
+           - List any important keywords that can be added to the Resume and Cover Letter.
+           - Suggest keywords that should be replaced with better alternatives.
+        """).strip(),
+    'basic': textwrap.dedent("""
+        Attached are the Resume, Cover Letter, and Job Description for which the candidate is applying for the job.
+
+        Please provide:
+        1. A brief introduction to the job and candidate.
+        2. An estimated percentage chance of the resume and cover letter passing an ATS system.
+        """).strip(),
+    # Sections of the detailed analysis, requested separately by --watch
+    'resume_section': textwrap.dedent("""
+        Attached are the candidate's Resume and the Job Description for which the candidate is applying.
+
+        1. Briefly introduce the job and the candidate (mention the name of the candidate from the Resume).
+        2. Compare the Resume to the Job Description:
+           - Is the candidate a good fit or not?
+           - What are the candidate's strong points for this job?
+           - What are the candidate's weaknesses?
+           - How can the candidate improve the Resume?
+        """).strip(),
+    'cover_letter_section': textwrap.dedent("""
+        Attached are the candidate's Cover Letter and the Job Description for which the candidate is applying.
+
+        Compare the Cover Letter to the Job Description:
+        - Is the cover letter aligned with the job requirements?
+        - What improvements can be made?
+        """).strip(),
+    'summary_section': textwrap.dedent("""
+        Attached are the Resume, Cover Letter, and Job Description for which the candidate is applying for the job.
+
+        Summarize:
+        - Estimate the percentage chance that this Resume and Cover Letter can pass the ATS system for this job.
+        - List any important keywords that can be added to the Resume and Cover Letter.
+        - Suggest keywords that should be replaced with better alternatives.
+        """).strip(),
+}
+
+# Context windows of known models, in tokens
+MODEL_CONTEXT_LIMITS = {
+    'llama3-8b-8192': 8192,
+    'llama3-70b-8192': 8192,
+    'llama-3.1-8b-instant': 131072,
+    'llama-3.1-70b-versatile': 131072,
+    'llama-3.3-70b-versatile': 131072,
+    'mixtral-8x7b-32768': 32768,
+    'gemma2-9b-it': 8192,
+}
+
+# Tokens left free in the context window for the model's answer
+RESERVED_COMPLETION_TOKENS = 1024
+
+# Lines shorter than this are kept even when repeated (headings, "Python", ...)
+MIN_DUPLICATE_LENGTH = 40
+
+TRUNCATION_MARKER = '\n[... truncated to fit the context window ...]\n'
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SPACES = re.compile(r'[ \t\f\v\u00a0]+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def estimate_tokens(text):
+    """
+    Estimate how many tokens `text` uses, without calling a tokenizer.
+
+    Words and punctuation marks count as one token each, with long words
+    counted as several, which tracks BPE tokenizers closely for English prose.
+    """
+    return sum(1 + len(piece) // 6 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def compact_text(text):
+    """
+    Normalize whitespace and drop repeated paragraphs.
+
+    Runs of spaces collapse to one, trailing spaces and extra blank lines are
+    removed, and a line (a .docx paragraph) of MIN_DUPLICATE_LENGTH or more
+    characters that already appeared earlier, ignoring case, is dropped.
+    """
+    lines = [_SPACES.sub(' ', line).strip() for line in text.replace('\r\n', '\n').split('\n')]
+    text = _BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+    seen = set()
+    paragraphs = []
+    for paragraph in text.split('\n\n'):
+        kept_lines = []
+        for line in paragraph.split('\n'):
+            key = line.lower()
+            if len(line) >= MIN_DUPLICATE_LENGTH:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept_lines.append(line)
+        if kept_lines:
+            paragraphs.append('\n'.join(kept_lines))
+    return '\n\n'.join(paragraphs)
+
+
+def context_limit(model):
+    """Return the context window of `model`, or None if it is unknown."""
+    if model in MODEL_CONTEXT_LIMITS:
+        return MODEL_CONTEXT_LIMITS[model]
+    # Groq-style names often end with the window size, e.g. mixtral-8x7b-32768
+    match = re.search(r'-(\d{4,6})$', model or '')
+    return int(match.group(1)) if match else None
+
+
+def fit_documents(documents, budget):
+    """
+    Trim documents so their estimated tokens add up to at most `budget`.
+
+    The longest documents are cut first: every document is capped at the
+    largest common size that fits, so shorter documents stay whole. Returns
+    the (possibly truncated) documents and the indexes that were trimmed.
+    """
+    sizes = [estimate_tokens(document) for document in documents]
+    if sum(sizes) <= budget:
+        return list(documents), []
+
+    # Find the largest cap where sum(min(size, cap)) fits the budget
+    cap = max(0, budget)
+    remaining = budget
+    for position, size in enumerate(sorted(sizes)):
+        share = remaining // (len(sizes) - position)
+        if size > share:
+            cap = share
+            break
+        remaining -= size
+
+    fitted = []
+    trimmed = []
+    marker_tokens = estimate_tokens(TRUNCATION_MARKER)
+    for index, (document, size) in enumerate(zip(documents, sizes)):
+        if size <= cap:
+            fitted.append(document)
+            continue
+        keep = max(0, cap - marker_tokens)
+        cut = math.floor(len(document) * keep / size)
+        # Token density varies along a document, so shrink until the estimate fits
+        kept_tokens = estimate_tokens(document[:cut])
+        while cut > 0 and kept_tokens > keep:
+            cut = math.floor(cut * keep / kept_tokens) - 1
+            kept_tokens = estimate_tokens(document[:cut])
+        # Prefer cutting at a line break so the last kept line is whole
+        line_end = document.rfind('\n', 0, cut)
+        if line_end > cut // 2:
+            cut = line_end
+        fitted.append(document[:cut].rstrip() + TRUNCATION_MARKER)
+        trimmed.append(index)
+    return fitted, trimmed
+
+
+def prepare_prompt(documents, mode, model, max_prompt_tokens=None):
+    """
+    Build the final prompt for `documents` and report its estimated size.
+
+    Documents are compacted, then trimmed longest-first to fit
+    `max_prompt_tokens` (or the model's context window minus room for the
+    answer, when the model is known). Returns (prompt, info) where info has
+    `estimated_tokens`, `limit`, the indexes of `trimmed` documents and the
+    chat `messages` to send: the mode's instructions as a system message,
+    identical for every request so providers can cache that prefix, and the
+    documents as the user message.
+    """
+    if isinstance(documents, str):
+        documents = [documents]
+    template = PROMPT_TEMPLATES.get(mode, PROMPT_TEMPLATES['basic'])
+    documents = [compact_text(document) for document in documents]
+
+    limit = max_prompt_tokens
+    if limit is None:
+        window = context_limit(model)
+        limit = window - RESERVED_COMPLETION_TOKENS if window else None
+
+    trimmed = []
+    if limit is not None:
+        # Separators between documents cost about one token each
+        budget = limit - estimate_tokens(template) - len(documents)
+        documents, trimmed = fit_documents(documents, budget)
+
+    user = '\n\n'.join(documents)
+    prompt = template + '\n\n' + user
+    messages = [{'role': 'system', 'content': template}, {'role': 'user', 'content': user}]
+    return prompt, {'estimated_tokens': estimate_tokens(prompt), 'limit': limit, 'trimmed': trimmed, 'messages': messages}
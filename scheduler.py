@@ -0,0 +1,227 @@
+import random
+import threading
+import time
+
+
+class ProviderError(Exception):
+    """
+    A failed provider request.
+
+    `status_code` is None for connection errors and timeouts; `retry_after`
+    holds the provider's Retry-After hint in seconds, when it sent one.
+    """
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+class SchedulerBusy(Exception):
+    """Raised when too many requests are already waiting for a provider."""
+
+
+def parse_retry_after(headers):
+    """Return the Retry-After header in seconds, or None if missing or unparsable."""
+    if not headers:
+        return None
+    value = headers.get('retry-after') or headers.get('Retry-After')
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at `rate_per_minute`.
+
+    The balance may go negative when a request turns out to cost more than was
+    reserved for it; later callers then wait for the debt to be repaid.
+    """
+
+    def __init__(self, rate_per_minute, clock=time.monotonic, sleep=time.sleep):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = rate_per_minute
+        self.tokens = float(rate_per_minute)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate_per_minute / 60.0)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Block until `amount` tokens are available, take them and return the seconds waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) * 60.0 / self.rate_per_minute
+            self._sleep(delay)
+            waited += delay
+
+    def adjust(self, amount):
+        """Take (positive) or return (negative) tokens without waiting."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RequestScheduler:
+    """
+    Shared gate in front of one provider's API.
+
+    Callers wait for a free slot (at most `max_in_flight` requests run at
+    once) and for the optional requests-per-minute and tokens-per-minute
+    budgets, then the request is retried on 429s, 5xxs and connection errors
+    with exponential backoff and full jitter, honoring Retry-After.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_in_flight=8, max_waiting=None,
+                 max_retries=4, base_delay=1.0, max_delay=60.0, clock=time.monotonic, sleep=time.sleep):
+        self.request_bucket = TokenBucket(requests_per_minute, clock, sleep) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute, clock, sleep) if tokens_per_minute else None
+        self.max_waiting = max_waiting
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+    def run(self, request, estimated_tokens=0, timing=None):
+        """
+        Run `request()` once a slot and budget are available and return its result.
+
+        If `timing` is a dict it is filled with `queue_wait` (seconds spent
+        waiting for a slot, budget or backoff), `request_time` (seconds spent
+        in the provider call itself) and `attempts`.
+        """
+        with self._lock:
+            if self.max_waiting is not None and self._waiting >= self.max_waiting:
+                raise SchedulerBusy(f"More than {self.max_waiting} requests are already waiting for this provider")
+            self._waiting += 1
+
+        queue_wait = 0.0
+        request_time = 0.0
+        attempts = 0
+        start = self._clock()
+        try:
+            self._slots.acquire()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        queue_wait += self._clock() - start
+
+        try:
+            while True:
+                attempts += 1
+                if self.request_bucket:
+                    queue_wait += self.request_bucket.acquire(1)
+                if self.token_bucket and estimated_tokens:
+                    queue_wait += self.token_bucket.acquire(estimated_tokens)
+
+                start = self._clock()
+                try:
+                    return request()
+                except ProviderError as e:
+                    if not e.retryable or attempts > self.max_retries:
+                        raise
+                    delay = self.backoff(attempts, e.retry_after)
+                finally:
+                    request_time += self._clock() - start
+                self._sleep(delay)
+                queue_wait += delay
+        finally:
+            self._slots.release()
+            if timing is not None:
+                timing.update(queue_wait=queue_wait, request_time=request_time, attempts=attempts)
+
+    def backoff(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt`, preferring the provider's Retry-After."""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Settle the token budget with the usage the provider actually reported."""
+        if self.token_bucket and actual_tokens is not None:
+            self.token_bucket.adjust(actual_tokens - min(estimated_tokens, self.token_bucket.capacity))
+
+
+# One scheduler per provider, shared by the CLI, batch runs and any long-running mode
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def configure_scheduler(provider_name, **settings):
+    """Replace the scheduler for `provider_name` with one built from `settings`."""
+    with _schedulers_lock:
+        _schedulers[provider_name] = RequestScheduler(**settings)
+        return _schedulers[provider_name]
+
+
+def get_scheduler(provider_name):
+    """Return the shared scheduler for `provider_name`, creating a default one on first use."""
+    with _schedulers_lock:
+        if provider_name not in _schedulers:
+            _schedulers[provider_name] = RequestScheduler()
+        return _schedulers[provider_name]
+
+
+class SingleFlight:
+    """
+    Share one call among concurrent callers asking for the same key.
+
+    The first caller runs the function; callers arriving while it is still
+    running wait for it and receive the same result, or the same exception.
+    `stats` counts the calls made and the calls that were coalesced.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.stats = {'calls': 0, 'coalesced': 0}
+
+    def do(self, key, function):
+        """Return (result, shared), where `shared` is True if another caller's call was reused."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = {'done': threading.Event(), 'result': None, 'error': None}
+                self.stats['calls'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            flight['done'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['result'], True
+
+        try:
+            flight['result'] = function()
+        except BaseException as e:
+            flight['error'] = e
+            raise
+        finally:
+            # Later callers start a new call instead of reusing this one
+            with self._lock:
+                del self._flights[key]
+            flight['done'].set()
+        return flight['result'], False
@@ -0,0 +1,344 @@
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import click
+
+from utils import get_api_key, extract_text, process_content, generate_output, configure_clients, configure_input_limits, coalesce_stats, _EXTRACTOR_VERSION
+from cache import make_key, open_cache
+from scheduler import configure_scheduler
+from tracing import Metrics, add_metrics_hook, remove_metrics_hook, span
+
+OUTPUT_TYPES = {
+    'text': 'text/plain; charset=utf-8',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'pdf': 'application/pdf',
+}
+
+# Analysis modes a job may ask for
+ANALYSIS_MODES = ('basic', 'detailed')
+
+# Finished jobs kept for polling before the oldest are forgotten
+MAX_FINISHED_JOBS = 1000
+
+# Extracted text of uploaded files kept in memory, keyed by a hash of their bytes
+UPLOAD_CACHE_SIZE = 256
+
+
+class ServerBusy(Exception):
+    """Raised when the job queue is full; clients should retry later."""
+
+
+class AnalysisService:
+    """
+    Runs analysis jobs on a fixed pool of workers.
+
+    At most `max_pending` jobs may be queued or running at once; submitting
+    more raises `ServerBusy`, which the HTTP API answers with 429. Uploaded
+    files are parsed once per distinct content, so a job description sent
+    with every candidate is only extracted the first time.
+    """
+
+    def __init__(self, model, provider, analysis_mode='basic', workers=8, max_pending=None,
+                 cache=None, text_cache=None, max_prompt_tokens=None, pdf_backend=None, job_profile=False, profile_cache=None):
+        self.model = model
+        self.provider = provider
+        self.analysis_mode = analysis_mode
+        self.cache = cache
+        self.text_cache = text_cache
+        self.max_prompt_tokens = max_prompt_tokens
+        self.pdf_backend = pdf_backend
+        self.job_profile = job_profile
+        self.profile_cache = profile_cache
+        self.max_pending = max_pending or workers * 4
+        self.metrics = Metrics()
+        add_metrics_hook(self.metrics.observe)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tailor4job-job')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._jobs = OrderedDict()
+        self._uploads = OrderedDict()
+
+    def submit(self, request):
+        """Validate `request`, queue it and return the new job."""
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'created': time.time(),
+            'model': request.get('model') or self.model,
+            'provider': request.get('provider') or self.provider,
+            'analysis_mode': str(request.get('analysis_mode') or self.analysis_mode).lower(),
+            'format': request.get('format', 'text'),
+            'job_profile': bool(request.get('job_profile', self.job_profile)),
+        }
+        if job['format'] not in OUTPUT_TYPES:
+            raise ValueError(f"Unsupported format: {job['format']}. Use one of: {', '.join(OUTPUT_TYPES)}")
+        if job['analysis_mode'] not in ANALYSIS_MODES:
+            raise ValueError(f"Unsupported analysis_mode: {job['analysis_mode']}. Use one of: {', '.join(ANALYSIS_MODES)}")
+        if not (job['model'] and job['provider']):
+            raise ValueError("A model and provider are required (set them on the server or in the request).")
+        documents = self.documents(request)
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ServerBusy(f"{self._pending} jobs are already queued or running")
+            self._pending += 1
+            self._jobs[job['id']] = job
+            self._forget_finished()
+        future = self._executor.submit(self._run, job, documents)
+        with self._lock:
+            job['future'] = future
+        return job
+
+    def documents(self, request):
+        """Return the document texts of a request: `documents` as text, or base64 `files`."""
+        if request.get('documents'):
+            documents = request['documents']
+            if not all(isinstance(document, str) for document in documents):
+                raise ValueError("`documents` must be a list of strings.")
+            return documents
+        if request.get('files'):
+            return [self.parse_upload(upload.get('name', ''), base64.b64decode(upload.get('content', ''))) for upload in request['files']]
+        raise ValueError("Send `documents` (texts) or `files` (name and base64 content), job description last.")
+
+    def parse_upload(self, name, data):
+        """Extract the text of an uploaded file, reusing earlier extractions of the same bytes."""
+        ext = os.path.splitext(name)[1].lower()
+        key = hashlib.sha256(ext.encode('utf-8') + b'\0' + data).hexdigest()
+        with self._lock:
+            if key in self._uploads:
+                self._uploads.move_to_end(key)
+                return self._uploads[key]
+
+        # The temporary path never recurs, so the disk text cache is keyed by the upload's content instead
+        disk_key = make_key('upload', _EXTRACTOR_VERSION, key)
+        text = self.text_cache.get(disk_key) if self.text_cache is not None else None
+        if text is None:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'upload' + ext)
+                with open(path, 'wb') as file:
+                    file.write(data)
+                text = extract_text(path, remember=False)
+            if self.text_cache is not None:
+                self.text_cache.set(disk_key, text)
+
+        with self._lock:
+            self._uploads[key] = text
+            while len(self._uploads) > UPLOAD_CACHE_SIZE:
+                self._uploads.popitem(last=False)
+        return text
+
+    def _run(self, job, documents):
+        # Job fields are written under the lock so a poll never sees the dict change size mid-copy
+        with self._lock:
+            job.update(status='running', started=time.time())
+        try:
+            with span('job', model=job['model'], provider=job['provider']):
+                api_key = get_api_key(job['provider'])
+                if job['job_profile']:
+                    from job_profile import profile_documents
+                    documents, profile_info = profile_documents(documents, api_key, job['model'], job['provider'], cache=self.profile_cache)
+                    with self._lock:
+                        job['job_profile'] = {'profiled': profile_info['profiled'], 'cached': profile_info['cached']}
+                content, token_usage = process_content(documents, api_key, job['model'], job['analysis_mode'], True, job['provider'],
+                                                       cache=self.cache, max_prompt_tokens=self.max_prompt_tokens)
+            with self._lock:
+                job.update(status='done', content=content, token_usage=token_usage)
+        except Exception as e:
+            with self._lock:
+                job.update(status='failed', error=str(e))
+        finally:
+            with self._lock:
+                job['finished'] = time.time()
+                self._pending -= 1
+        return job
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def snapshot(self, job):
+        """The JSON-safe fields of a job, copied while no worker is updating it."""
+        with self._lock:
+            return public_job(job)
+
+    def render(self, job, output_format=None):
+        """Return (content type, bytes) of a finished job in `output_format` (default: the job's)."""
+        output_format = output_format or job['format']
+        if output_format not in OUTPUT_TYPES:
+            raise ValueError(f"Unsupported format: {output_format}. Use one of: {', '.join(OUTPUT_TYPES)}")
+        if output_format == 'text':
+            return OUTPUT_TYPES['text'], job['content'].encode('utf-8')
+        with self._lock:
+            rendered = job.setdefault('rendered', {})
+        if output_format not in rendered:
+            # generate_output writes files, so render through a temporary one
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, f"{job['id']}.{output_format}")
+                generate_output(job['content'], path, pdf_backend=self.pdf_backend)
+                with open(path, 'rb') as file:
+                    rendered[output_format] = file.read()
+        return OUTPUT_TYPES[output_format], rendered[output_format]
+
+    def status(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job['status'] == 'running')
+            return {'status': 'ok', 'pending': self._pending, 'running': running, 'max_pending': self.max_pending,
+                    'coalesced': coalesce_stats()['coalesced']}
+
+    def close(self):
+        remove_metrics_hook(self.metrics.observe)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def public_job(job):
+    """The JSON-safe fields of a job."""
+    return {key: value for key, value in job.items() if key not in ('future', 'rendered')}
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip('/').split('/')
+            if url.path == '/health':
+                return self._json(200, service.status())
+            if url.path == '/metrics':
+                return self._send(200, 'text/plain; version=0.0.4', service.metrics.to_prometheus().encode('utf-8'))
+            if len(parts) in (2, 3) and parts[0] == 'jobs':
+                job = service.job(parts[1])
+                if job is None:
+                    return self._json(404, {'error': f"Unknown job {parts[1]}"})
+                if len(parts) == 2:
+                    return self._json(200, service.snapshot(job))
+                if parts[2] == 'result':
+                    return self._result(job, parse_qs(url.query).get('format', [None])[0])
+            self._json(404, {'error': f"Unknown path {url.path}"})
+
+        def do_POST(self):
+            path = urlparse(self.path).path
+            if path not in ('/analyze', '/jobs'):
+                return self._json(404, {'error': f"Unknown path {path}"})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                job = service.submit(request)
+            except ServerBusy as e:
+                return self._json(429, {'error': str(e)}, {'Retry-After': '1'})
+            except Exception as e:
+                return self._json(400, {'error': str(e)})
+
+            if path == '/jobs':
+                return self._json(202, service.snapshot(job), {'Location': f"/jobs/{job['id']}"})
+            # The synchronous endpoint waits for its job, which shares the same queue
+            job['future'].result()
+            self._result(job)
+
+        def _result(self, job, output_format=None):
+            if job['status'] == 'failed':
+                return self._json(502, service.snapshot(job))
+            if job['status'] != 'done':
+                return self._json(409, service.snapshot(job), {'Retry-After': '1'})
+            try:
+                content_type, body = service.render(job, output_format)
+            except Exception as e:
+                return self._json(400, {'error': str(e)})
+            self._send(200, content_type, body, {'X-Job-Id': job['id']})
+
+        def _json(self, status, payload, headers=None):
+            self._send(status, 'application/json', json.dumps(payload).encode('utf-8'), headers)
+
+        def _send(self, status, content_type, body, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def create_server(service, host='127.0.0.1', port=8080):
+    """Return a threaded HTTP server exposing `service`; call `serve_forever()` to run it."""
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface to listen on.')
+@click.option('--port', default=8080, show_default=True, type=click.IntRange(0, 65535), help='Port to listen on.')
+@click.option('--model', '-m', default=None, help='Default model for jobs that do not name one.')
+@click.option('--provider', '-p', default=None, type=click.Choice(['groq', 'openrouter']), help='Default provider for jobs that do not name one.')
+@click.option('--analysis_mode', '-a', type=click.Choice(ANALYSIS_MODES, case_sensitive=False), default='basic', help='Default analysis mode.')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=8, help='Number of jobs processed at the same time.')
+@click.option('--max-pending', type=click.IntRange(min=1), default=None, help='Queued plus running jobs accepted before answering 429 (default: 4 x workers).')
+@click.option('--requests-per-minute', type=click.IntRange(min=1), default=None, help="Cap on each provider's requests per minute.")
+@click.option('--tokens-per-minute', type=click.IntRange(min=1), default=None, help="Cap on each provider's tokens per minute.")
+@click.option('--max-prompt-tokens', type=click.IntRange(min=1), default=None, help="Trim the longest documents so each prompt fits this many tokens.")
+@click.option('--job-profile', is_flag=True, help='Compare candidates against a cached requirements profile of each job description by default.')
+@click.option('--no-cache', is_flag=True, help='Always call the provider instead of reusing cached responses.')
+@click.option('--cache-dir', default=None, type=click.Path(file_okay=False), help='Directory for cached responses (default: ~/.cache/tailor4job).')
+def serve(host, port, model, provider, analysis_mode, workers, max_pending, requests_per_minute, tokens_per_minute, max_prompt_tokens, job_profile, no_cache, cache_dir):
+    """Serve analyses over a local HTTP API, keeping clients and caches warm between jobs."""
+    from main import load_config
+
+    config = load_config()
+    model = model or config.get('model')
+    provider = provider or config.get('provider')
+    cache_dir = cache_dir or config.get('cache_dir')
+    for provider_name in ('groq', 'openrouter'):
+        settings = dict(config.get('rate_limits', {}).get(provider_name, {}))
+        if requests_per_minute:
+            settings['requests_per_minute'] = requests_per_minute
+        if tokens_per_minute:
+            settings['tokens_per_minute'] = tokens_per_minute
+        settings.setdefault('max_in_flight', workers)
+        configure_scheduler(provider_name, **settings)
+    configure_clients(pool_size=max(workers, config.get('pool_size', 10)), connect_timeout=config.get('connect_timeout'), read_timeout=config.get('request_timeout'))
+    configure_input_limits(**config.get('input_limits', {}))
+
+    service = AnalysisService(
+        model, provider, analysis_mode, workers, max_pending,
+        cache=None if no_cache else open_cache(cache_dir, max_mb=config.get('cache_max_mb'), ttl=config.get('cache_ttl')),
+        text_cache=None if no_cache else open_cache(cache_dir, namespace='text', max_mb=config.get('cache_max_mb')),
+        max_prompt_tokens=max_prompt_tokens or config.get('max_prompt_tokens'),
+        pdf_backend=config.get('pdf_backend'),
+        job_profile=job_profile or config.get('job_profile', False),
+        profile_cache=None if no_cache else open_cache(cache_dir, namespace='profiles', max_mb=config.get('cache_max_mb')),
+    )
+    ledger = None
+    if config.get('ledger', True):
+        from ledger import open_ledger
+        ledger = open_ledger(cache_dir).attach()
+    server = create_server(service, host, port)
+    click.echo(f"Serving on http://{server.server_address[0]}:{server.server_address[1]} with {workers} workers", err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if ledger is not None:
+            ledger.close()
@@ -0,0 +1,36 @@
+import pytest
+import job_profile
+from benchmarks.fake_provider import FakeProvider
+from scheduler import _schedulers
+from utils import close_clients
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path_factory, monkeypatch):
+    # The default cache directory holds the usage ledger; keep test runs out of the real one
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path_factory.mktemp("cache")))
+
+@pytest.fixture
+def start_fake_provider(monkeypatch):
+    """Start a FakeProvider with the given settings and point both providers at it."""
+    started = []
+
+    def start(**settings):
+        provider = FakeProvider(**dict({"seed": 0}, **settings)).start()
+        started.append(provider)
+        monkeypatch.setenv("OPENROUTER_BASE_URL", provider.openrouter_base_url)
+        monkeypatch.setenv("OPENROUTER_API_KEY", "fake-key")
+        monkeypatch.setenv("GROQ_BASE_URL", provider.groq_base_url)
+        monkeypatch.setenv("GROQ_API_KEY", "fake-key")
+        return provider
+
+    yield start
+    for provider in started:
+        provider.stop()
+    close_clients()
+    _schedulers.pop("openrouter", None)
+    _schedulers.pop("groq", None)
+    job_profile._profiles.clear()
+
+@pytest.fixture
+def fake_provider(start_fake_provider):
+    return start_fake_provider()
@@ -0,0 +1,82 @@
+import json
+from unittest.mock import patch
+from click.testing import CliRunner
+from ats import ATSScorer, extract_keywords, local_report
+from batch import batch
+from main import main
+
+JOB_DESCRIPTION = (
+    "Senior Python Developer. Must have machine learning experience, SQL and Docker. "
+    "Build machine learning pipelines in Python on AWS. Kubernetes and CI/CD a plus."
+)
+STRONG_RESUME = "Python developer who built machine learning pipelines with SQL, Docker and Kubernetes on AWS."
+WEAK_RESUME = "Pastry chef with ten years of experience in French bakeries."
+
+def test_extract_keywords_keeps_repeated_phrases():
+    keywords = extract_keywords(JOB_DESCRIPTION)
+    assert "machine learning" in keywords
+    assert "python" in keywords
+    assert "ci/cd" in keywords
+    assert "must" not in keywords
+
+def test_scorer_ranks_relevant_resume_higher():
+    strong, weak = ATSScorer(JOB_DESCRIPTION).score([STRONG_RESUME, WEAK_RESUME])
+    assert strong["score"] > weak["score"]
+    assert weak["coverage"] == 0
+    assert "machine learning" in strong["matched"]
+    assert "ci/cd" in strong["missing"]
+    assert 0 < strong["similarity"] <= 1
+
+def test_scorer_handles_many_resumes_in_one_pass():
+    resumes = [STRONG_RESUME, WEAK_RESUME] * 2000
+    results = ATSScorer(JOB_DESCRIPTION).score(resumes)
+    assert len(results) == 4000
+    assert results[0] == results[2]
+
+def test_score_does_not_depend_on_the_other_documents():
+    scorer = ATSScorer(JOB_DESCRIPTION)
+    alone = scorer.score([STRONG_RESUME])[0]
+    assert scorer.score([WEAK_RESUME, STRONG_RESUME])[1] == alone
+    assert scorer.score([STRONG_RESUME] + [WEAK_RESUME] * 500)[0] == alone
+    assert ATSScorer(JOB_DESCRIPTION).score([STRONG_RESUME])[0] == alone
+
+def test_local_report_names_documents():
+    report = local_report([STRONG_RESUME, WEAK_RESUME, JOB_DESCRIPTION], names=["resume.docx", "cover_letter.docx", "job.txt"])
+    assert "Estimated ATS match:" in report
+    assert "- resume.docx:" in report
+    assert "**Missing keywords**:" in report
+
+def test_cli_local_mode_needs_no_model(tmp_path):
+    resume = tmp_path / "resume.txt"
+    job_description = tmp_path / "job_description.txt"
+    resume.write_text(STRONG_RESUME)
+    job_description.write_text(JOB_DESCRIPTION)
+    result = CliRunner().invoke(main, ["--analysis_mode", "local", str(resume), str(job_description)])
+    assert result.exit_code == 0
+    assert "Local ATS Analysis" in result.output
+
+def test_batch_prescreen_skips_unqualified_candidates(tmp_path):
+    (tmp_path / "strong.txt").write_text(STRONG_RESUME)
+    (tmp_path / "weak.txt").write_text(WEAK_RESUME)
+    (tmp_path / "cover.txt").write_text("I would love to join your team.")
+    (tmp_path / "job.txt").write_text(JOB_DESCRIPTION)
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(
+        "id,resume,cover_letter,job_description\n"
+        "strong,strong.txt,cover.txt,job.txt\n"
+        "weak,weak.txt,cover.txt,job.txt\n"
+    )
+    results = tmp_path / "results.jsonl"
+
+    with patch("batch.process_content", return_value=("analysis", None)) as mock_process:
+        result = CliRunner().invoke(batch, [
+            "--model", "llama3-8b-8192", "--provider", "groq", "--no-cache",
+            "--prescreen-threshold", "20", "--results", str(results), str(manifest)
+        ])
+
+    assert result.exit_code == 0
+    assert mock_process.call_count == 1
+    records = {record["id"]: record for record in map(json.loads, results.read_text().splitlines())}
+    assert records["strong"]["status"] == "ok"
+    assert records["strong"]["ats"]["score"] >= 20
+    assert records["weak"]["status"] == "screened_out"
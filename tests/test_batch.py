@@ -0,0 +1,115 @@
+import json
+from unittest.mock import patch
+from click.testing import CliRunner
+import utils
+from batch import batch, read_manifest
+
+def write_inputs(tmp_path, count):
+    for name in ["resume", "cover_letter", "job_description"]:
+        (tmp_path / f"{name}.txt").write_text(f"Sample {name} content.")
+    manifest = tmp_path / "manifest.csv"
+    lines = ["id,resume,cover_letter,job_description"]
+    lines += [f"cand-{i},resume.txt,cover_letter.txt,job_description.txt" for i in range(count)]
+    manifest.write_text("\n".join(lines) + "\n")
+    return manifest
+
+def fake_process_content(content, api_key, model, mode, token_usage, provider_name, **kwargs):
+    return "analysis", {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3}
+
+def test_read_manifest_jsonl_resolves_paths(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(json.dumps({"id": "a", "resume": "r.docx", "cover_letter": "c.docx", "job_description": "j.txt"}) + "\n")
+    rows = list(read_manifest(str(manifest)))
+    assert rows == [{"id": "a", "files": [str(tmp_path / "r.docx"), str(tmp_path / "c.docx"), str(tmp_path / "j.txt")]}]
+
+def test_batch_writes_results_and_resumes(tmp_path):
+    manifest = write_inputs(tmp_path, 5)
+    results = tmp_path / "results.jsonl"
+    runner = CliRunner()
+    args = ["--model", "llama3-8b-8192", "--provider", "groq", "--results", str(results), "--workers", "2", "--no-cache", str(manifest)]
+
+    # Fail one row on the first run
+    def flaky(content, *args, **kwargs):
+        if flaky.calls == 2:
+            flaky.calls += 1
+            raise Exception("rate limited")
+        flaky.calls += 1
+        return fake_process_content(content, *args, **kwargs)
+    flaky.calls = 0
+
+    with patch("batch.process_content", side_effect=flaky):
+        result = runner.invoke(batch, args)
+    assert result.exit_code == 1
+    records = [json.loads(line) for line in results.read_text().splitlines()]
+    assert len(records) == 5
+    assert sum(record["status"] == "ok" for record in records) == 4
+
+    # A second run only re-pays for the failed row
+    with patch("batch.process_content", side_effect=fake_process_content) as mock_process:
+        result = runner.invoke(batch, args)
+    assert result.exit_code == 0
+    assert mock_process.call_count == 1
+    assert "4 already done" in result.output
+    ok_ids = {json.loads(line)["id"] for line in results.read_text().splitlines() if json.loads(line)["status"] == "ok"}
+    assert ok_ids == {f"cand-{i}" for i in range(5)}
+
+def test_batch_honors_config_cache_dir_and_ledger(tmp_path, monkeypatch):
+    import main
+    monkeypatch.setattr("utils._input_limits", dict(utils._input_limits))
+    manifest = write_inputs(tmp_path, 2)
+    cache_dir = tmp_path / "configured"
+    config = {"cache_dir": str(cache_dir), "input_limits": {"max_file_mb": 0.00001}}
+    monkeypatch.setattr(main, "load_config", lambda: config)
+    args = ["--model", "llama3-8b-8192", "--provider", "groq", "--results", str(tmp_path / "results.jsonl"), str(manifest)]
+
+    with patch("batch.process_content", side_effect=fake_process_content):
+        result = CliRunner().invoke(batch, args)
+    # The configured input limits apply to every row
+    assert result.exit_code == 1
+    assert "max_file_mb" in result.output
+    assert (cache_dir / "ledger.sqlite3").exists()
+
+    config.update(cache_dir=str(tmp_path / "off"), ledger=False, input_limits={"max_file_mb": 1})
+    with patch("batch.process_content", side_effect=fake_process_content):
+        result = CliRunner().invoke(batch, args)
+    assert result.exit_code == 0, result.output
+    assert not (tmp_path / "off" / "ledger.sqlite3").exists()
+
+def test_an_invalid_manifest_row_is_recorded_without_losing_the_others(tmp_path):
+    manifest = write_inputs(tmp_path, 4)
+    with open(manifest, "a") as file:
+        file.write("broken,resume.txt,,job_description.txt\n")
+    results = tmp_path / "results.jsonl"
+    args = ["--model", "llama3-8b-8192", "--provider", "groq", "--results", str(results), "--workers", "2", "--no-cache", str(manifest)]
+
+    with patch("batch.process_content", side_effect=fake_process_content) as mock_process:
+        result = CliRunner().invoke(batch, args)
+    assert result.exit_code == 1
+    assert mock_process.call_count == 4
+    records = {json.loads(line)["id"]: json.loads(line) for line in results.read_text().splitlines()}
+    assert [records[f"cand-{i}"]["status"] for i in range(4)] == ["ok"] * 4
+    assert records["broken"]["status"] == "failed" and "missing: cover_letter" in records["broken"]["error"]
+
+def test_read_manifest_yields_malformed_jsonl_lines_as_errors(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    row = {"id": "a", "resume": "r.docx", "cover_letter": "c.docx", "job_description": "j.txt"}
+    manifest.write_text("{not json\n" + json.dumps(row) + "\n")
+    rows = list(read_manifest(str(manifest)))
+    assert rows[0]["id"] == "1" and "not valid JSON" in rows[0]["error"]
+    assert rows[1]["id"] == "a" and "files" in rows[1]
+
+def test_batch_applies_config_rate_limits_and_timeouts(tmp_path, monkeypatch):
+    import main
+    monkeypatch.setattr("utils._client_settings", dict(utils._client_settings))
+    manifest = write_inputs(tmp_path, 1)
+    config = {"rate_limits": {"groq": {"requests_per_minute": 30, "tokens_per_minute": 6000}}, "pool_size": 16, "connect_timeout": 3, "request_timeout": 45}
+    monkeypatch.setattr(main, "load_config", lambda: config)
+    args = ["--model", "llama3-8b-8192", "--provider", "groq", "--workers", "3", "--tokens-per-minute", "9000",
+            "--results", str(tmp_path / "results.jsonl"), "--no-cache", str(manifest)]
+
+    with patch("batch.process_content", side_effect=fake_process_content), patch("batch.configure_scheduler") as mock_scheduler:
+        result = CliRunner().invoke(batch, args)
+    assert result.exit_code == 0, result.output
+    # Command-line caps override the config table; in-flight requests default to the worker count
+    mock_scheduler.assert_called_once_with("groq", requests_per_minute=30, tokens_per_minute=9000, max_in_flight=3)
+    assert (utils._client_settings["pool_size"], utils._client_settings["connect_timeout"], utils._client_settings["read_timeout"]) == (16, 3, 45)
@@ -0,0 +1,117 @@
+import io
+import json
+import zipfile
+import pytest
+from click.testing import CliRunner
+from docx import Document
+from bulk import DocxTemplate, load_reports, render, render_bulk
+
+REPORTS = [(f"candidate {index}", f"# Analysis\n1. **Brief Introduction**: Candidate {index} fits.\n" + "Details. " * 400 * (index % 2 + 1)) for index in range(10)]
+
+def test_combined_pdf_has_contents_and_bookmarks(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+    output = tmp_path / "reports.pdf"
+    assert render_bulk(REPORTS, str(output)) == 10
+
+    reader = pypdf.PdfReader(str(output))
+    contents = reader.pages[0].extract_text()
+    assert contents.startswith("Contents")
+    assert [item.title for item in reader.outline] == [title for title, _ in REPORTS]
+    for item in reader.outline:
+        page = reader.get_destination_page_number(item)
+        # The contents list the same (1-based) page the bookmark points to
+        assert f"{item.title} {page + 1}" in contents
+        assert reader.pages[page].extract_text().startswith(item.title)
+
+def test_combined_docx_has_toc_and_a_heading_per_report(tmp_path):
+    output = tmp_path / "reports.docx"
+    render_bulk(REPORTS, str(output), workers=1)
+    doc = Document(str(output))
+    headings = [paragraph.text for paragraph in doc.paragraphs if paragraph.style.name == "Heading 1"]
+    assert headings == [title for title, _ in REPORTS]
+    assert 'TOC \\o "1-1"' in doc.element.body.xml
+
+def test_archive_from_a_process_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr("bulk.MIN_POOL_REPORTS", 2)
+    reports = REPORTS + [("candidate 0", "Second run.")]
+    output = tmp_path / "reports.zip"
+    assert render_bulk(reports, str(output), "docx", workers=2) == 11
+    with zipfile.ZipFile(output) as archive:
+        names = archive.namelist()
+        assert names[:2] == ["candidate_0.docx", "candidate_1.docx"]
+        assert names[-1] == "candidate_0_2.docx"
+        doc = Document(io.BytesIO(archive.read("candidate_0_2.docx")))
+    assert [paragraph.text for paragraph in doc.paragraphs] == ["Second run."]
+
+def test_combined_pdf_from_a_results_file(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+    results = tmp_path / "results.jsonl"
+    results.write_text("".join(json.dumps({"id": title, "status": "ok", "analysis": content}) + "\n" for title, content in REPORTS))
+    output = tmp_path / "reports.pdf"
+    assert render_bulk(load_reports(str(results)), str(output), workers=1) == 10
+    assert [item.title for item in pypdf.PdfReader(str(output)).outline] == [title for title, _ in REPORTS]
+
+def test_pdf_reports_outside_the_builtin_fonts_are_skipped_and_named(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+    reports = REPORTS[:2] + [("王小明", "Strong match.")]
+    # Common symbols are shown as plain text rather than skipping the report
+    reports[1] = ("candidate 1 \u2192 shortlist", "\u2713 Fits \u2265 90%.")
+    skipped = []
+    output = tmp_path / "reports.pdf"
+    assert render_bulk(reports, str(output), workers=1, on_skip=lambda *args: skipped.append(args)) == 2
+    assert [item.title for item in pypdf.PdfReader(str(output)).outline] == ["candidate 0", "candidate 1 -> shortlist"]
+    (title, error, fallback), = skipped
+    assert (title, fallback) == ("王小明", None)
+    assert "Report 王小明: " in error and "cannot show: 王, 小, 明" in error
+
+    # A .zip holds the report as a .docx instead; Word documents show any script
+    assert render_bulk(reports, str(tmp_path / "reports.zip"), workers=1) == 3
+    with zipfile.ZipFile(tmp_path / "reports.zip") as archive:
+        assert archive.namelist() == ["candidate_0.pdf", "candidate_1_shortlist.pdf", "王小明.docx"]
+    assert render_bulk(reports, str(tmp_path / "reports.docx"), workers=1) == 3
+
+def test_a_failed_render_keeps_the_previous_output(tmp_path, monkeypatch):
+    output = tmp_path / "reports.pdf"
+    output.write_bytes(b"previous")
+
+    def broken(title, content):
+        raise Exception("boom")
+    monkeypatch.setattr("bulk._layout_report", broken)
+    with pytest.raises(Exception, match="boom"):
+        render_bulk(REPORTS, str(output), workers=1)
+    assert output.read_bytes() == b"previous"
+    assert list(tmp_path.iterdir()) == [output]
+
+def test_docx_template_renders_markdown():
+    doc = Document(io.BytesIO(DocxTemplate().render("# Summary\n**Score**: 72% <ok> & \x07done")))
+    assert doc.paragraphs[0].style.name == "Heading 1"
+    assert doc.paragraphs[1].runs[0].bold and doc.paragraphs[1].text == "Score: 72% <ok> & done"
+
+def test_render_command_uses_latest_successful_records(tmp_path):
+    results = tmp_path / "results.jsonl"
+    records = [
+        {"id": "a", "status": "ok", "analysis": "First."},
+        {"id": "b", "status": "failed", "error": "boom"},
+        {"id": "a", "status": "ok", "analysis": "Second."},
+    ]
+    results.write_text("\n".join(json.dumps(record) for record in records) + "\n")
+    reports = load_reports(str(results))
+    assert len(reports) == 1
+    # Analyses are read back from the file on each pass rather than kept in memory
+    assert list(reports) == list(reports) == [("a", "Second.")]
+    assert "Second." not in repr(vars(reports))
+
+    output = tmp_path / "reports.zip"
+    result = CliRunner().invoke(render, ["-o", str(output), str(results)])
+    assert result.exit_code == 0, result.output
+    with zipfile.ZipFile(output) as archive:
+        assert archive.namelist() == ["a.pdf"]
+        assert archive.read("a.pdf").startswith(b"%PDF")
+
+    # One report a PDF cannot show is skipped and counted, not fatal
+    with results.open("a") as file:
+        file.write(json.dumps({"id": "c", "status": "ok", "analysis": "Łukasz fits."}) + "\n")
+    result = CliRunner().invoke(render, ["-o", str(tmp_path / "reports.pdf"), str(results)])
+    assert result.exit_code == 0, result.output
+    assert "Skipped: Report c: " in result.stderr
+    assert "Rendered 1 reports to" in result.stderr and "skipped 1 the built-in PDF fonts cannot show" in result.stderr
@@ -0,0 +1,92 @@
+import threading
+import time
+import pytest
+from click.testing import CliRunner
+import job_profile
+import main
+from benchmarks.fake_provider import DEFAULT_REPLY
+from scheduler import SingleFlight
+from utils import coalesce_stats, process_content
+
+@pytest.fixture
+def fake_provider(start_fake_provider):
+    return start_fake_provider(latency=0.3)
+
+def run_together(count, function):
+    results, errors = [None] * count, []
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = function(index)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results, errors
+
+def test_single_flight_shares_results_and_errors():
+    flight, calls = SingleFlight(), []
+
+    def slow(value):
+        calls.append(value)
+        time.sleep(0.2)
+        return value
+
+    results, _ = run_together(5, lambda index: flight.do("key", lambda: slow(index)))
+    assert len(calls) == 1
+    assert {result for result, _ in results} == {calls[0]}
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flight.stats == {"calls": 1, "coalesced": 4}
+
+    def failing():
+        time.sleep(0.2)
+        raise ValueError("provider down")
+
+    _, errors = run_together(3, lambda index: flight.do("key", failing))
+    assert [str(error) for error in errors] == ["provider down"] * 3
+    # Nothing is remembered once the call has finished
+    assert flight.do("key", lambda: "fresh") == ("fresh", False)
+
+def test_identical_requests_share_one_provider_call(fake_provider):
+    before = coalesce_stats()["coalesced"]
+    chunks = []
+
+    def analyze(index):
+        on_chunk = chunks.append if index == 0 else None
+        return process_content(["Resume.", "Job."], "fake-key", "fake-model", "basic", True, "openrouter", on_chunk=on_chunk)
+
+    results, errors = run_together(4, analyze)
+    assert not errors
+    assert fake_provider.stats["requests"] == 1
+    assert {content for content, _ in results} == {DEFAULT_REPLY}
+    assert all(usage["total_tokens"] > 0 for _, usage in results)
+    assert "".join(chunks) == DEFAULT_REPLY
+    assert coalesce_stats()["coalesced"] - before == 3
+
+    # A different mode is a different request
+    process_content(["Resume.", "Job."], "fake-key", "fake-model", "detailed", True, "openrouter")
+    assert fake_provider.stats["requests"] == 2
+
+def test_concurrent_pairs_in_the_cli_are_coalesced(tmp_path, monkeypatch, fake_provider):
+    monkeypatch.setattr(main, "load_config", lambda: {"cache_dir": str(tmp_path)})
+    (tmp_path / "resume.txt").write_text("Python developer.")
+    (tmp_path / "job.txt").write_text("Python role.")
+    result = CliRunner().invoke(main.main, ["-m", "fake-model,fake-model", "-p", "openrouter,openrouter", "--no-cache", "-t",
+                                            str(tmp_path / "resume.txt"), str(tmp_path / "job.txt")])
+    assert result.exit_code == 0, result.output
+    assert fake_provider.stats["requests"] == 1
+    assert "Coalesced Requests:" in result.stderr
+
+def test_concurrent_job_profiles_share_one_extraction(fake_provider):
+    fake_provider.reply = '{"must_have": ["Python"], "keywords": ["python"]}'
+    results, errors = run_together(4, lambda index: job_profile.build_job_profile("Python role.", "fake-key", "fake-model", "openrouter"))
+    assert not errors
+    assert fake_provider.stats["requests"] == 1
+    assert sorted(info["cached"] for _, info in results) == [False, True, True, True]
+    assert all(profile["must_have"] == ["Python"] for profile, _ in results)
@@ -0,0 +1,67 @@
+import os
+import time
+import threading
+from unittest.mock import patch
+from click.testing import CliRunner
+from main import main
+
+JOB_DESCRIPTION = "concurrent_job_description.txt"
+
+def fake_process_content(content, api_key, model, mode, token_usage, provider_name, **kwargs):
+    # The first pair is the slowest so out-of-order completion is exercised
+    time.sleep({"model-a": 0.3, "model-b": 0.1, "model-c": 0.0}[model])
+    if model == "model-b":
+        raise Exception("provider unavailable")
+    return f"{model} analysis", None
+
+def test_pairs_run_concurrently_and_report_in_order():
+    with open(JOB_DESCRIPTION, "w") as f:
+        f.write("Sample job description content.")
+
+    read_calls = []
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def tracking_process_content(*args, **kwargs):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        try:
+            return fake_process_content(*args, **kwargs)
+        finally:
+            with lock:
+                active.pop()
+
+    def tracking_read_files(files, cache=None):
+        read_calls.append(files)
+        return ["Sample job description content.\n"]
+
+    try:
+        with patch("main.process_content", side_effect=tracking_process_content), \
+             patch("main.read_documents", side_effect=tracking_read_files), \
+             patch.dict(os.environ, {"GROQ_API_KEY": "test_key", "OPENROUTER_API_KEY": "test_key"}):
+            runner = CliRunner()
+            result = runner.invoke(main, [
+                "--model", "model-a,model-b,model-c",
+                "--provider", "groq,openrouter,groq",
+                "--concurrency", "3",
+                "--no-cache",
+                JOB_DESCRIPTION
+            ])
+
+        # Input files are parsed once and shared by every pair
+        assert len(read_calls) == 1
+        assert max(peak) > 1
+
+        # Outputs are emitted in the order the pairs were given
+        output = result.output
+        assert output.index("model-a analysis") < output.index("model-c analysis")
+
+        # The failing pair does not abort the others and is reported in the summary
+        assert "model-a (groq): ok" in output
+        assert "model-b (openrouter): failed: provider unavailable" in output
+        assert "model-c (groq): ok" in output
+        assert result.exit_code == 1
+    finally:
+        os.remove(JOB_DESCRIPTION)
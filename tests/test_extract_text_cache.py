@@ -0,0 +1,43 @@
+import os
+from unittest.mock import patch
+from docx import Document
+import utils
+from cache import DiskCache
+from utils import read_documents
+
+def create_docx(file_path, paragraphs):
+    doc = Document()
+    for paragraph in paragraphs:
+        doc.add_paragraph(paragraph)
+    doc.save(file_path)
+
+def test_unchanged_docx_is_parsed_once(tmp_path):
+    resume = str(tmp_path / "resume.docx")
+    job_description = tmp_path / "job_description.txt"
+    create_docx(resume, ["Jane Doe", "Python developer"])
+    job_description.write_text("Looking for a Python developer.\r\n")
+
+    with patch("utils.Document", wraps=Document) as mock_document:
+        first = read_documents([resume, str(job_description)])
+        second = read_documents([resume, str(job_description)])
+    assert mock_document.call_count == 1
+    assert first == second == ["Jane Doe\nPython developer\n", "Looking for a Python developer.\n\n"]
+
+    # Editing the file invalidates its cached text
+    create_docx(resume, ["Jane Doe", "Senior Python developer"])
+    os.utime(resume, ns=(0, os.stat(resume).st_mtime_ns + 1_000_000))
+    with patch("utils.Document", wraps=Document) as mock_document:
+        assert "Senior Python developer" in read_documents([resume])[0]
+    assert mock_document.call_count == 1
+
+def test_extracted_text_persists_across_runs(tmp_path):
+    resume = str(tmp_path / "resume.docx")
+    create_docx(resume, ["Jane Doe"])
+    cache = DiskCache(str(tmp_path / "text"))
+    read_documents([resume], cache=cache)
+
+    # A fresh process starts with an empty in-memory cache
+    utils._text_cache.clear()
+    with patch("utils.Document", wraps=Document) as mock_document:
+        assert read_documents([resume], cache=cache) == ["Jane Doe\n"]
+    assert mock_document.call_count == 0
@@ -0,0 +1,70 @@
+import pytest
+from docx import Document
+import utils
+from pdf_render import render_pdf
+from utils import configure_input_limits, extract_text, read_documents, supported_extensions
+
+@pytest.fixture(autouse=True)
+def restore_limits(monkeypatch):
+    monkeypatch.setattr(utils, "_input_limits", dict(utils._input_limits))
+    utils._text_cache.clear()
+
+def test_docx_includes_headers_and_tables_in_order(tmp_path):
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "Jane Doe - jane@example.com"
+    doc.add_paragraph("Experience")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Skill"
+    table.cell(0, 1).text = "Years"
+    table.cell(1, 0).text = "Python"
+    table.cell(1, 1).text = "5"
+    doc.add_paragraph("Education")
+    path = tmp_path / "resume.docx"
+    doc.save(path)
+
+    text = extract_text(str(path))
+    assert text.startswith("Jane Doe - jane@example.com\n")
+    assert text.index("Experience") < text.index("Python | 5") < text.index("Education")
+    assert "Skill | Years" in text
+
+def test_markdown_and_pdf_are_supported(tmp_path):
+    markdown = tmp_path / "job.md"
+    markdown.write_text("# Data Engineer\n\nWe use **Python** and [Airflow](https://airflow.apache.org).\n")
+    assert extract_text(str(markdown)) == "Data Engineer\n\nWe use Python and Airflow.\n\n"
+
+    pytest.importorskip("pypdf")
+    pdf = tmp_path / "resume.pdf"
+    render_pdf("**Summary**: Python developer with SQL experience.", str(pdf))
+    assert "Python developer with SQL experience" in extract_text(str(pdf))
+
+def test_unsupported_format_lists_registered_extractors(tmp_path):
+    path = tmp_path / "resume.rtf"
+    path.write_text("text")
+    with pytest.raises(Exception, match=r"Unsupported file format: \.rtf\. Supported formats are: .*\.docx.*\.md.*\.pdf.*\.txt"):
+        extract_text(str(path))
+    assert {".docx", ".md", ".pdf", ".txt"} <= set(supported_extensions())
+
+def test_size_limits(tmp_path):
+    big = tmp_path / "dump.txt"
+    big.write_text("python sql kubernetes\n" * 2000)
+    configure_input_limits(max_file_tokens=1000)
+    with pytest.raises(Exception, match="over the per-file limit"):
+        extract_text(str(big))
+
+    configure_input_limits(max_file_tokens=100000, max_file_mb=0.01)
+    with pytest.raises(Exception, match="MB per-file limit"):
+        extract_text(str(big))
+
+    configure_input_limits(max_file_mb=1, max_total_tokens=7000)
+    small = tmp_path / "job.txt"
+    small.write_text("python sql\n" * 1000)
+    with pytest.raises(Exception, match="over the 7000 token limit"):
+        read_documents([str(big), str(small)])
+
+def test_many_files_are_read_in_order(tmp_path):
+    files = []
+    for index in range(10):
+        path = tmp_path / f"doc{index}.txt"
+        path.write_text(f"Document {index}")
+        files.append(str(path))
+    assert read_documents(files) == [f"Document {index}\n" for index in range(10)]
@@ -0,0 +1,27 @@
+import pytest
+from benchmarks.fake_provider import DEFAULT_REPLY
+from scheduler import ProviderError, RequestScheduler, _schedulers
+from utils import call_provider, process_content
+
+def test_openrouter_round_trip_over_http(fake_provider):
+    text, usage = call_provider("Compare this resume.", "fake-key", "fake-model", "openrouter")
+    assert text == DEFAULT_REPLY
+    assert usage["completion_tokens"] == len(DEFAULT_REPLY.split(" "))
+    assert fake_provider.stats["requests"] == 1
+
+def test_openrouter_streaming_over_http(fake_provider):
+    chunks = []
+    text, usage = call_provider("Compare this resume.", "fake-key", "fake-model", "openrouter", on_chunk=chunks.append)
+    assert "".join(chunks) == text == DEFAULT_REPLY
+    assert len(chunks) > 1
+    assert usage["total_tokens"] > 0
+    assert fake_provider.stats["streamed"] == 1
+
+def test_rate_limits_are_retried_then_reported(fake_provider):
+    fake_provider.rate_limit_rate = 1.0
+    _schedulers["openrouter"] = RequestScheduler(max_retries=2, base_delay=0)
+    with pytest.raises(ProviderError) as error:
+        process_content(["Resume.", "Job description."], "fake-key", "fake-model", "basic", False, "openrouter")
+    assert error.value.status_code == 429
+    assert error.value.retry_after == 0
+    assert fake_provider.stats["rate_limited"] == 3
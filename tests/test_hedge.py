@@ -0,0 +1,92 @@
+import time
+import pytest
+from click.testing import CliRunner
+from benchmarks.fake_provider import DEFAULT_REPLY
+from cache import DiskCache
+from hedge import DEFAULT_HEDGE_DELAY, hedge_delay, parse_delay, race_pairs, record_latency
+from main import main
+
+DOCUMENTS = ["Jane Doe, Python developer.", "Looking for a Python developer."]
+
+@pytest.fixture
+def fake_provider(start_fake_provider):
+    return start_fake_provider(model_latency={"slow-model": 1.0})
+
+def test_backup_wins_when_primary_is_slow(fake_provider):
+    start = time.perf_counter()
+    result = race_pairs(("slow-model", "openrouter"), ("fast-model", "openrouter"), DOCUMENTS, "basic", 0.1)
+    assert time.perf_counter() - start < 0.8
+    assert result["pair"] == ("fast-model", "openrouter")
+    assert result["content"] == DEFAULT_REPLY
+
+    primary, backup = result["attempts"]
+    assert backup["status"] == "won"
+    assert primary["status"] == "cancelled"
+    assert primary["latency"] > backup["latency"] > 0
+    assert primary["usage"]["estimated"] is True
+    assert primary["usage"]["prompt_tokens"] > 0
+
+def test_cancelled_attempt_is_recorded_in_the_ledger(tmp_path, fake_provider):
+    from ledger import open_ledger
+    ledger = open_ledger(str(tmp_path)).attach()
+    try:
+        result = race_pairs(("slow-model", "openrouter"), ("fast-model", "openrouter"), DOCUMENTS, "basic", 0.1)
+    finally:
+        # Closed while the slow request is still waiting for its first byte, as the CLI does
+        ledger.close()
+    time.sleep(1.2)
+
+    calls = {call["model"]: call for call in open_ledger(str(tmp_path)).calls()}
+    assert calls["fast-model"]["status"] == "ok"
+    assert calls["slow-model"]["status"] == "cancelled" and calls["slow-model"]["mode"] == "basic"
+    assert calls["slow-model"]["prompt_tokens"] == result["attempts"][0]["usage"]["prompt_tokens"]
+    assert calls["slow-model"]["latency"] == pytest.approx(result["attempts"][0]["latency"])
+
+def test_a_cancelled_request_is_recorded_once(tmp_path, fake_provider):
+    from ledger import open_ledger
+    ledger = open_ledger(str(tmp_path)).attach()
+    try:
+        race_pairs(("slow-model", "openrouter"), ("fast-model", "openrouter"), DOCUMENTS, "basic", 0.1)
+        # The slow request's own span ends once its stream starts, while the ledger is still open
+        time.sleep(1.2)
+    finally:
+        ledger.close()
+    assert [call["model"] for call in open_ledger(str(tmp_path)).calls()].count("slow-model") == 1
+
+def test_fast_primary_never_starts_backup(fake_provider):
+    result = race_pairs(("fast-model", "openrouter"), ("slow-model", "openrouter"), DOCUMENTS, "basic", 0.5)
+    assert result["pair"] == ("fast-model", "openrouter")
+    assert result["attempts"][1]["status"] == "not_started"
+    assert fake_provider.stats["requests"] == 1
+
+def test_failing_primary_starts_backup_at_once(fake_provider):
+    start = time.perf_counter()
+    result = race_pairs(("fast-model", "nowhere"), ("fast-model", "openrouter"), DOCUMENTS, "basic", 5)
+    assert time.perf_counter() - start < 1
+    assert result["attempts"][0]["status"] == "failed"
+    assert result["pair"] == ("fast-model", "openrouter")
+
+def test_percentile_delay_uses_recorded_latencies(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    assert parse_delay("p95") == ("percentile", 95.0)
+    assert parse_delay("1.5") == ("seconds", 1.5)
+    with pytest.raises(Exception, match="Invalid race delay"):
+        parse_delay("soon")
+    assert hedge_delay("p90", ("model", "groq"), cache) == DEFAULT_HEDGE_DELAY
+    for seconds in range(1, 11):
+        record_latency(cache, "model", "groq", float(seconds))
+    assert hedge_delay("p90", ("model", "groq"), cache) == 10.0
+    assert hedge_delay("p50", ("model", "groq"), cache) == 6.0
+
+def test_cli_race_reports_winner_and_latencies(fake_provider, tmp_path):
+    job_description = tmp_path / "job_description.txt"
+    job_description.write_text(DOCUMENTS[1])
+    result = CliRunner().invoke(main, [
+        "--model", "slow-model,fast-model", "--provider", "openrouter,openrouter", "--race", "--race-delay", "0.1",
+        "--token-usage", "--no-cache", str(job_description)
+    ])
+    assert result.exit_code == 0, result.stderr
+    assert result.stdout.strip() == DEFAULT_REPLY
+    assert "Race winner: fast-model (openrouter)" in result.stderr
+    assert "primary slow-model (openrouter): cancelled" in result.stderr
+    assert "tokens (estimated)" in result.stderr
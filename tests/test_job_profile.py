@@ -0,0 +1,87 @@
+import json
+import pytest
+from click.testing import CliRunner
+import job_profile
+from batch import batch
+from benchmarks.fake_provider import DEFAULT_REPLY
+from job_profile import PROFILE_INSTRUCTIONS, format_profile, parse_profile
+from prompt import PROMPT_TEMPLATES, prepare_prompt
+
+JOB_DESCRIPTION = "\n".join(f"Requirement {i}: experience with Python, SQL and distributed systems." for i in range(60))
+PROFILE = {
+    "title": "Senior Python Developer", "seniority": "senior", "must_have": ["Python", "SQL"],
+    "nice_to_have": ["Kubernetes"], "keywords": ["python", "sql", "distributed systems"],
+    "responsibilities": ["Build data services"], "summary": "Backend role.",
+}
+
+@pytest.fixture
+def fake_provider(start_fake_provider):
+    requests = []
+
+    def reply(request):
+        requests.append(request)
+        if request["messages"][0]["content"] == PROFILE_INSTRUCTIONS:
+            return "```json\n" + json.dumps(PROFILE) + "\n```"
+        return DEFAULT_REPLY
+
+    provider = start_fake_provider(reply=reply)
+    provider.requests = requests
+    return provider
+
+def test_parse_profile_tolerates_fences_and_missing_fields():
+    profile = parse_profile('Here it is:\n```json\n{"must_have": ["Python"], "title": "Dev"}\n```')
+    assert profile["must_have"] == ["Python"]
+    assert profile["seniority"] == "unknown"
+    assert profile["keywords"] == []
+    assert parse_profile("no json here") is None
+    assert parse_profile('{"title": "Dev"}') is None
+
+def test_format_profile_is_compact():
+    text = format_profile(PROFILE)
+    assert text.startswith("Job Description (requirements profile")
+    assert "Must have: Python; SQL" in text
+    assert len(text) < len(JOB_DESCRIPTION) / 10
+
+def test_instructions_go_in_a_stable_system_message():
+    _, info = prepare_prompt(["Resume.", "Job."], "detailed", "llama3-8b-8192")
+    system, user = info["messages"]
+    assert system == {"role": "system", "content": PROMPT_TEMPLATES["detailed"]}
+    assert user == {"role": "user", "content": "Resume.\n\nJob."}
+
+def test_batch_builds_one_profile_per_job_description(tmp_path, fake_provider):
+    (tmp_path / "job.txt").write_text(JOB_DESCRIPTION)
+    (tmp_path / "cover.txt").write_text("I would love to join your team.")
+    lines = ["id,resume,cover_letter,job_description"]
+    for i in range(3):
+        (tmp_path / f"resume{i}.txt").write_text(f"Candidate {i}, Python developer.")
+        lines.append(f"c{i},resume{i}.txt,cover.txt,job.txt")
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("\n".join(lines) + "\n")
+    results = tmp_path / "results.jsonl"
+
+    result = CliRunner().invoke(batch, [
+        "--model", "fake-model", "--provider", "openrouter", "--workers", "1", "--job-profile",
+        "--cache-dir", str(tmp_path / "cache"), "--results", str(results), str(manifest)
+    ])
+    assert result.exit_code == 0, result.output
+
+    profile_requests = [r for r in fake_provider.requests if r["messages"][0]["content"] == PROFILE_INSTRUCTIONS]
+    analysis_requests = [r for r in fake_provider.requests if r not in profile_requests]
+    assert len(profile_requests) == 1
+    assert len(analysis_requests) == 3
+    for request in analysis_requests:
+        user = request["messages"][1]["content"]
+        assert "Must have: Python; SQL" in user
+        assert "Requirement 59" not in user
+    records = [json.loads(line) for line in results.read_text().splitlines()]
+    assert [record["job_profile"]["cached"] for record in records] == [False, True, True]
+
+    # A later run reads the profile from the disk cache
+    job_profile._profiles.clear()
+    results.unlink()
+    result = CliRunner().invoke(batch, [
+        "--model", "fake-model", "--provider", "openrouter", "--job-profile",
+        "--cache-dir", str(tmp_path / "cache"), "--results", str(results), str(manifest)
+    ])
+    assert result.exit_code == 0, result.output
+    assert len([r for r in fake_provider.requests if r["messages"][0]["content"] == PROFILE_INSTRUCTIONS]) == 1
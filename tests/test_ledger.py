@@ -0,0 +1,110 @@
+import json
+import time
+import pytest
+from click.testing import CliRunner
+import main
+from ledger import MIN_SAMPLES, call_cost, open_ledger, select_pair, stats
+from utils import call_provider
+
+def record_calls(ledger, model, latencies, provider="openrouter", ts=None):
+    for latency in latencies:
+        ledger.record(model, provider, latency, mode="basic", usage={"prompt_tokens": 1000, "completion_tokens": 100, "total_tokens": 1100}, ts=ts)
+
+def test_every_request_is_recorded(tmp_path, fake_provider):
+    ledger = open_ledger(str(tmp_path)).attach()
+    try:
+        call_provider("Compare this resume.", "fake-key", "fake-model", "openrouter", mode="detailed")
+        call_provider("Compare this resume.", "fake-key", "fake-model", "openrouter", on_chunk=lambda text: None)
+        fake_provider.error_rate = 1.0
+        with pytest.raises(Exception):
+            call_provider("Compare this resume.", "fake-key", "fake-model", "openrouter")
+    finally:
+        ledger.close()
+
+    ledger = open_ledger(str(tmp_path))
+    calls = list(reversed(ledger.calls()))
+    assert [(call["model"], call["provider"], call["stream"], call["status"]) for call in calls] == [
+        ("fake-model", "openrouter", 0, "ok"), ("fake-model", "openrouter", 1, "ok"), ("fake-model", "openrouter", 0, "error")]
+    assert calls[0]["mode"] == "detailed"
+    assert calls[0]["total_tokens"] == calls[0]["prompt_tokens"] + calls[0]["completion_tokens"] > 0
+    assert calls[1]["ttft"] is not None and calls[1]["ttft"] <= calls[1]["latency"]
+    assert calls[2]["error"]
+
+    summary = ledger.summary()
+    assert summary[0]["calls"] == 3 and summary[0]["errors"] == 1
+    assert summary[0]["cost"] is None
+    ledger.close()
+
+def test_a_failing_ledger_write_does_not_fail_the_request(tmp_path, fake_provider, capsys):
+    ledger = open_ledger(str(tmp_path)).attach()
+    try:
+        ledger._connection.execute("DROP TABLE calls")
+        for _ in range(2):
+            analysis, _ = call_provider("Compare this resume.", "fake-key", "fake-model", "openrouter")
+            assert analysis
+    finally:
+        ledger.close()
+    assert capsys.readouterr().err.count("could not record calls in the usage ledger") == 1
+
+def test_summary_percentiles_and_cost(tmp_path):
+    ledger = open_ledger(str(tmp_path))
+    record_calls(ledger, "llama3-8b-8192", [0.1 * index for index in range(1, 21)], provider="groq")
+    pair = ledger.summary()[0]
+    assert pair["latency_p50"] == pytest.approx(1.1)
+    assert pair["latency_p95"] == pytest.approx(2.0)
+    assert pair["cost"] == pytest.approx(20 * call_cost("llama3-8b-8192", 1000, 100))
+    assert call_cost("some/model:free", 1000, 100) == 0
+    assert call_cost("custom", 1_000_000, 0, prices={"custom": {"prompt": 2, "completion": 4}}) == 2
+
+def test_select_pair_probes_then_picks_fastest_or_cheapest(tmp_path):
+    ledger = open_ledger(str(tmp_path))
+    candidates = [("llama3-70b-8192", "groq"), ("llama3-8b-8192", "groq")]
+    record_calls(ledger, "llama3-70b-8192", [0.5, 0.6, 0.7], provider="groq")
+    assert select_pair(ledger, candidates)[:2] == ("llama3-8b-8192", "groq")
+
+    record_calls(ledger, "llama3-8b-8192", [1.0, 1.1, 1.2], provider="groq")
+    assert select_pair(ledger, candidates)[:2] == ("llama3-70b-8192", "groq")
+    assert select_pair(ledger, candidates, objective="cost")[:2] == ("llama3-8b-8192", "groq")
+    # The cheaper pair misses the SLO, so cost falls back to the pair meeting it
+    assert select_pair(ledger, candidates, objective="cost", latency_slo=0.8)[:2] == ("llama3-70b-8192", "groq")
+
+    model, provider, reason = select_pair(ledger, candidates, now=time.time() + 2 * 86400, reprobe_after=86400)
+    assert reason.startswith("re-probing")
+
+def test_select_pair_skips_a_pair_that_always_fails(tmp_path):
+    ledger = open_ledger(str(tmp_path))
+    candidates = [("broken", "openrouter"), ("working", "openrouter")]
+    for _ in range(MIN_SAMPLES):
+        ledger.record("broken", "openrouter", 0.1, status="error", error="boom")
+    # Failed calls still count as probes
+    assert select_pair(ledger, candidates)[:2] == ("working", "openrouter")
+
+    record_calls(ledger, "working", [2.0, 2.1, 2.2])
+    assert select_pair(ledger, candidates)[:2] == ("working", "openrouter")
+    assert select_pair(ledger, candidates, latency_slo=1.0)[:2] == ("working", "openrouter")
+
+def test_stats_command_prints_json(tmp_path):
+    ledger = open_ledger(str(tmp_path))
+    record_calls(ledger, "llama3-8b-8192", [0.2, 0.4], provider="groq")
+    ledger.close()
+    result = CliRunner().invoke(stats, ["--cache-dir", str(tmp_path), "--json"])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.stdout)[0]["calls"] == 2
+
+    result = CliRunner().invoke(stats, ["--cache-dir", str(tmp_path)])
+    assert "llama3-8b-8192 (groq)" in result.stdout
+
+def test_model_auto_uses_the_ledger(tmp_path, monkeypatch, fake_provider):
+    ledger = open_ledger(str(tmp_path))
+    record_calls(ledger, "slow-model", [3.0, 3.2, 3.4])
+    record_calls(ledger, "fast-model", [0.3, 0.4, 0.5])
+    ledger.close()
+    config = {"cache_dir": str(tmp_path), "auto": {"candidates": [["slow-model", "openrouter"], ["fast-model", "openrouter"]]}}
+    monkeypatch.setattr(main, "load_config", lambda: config)
+    (tmp_path / "resume.txt").write_text("Python developer.")
+    (tmp_path / "job.txt").write_text("Python role.")
+
+    result = CliRunner().invoke(main.main, ["--model", "auto", "--no-cache", str(tmp_path / "resume.txt"), str(tmp_path / "job.txt")])
+    assert result.exit_code == 0, result.output
+    assert "Auto-selected fast-model (openrouter): fastest" in result.stderr
+    assert len(open_ledger(str(tmp_path)).calls(model="fast-model")) == 4
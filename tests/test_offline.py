@@ -0,0 +1,90 @@
+import json
+from click.testing import CliRunner
+from batch import batch
+from benchmarks.fake_provider import DEFAULT_REPLY
+from offline import result_record, run_offline_batch, state_path
+from scheduler import configure_scheduler
+
+def write_manifest(tmp_path, count):
+    for name in ["resume", "cover_letter", "job_description"]:
+        (tmp_path / f"{name}.txt").write_text(f"Sample {name} content.")
+    manifest = tmp_path / "manifest.csv"
+    lines = ["id,resume,cover_letter,job_description"]
+    lines += [f"cand-{i},resume.txt,cover_letter.txt,job_description.txt" for i in range(count)]
+    lines.append("broken,missing.txt,cover_letter.txt,job_description.txt")
+    manifest.write_text("\n".join(lines) + "\n")
+    return str(manifest)
+
+def read_results(path):
+    return [json.loads(line) for line in open(path)]
+
+def test_offline_batch_submits_once_and_maps_results(tmp_path, fake_provider):
+    manifest, results = write_manifest(tmp_path, 3), str(tmp_path / "results.jsonl")
+    polls = []
+    counts = run_offline_batch(manifest, results, "llama3-8b-8192", "groq", "basic", on_status=polls.append, poll_interval=0, sleep=lambda seconds: None)
+
+    assert (counts["ok"], counts["failed"], counts["pending"]) == (3, 1, 0)
+    assert fake_provider.stats["batches"] == 1
+    assert polls[-1]["status"] == "completed" and polls[-1]["request_counts"]["total"] == 3
+    records = {record["id"]: record for record in read_results(results)}
+    assert records["cand-0"]["analysis"] == DEFAULT_REPLY
+    assert records["cand-0"]["token_usage"]["total_tokens"] > 0
+    assert records["broken"]["status"] == "failed"
+    # The submission state and input file are cleaned up once collected
+    assert not (tmp_path / "results.jsonl.offline.json").exists()
+    assert not list(tmp_path.glob("results.jsonl.offline-*"))
+
+def test_a_retried_upload_sends_the_whole_file(tmp_path, fake_provider):
+    configure_scheduler("groq", base_delay=0.01)
+    fake_provider.upload_errors = 1
+    manifest, results = write_manifest(tmp_path, 2), str(tmp_path / "results.jsonl")
+    counts = run_offline_batch(manifest, results, "llama3-8b-8192", "groq", "basic", poll_interval=0)
+    assert fake_provider.upload_errors == 0
+    assert counts["ok"] == 2
+    assert [len(data.splitlines()) for data in fake_provider.files.values()][0] == 2
+
+def test_no_wait_resumes_the_submitted_batch(tmp_path, fake_provider):
+    fake_provider.batch_delay = 60
+    manifest, results = write_manifest(tmp_path, 2), str(tmp_path / "results.jsonl")
+    counts = run_offline_batch(manifest, results, "llama3-8b-8192", "groq", "basic", wait=False)
+    assert counts["pending"] == 2 and counts["batches"][0]["status"] == "in_progress"
+    assert json.load(open(state_path(results)))["batches"][0]["id"] == counts["batches"][0]["id"]
+
+    fake_provider.batch_delay = 0
+    for batch_state in fake_provider.batches.values():
+        batch_state["_ready_at"] = 0
+    counts = run_offline_batch(manifest, results, "llama3-8b-8192", "groq", "basic", wait=False)
+    assert (counts["ok"], counts["pending"]) == (2, 0)
+    assert fake_provider.stats["batches"] == 1
+
+def test_cached_prompts_skip_the_batch_and_failures_are_retried(tmp_path, fake_provider):
+    from cache import open_cache
+    cache = open_cache(str(tmp_path / "cache"))
+    manifest, results = write_manifest(tmp_path, 2), str(tmp_path / "results.jsonl")
+    fake_provider.error_rate = 1.0
+    counts = run_offline_batch(manifest, results, "llama3-8b-8192", "groq", "basic", cache=cache, poll_interval=0)
+    assert counts["failed"] == 3
+    assert "status code 500" in read_results(results)[-1]["error"]
+
+    fake_provider.error_rate = 0.0
+    assert run_offline_batch(manifest, results, "llama3-8b-8192", "groq", "basic", cache=cache, poll_interval=0)["ok"] == 2
+    # Every prompt is now cached, so nothing is submitted again
+    (tmp_path / "results.jsonl").unlink()
+    assert run_offline_batch(manifest, results, "llama3-8b-8192", "groq", "basic", cache=cache, poll_interval=0)["ok"] == 2
+    assert fake_provider.stats["batches"] == 2
+
+def test_result_record_reads_error_lines():
+    record = result_record({"custom_id": "a", "response": None, "error": {"code": "batch_expired", "message": "expired"}}, {"id": "a"})
+    assert record["status"] == "failed" and "expired" in record["error"]
+
+def test_offline_cli_rejects_providers_without_a_batch_api(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "fake-key")
+    manifest = write_manifest(tmp_path, 1)
+    args = ["--model", "some/model", "--provider", "openrouter", "--offline", "--results", str(tmp_path / "results.jsonl"), "--cache-dir", str(tmp_path), manifest]
+    result = CliRunner().invoke(batch, args)
+    assert result.exit_code == 1
+    assert "openrouter provider has no batch API" in result.stderr
+    assert not list(tmp_path.glob("results.jsonl.offline*"))
+
+    result = CliRunner().invoke(batch, ["--model", "m", "--provider", "groq", "--offline", "--job-profile", manifest])
+    assert result.exit_code == 1 and "--offline cannot be combined" in result.stderr
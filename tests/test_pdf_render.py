@@ -0,0 +1,87 @@
+import io
+import zlib
+import re
+from unittest.mock import patch
+import pytest
+from pdf_render import PdfWriter, UnsupportedCharacters, layout, parse_markdown, render_pdf_bytes
+from utils import generate_pdf
+
+REPORT = """# Analysis Report
+1. **Brief Introduction**:
+   - The candidate (Jane) fits the role.
+
+Plain paragraph with a backslash \\ in it."""
+
+def page_text(pdf):
+    """Decompress every content stream and return the text shown on the pages."""
+    streams = re.findall(rb"stream\n(.*?)\nendstream", pdf, re.S)
+    return b"".join(zlib.decompress(stream) for stream in streams)
+
+def test_parse_markdown_keeps_structure():
+    kinds = [block["kind"] for block in parse_markdown(REPORT)]
+    assert kinds == ["heading", "numbered", "bullet", "blank", "paragraph"]
+    numbered = parse_markdown(REPORT)[1]
+    assert numbered["marker"] == "1."
+    assert numbered["runs"] == [("Brief Introduction", True), (":", False)]
+    assert parse_markdown(REPORT)[2]["level"] == 1
+
+def test_render_pdf_bytes_is_valid_pdf_with_escaped_text():
+    pdf = render_pdf_bytes(REPORT)
+    assert pdf.startswith(b"%PDF-1.4")
+    assert pdf.rstrip().endswith(b"%%EOF")
+    text = page_text(pdf)
+    assert b"/F2" in text
+    assert b"(Brief Introduction) Tj" in text
+    assert b"\\(Jane\\)" in text
+    assert b"\\\\" in text
+
+def test_long_content_wraps_onto_several_pages():
+    pages = layout(parse_markdown("A fairly long line of report text that wraps. " * 2000))
+    assert len(pages) > 1
+    assert all(run[0] <= 612 - 72 for page in pages for run in page)
+
+def test_generate_pdf_does_not_spawn_wkhtmltopdf(tmp_path):
+    output = tmp_path / "report.pdf"
+    with patch("utils.pdfkit.from_string") as mock_pdfkit:
+        generate_pdf(REPORT, str(output))
+    mock_pdfkit.assert_not_called()
+    assert output.read_bytes().startswith(b"%PDF")
+
+def test_generate_pdf_rejects_unknown_backend(tmp_path):
+    with pytest.raises(Exception, match="Unsupported PDF backend"):
+        generate_pdf(REPORT, str(tmp_path / "report.pdf"), backend="latex")
+
+def test_text_outside_the_builtin_fonts_is_never_replaced(tmp_path):
+    content = "Candidate: Łukasz Żółw 王小明 → café"
+    with pytest.raises(UnsupportedCharacters, match="cannot show: Ł, Ż, ł, 王, 小, 明. "):
+        render_pdf_bytes(content)
+    assert b"caf\xe9" in page_text(render_pdf_bytes("Accents like café are fine."))
+
+    output = tmp_path / "report.pdf"
+    with patch("utils.shutil.which", return_value=None):
+        with pytest.raises(Exception, match="install wkhtmltopdf"):
+            generate_pdf(content, str(output))
+    assert not output.exists()
+
+    # With wkhtmltopdf installed, such reports are converted with it instead
+    with patch("utils.shutil.which", return_value="/usr/bin/wkhtmltopdf"), patch("utils.pdfkit.from_string") as mock_pdfkit:
+        generate_pdf(content, str(output))
+    assert content in mock_pdfkit.call_args[0][0]
+
+def test_common_symbols_are_shown_as_plain_text(tmp_path):
+    content = "# Fit \u2192 strong\n- \u2713 Python \u2265 5 years\n- \u2717 Go\n- Salary \u2212 10\u202f%"
+    text = page_text(render_pdf_bytes(content))
+    assert b"Fit -> strong" in text and b"[x] Python >= 5 years" in text and b"[ ] Go" in text and b"Salary - 10 %" in text
+
+    # The in-process renderer handles them without wkhtmltopdf
+    output = tmp_path / "report.pdf"
+    with patch("utils.shutil.which", return_value=None):
+        generate_pdf(content, str(output))
+    assert output.read_bytes().startswith(b"%PDF")
+
+def test_bookmark_titles_keep_any_script():
+    output = io.BytesIO()
+    writer = PdfWriter(output)
+    page = writer.add_page([])
+    writer.close([page], [("王小明", page)])
+    assert b"/Title <FEFF738B5C0F660E>" in output.getvalue()
@@ -2,7 +2,7 @@ import pytest
 from utils import process_files
  
 def test_process_files_unsupported_file_format():
-    files = ["unsupported_file_format.pdf"]  # Unsupported format for process_files
+    files = ["unsupported_file_format.xyz"]  # Unsupported format for process_files
     api_key = "test_key"
     model = "llama3-8b-8192"
     mode = "detailed"
@@ -0,0 +1,64 @@
+from click.testing import CliRunner
+from main import main
+from prompt import compact_text, context_limit, estimate_tokens, fit_documents, prepare_prompt, PROMPT_TEMPLATES
+
+def test_templates_are_dedented():
+    for template in PROMPT_TEMPLATES.values():
+        assert not template.startswith((" ", "\n"))
+        assert "\n        Attached" not in template
+
+def test_compact_text_normalizes_whitespace_and_drops_duplicates():
+    text = (
+        "Jane   Doe \r\n\r\n\r\n\r\n"
+        "Built data pipelines in Python for the analytics team.\n"
+        "Python\n\n"
+        "built data pipelines in python for the analytics team.\n"
+        "Python\n"
+    )
+    assert compact_text(text) == (
+        "Jane Doe\n\n"
+        "Built data pipelines in Python for the analytics team.\n"
+        "Python\n\n"
+        "Python"
+    )
+
+def test_estimate_tokens_counts_words_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Hello, world!") == 4
+    assert estimate_tokens("internationalization") > 1
+
+def test_fit_documents_trims_longest_first():
+    resume = "\n".join(f"Experience line number {i} with details." for i in range(200))
+    cover_letter = "Dear hiring manager, I am excited to apply."
+    job_description = "\n".join(f"Requirement {i}: Python and SQL." for i in range(50))
+    documents = [resume, cover_letter, job_description]
+    budget = 1000
+
+    fitted, trimmed = fit_documents(documents, budget)
+    assert trimmed == [0]
+    assert fitted[1] == cover_letter
+    assert fitted[2] == job_description
+    assert sum(estimate_tokens(document) for document in fitted) <= budget
+
+def test_prepare_prompt_uses_model_context_limit():
+    assert context_limit("llama3-8b-8192") == 8192
+    assert context_limit("mixtral-8x7b-32768") == 32768
+    assert context_limit("some/unknown-model") is None
+
+    huge = "".join(f"Project {i}: built a service handling many requests.\n" for i in range(5000))
+    prompt, info = prepare_prompt([huge, "Job description."], "basic", "llama3-8b-8192")
+    assert info["trimmed"] == [0]
+    assert info["estimated_tokens"] <= info["limit"] == 8192 - 1024
+    assert prompt.startswith(PROMPT_TEMPLATES["basic"])
+    assert prompt.endswith("Job description.")
+
+def test_cli_dry_run_prints_estimate_without_calling_provider(tmp_path):
+    job_description = tmp_path / "job_description.txt"
+    job_description.write_text("Looking for a Python developer.\n" * 300)
+    result = CliRunner().invoke(main, [
+        "--model", "llama3-8b-8192", "--provider", "groq", "--no-cache",
+        "--max-prompt-tokens", "200", "--dry-run", str(job_description)
+    ])
+    assert result.exit_code == 0
+    assert "llama3-8b-8192: ~" in result.output
+    assert "(limit: 200, trimmed: " + str(job_description) + ")" in result.output
@@ -0,0 +1,42 @@
+import pytest
+from unittest.mock import patch
+from utils import call_provider, close_clients, configure_clients
+
+openrouter_response = {
+    "choices": [{"message": {"content": "OpenRouter analysis"}}],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30},
+}
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    close_clients()
+    yield
+    close_clients()
+
+def test_openrouter_reuses_one_session_with_timeouts():
+    configure_clients(pool_size=4, connect_timeout=3, read_timeout=30)
+    with patch("utils.requests.Session") as mock_session_class:
+        session = mock_session_class.return_value
+        session.post.return_value.status_code = 200
+        session.post.return_value.json.return_value = openrouter_response
+
+        for _ in range(3):
+            content, usage = call_provider("prompt", "test_key", "some/model", "openrouter")
+
+    assert mock_session_class.call_count == 1
+    assert session.post.call_count == 3
+    assert session.post.call_args.kwargs["timeout"] == (3, 30)
+    assert content == "OpenRouter analysis"
+    assert usage["total_tokens"] == 30
+
+def test_groq_client_is_created_once_per_api_key():
+    with patch("utils.Groq") as mock_groq_client:
+        completion = mock_groq_client.return_value.chat.completions.create.return_value
+        completion.choices[0].message.content = "Groq analysis"
+        completion.usage = {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3}
+
+        call_provider("prompt", "key_a", "llama3-8b-8192", "groq")
+        call_provider("prompt", "key_a", "llama3-8b-8192", "groq")
+        call_provider("prompt", "key_b", "llama3-8b-8192", "groq")
+
+    assert mock_groq_client.call_count == 2
@@ -0,0 +1,43 @@
+import os
+import time
+from unittest.mock import patch
+from cache import DiskCache, make_key
+from utils import process_content
+
+sample_usage = {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30}
+
+def test_process_content_reuses_cached_response(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    with patch("utils.call_provider", return_value=("Cached analysis", sample_usage)) as mock_call:
+        first = process_content("Resume text", "test_key", "llama3-8b-8192", "basic", True, "groq", cache=cache)
+        second = process_content("Resume text", "test_key", "llama3-8b-8192", "basic", True, "groq", cache=cache)
+        # A different mode is a different request
+        process_content("Resume text", "test_key", "llama3-8b-8192", "detailed", True, "groq", cache=cache)
+
+    assert mock_call.call_count == 2
+    assert first == second == ("Cached analysis", sample_usage)
+    assert cache.stats() == {"hits": 1, "misses": 2}
+
+def test_cache_ttl_expires_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    cache.set("key", {"content": "old"})
+    assert cache.get("key") == {"content": "old"}
+
+    with patch("cache.time.time", return_value=time.time() + 120):
+        assert cache.get("key") is None
+    assert not os.path.exists(tmp_path / "key.json")
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    keys = [make_key("entry", i) for i in range(3)]
+    cache.set(keys[0], "a" * 50)
+    cache.set(keys[1], "b" * 50)
+
+    # Touch the first entry so the second becomes least recently used
+    os.utime(tmp_path / f"{keys[1]}.json", (1, 1))
+    assert cache.get(keys[0]) == "a" * 50
+    cache.set(keys[2], "c" * 50)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "a" * 50
+    assert cache.get(keys[2]) == "c" * 50
@@ -0,0 +1,84 @@
+import pytest
+from unittest.mock import patch
+from scheduler import ProviderError, RequestScheduler, TokenBucket
+from utils import call_provider, close_clients
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def test_retries_rate_limits_honoring_retry_after():
+    clock = FakeClock()
+    scheduler = RequestScheduler(clock=clock, sleep=clock.sleep)
+    responses = [ProviderError("slow down", 429, retry_after=7), ProviderError("bad gateway", 502), "done"]
+
+    def request():
+        clock.now += 0.5
+        result = responses.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    timing = {}
+    assert scheduler.run(request, timing=timing) == "done"
+    assert clock.sleeps[0] == 7
+    assert 0 <= clock.sleeps[1] <= 2
+    assert timing["attempts"] == 3
+    assert timing["request_time"] == pytest.approx(1.5)
+    assert timing["queue_wait"] == pytest.approx(sum(clock.sleeps))
+
+def test_client_errors_are_not_retried():
+    clock = FakeClock()
+    scheduler = RequestScheduler(clock=clock, sleep=clock.sleep)
+
+    def request():
+        raise ProviderError("unauthorized", 401)
+
+    with pytest.raises(ProviderError, match="unauthorized"):
+        scheduler.run(request)
+    assert clock.sleeps == []
+
+def test_gives_up_after_max_retries():
+    clock = FakeClock()
+    scheduler = RequestScheduler(max_retries=2, clock=clock, sleep=clock.sleep)
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise ProviderError("unavailable", 503)
+
+    with pytest.raises(ProviderError):
+        scheduler.run(request)
+    assert len(calls) == 3
+
+def test_token_bucket_waits_for_budget_and_settles_usage():
+    clock = FakeClock()
+    bucket = TokenBucket(600, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire(600) == 0
+    # 600 tokens per minute refill at 10 per second
+    assert bucket.acquire(50) == pytest.approx(5)
+
+    # Actual usage above the reservation is charged to later callers
+    bucket.adjust(100)
+    assert bucket.acquire(10) == pytest.approx(11)
+
+def test_openrouter_429_carries_retry_after():
+    close_clients()
+    with patch("utils.requests.Session") as mock_session_class:
+        response = mock_session_class.return_value.post.return_value
+        response.status_code = 429
+        response.text = "rate limited"
+        response.headers = {"Retry-After": "3"}
+        with pytest.raises(ProviderError) as error:
+            call_provider("prompt", "test_key", "some/model", "openrouter")
+    close_clients()
+    assert error.value.status_code == 429
+    assert error.value.retry_after == 3
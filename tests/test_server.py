@@ -0,0 +1,129 @@
+import base64
+import os
+import threading
+import time
+import pytest
+import requests
+from docx import Document
+from benchmarks.fake_provider import DEFAULT_REPLY
+from server import AnalysisService, create_server
+
+RESUME = "Jane Doe, Python developer with SQL and Docker."
+JOB_DESCRIPTION = "Looking for a Python developer who knows SQL."
+
+@pytest.fixture
+def start_server():
+    started = []
+
+    def start(**settings):
+        service = AnalysisService("fake-model", "openrouter", **settings)
+        server = create_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        started.append((server, service))
+        host, port = server.server_address[:2]
+        return service, f"http://{host}:{port}"
+
+    yield start
+    for server, service in started:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+def test_sync_analysis_returns_text(fake_provider, start_server):
+    _, url = start_server()
+    response = requests.post(f"{url}/analyze", json={"documents": [RESUME, JOB_DESCRIPTION]})
+    assert response.status_code == 200
+    assert response.text == DEFAULT_REPLY
+    assert response.headers["Content-Type"].startswith("text/plain")
+
+def test_submit_then_poll_renders_pdf_and_docx(fake_provider, start_server):
+    _, url = start_server()
+    response = requests.post(f"{url}/jobs", json={"documents": [RESUME, JOB_DESCRIPTION], "format": "pdf"})
+    assert response.status_code == 202
+    job_url = url + response.headers["Location"]
+
+    for _ in range(100):
+        job = requests.get(job_url).json()
+        if job["status"] == "done":
+            break
+        time.sleep(0.02)
+    assert job["status"] == "done"
+    assert job["token_usage"]["total_tokens"] > 0
+
+    assert requests.get(f"{job_url}/result").content.startswith(b"%PDF")
+    docx = requests.get(f"{job_url}/result", params={"format": "docx"})
+    assert docx.content.startswith(b"PK")
+
+def test_uploaded_files_are_parsed_once(tmp_path, fake_provider, start_server):
+    service, url = start_server()
+    resume = tmp_path / "resume.docx"
+    document = Document()
+    document.add_paragraph(RESUME)
+    document.save(resume)
+    files = [
+        {"name": "resume.docx", "content": base64.b64encode(resume.read_bytes()).decode()},
+        {"name": "job.txt", "content": base64.b64encode(JOB_DESCRIPTION.encode()).decode()},
+    ]
+    for _ in range(2):
+        assert requests.post(f"{url}/analyze", json={"files": files}).status_code == 200
+    assert len(service._uploads) == 2
+    assert service.metrics.snapshot()["extract"]["count"] == 2
+
+def test_uploads_are_cached_on_disk_by_content(tmp_path, fake_provider, start_server):
+    import utils
+    from cache import open_cache
+    text_cache = open_cache(str(tmp_path / "cache"), namespace="text")
+    files = [
+        {"name": "resume.txt", "content": base64.b64encode(RESUME.encode()).decode()},
+        {"name": "job.txt", "content": base64.b64encode(JOB_DESCRIPTION.encode()).decode()},
+    ]
+    service, url = start_server(text_cache=text_cache)
+    assert requests.post(f"{url}/analyze", json={"files": files}).status_code == 200
+    assert service.metrics.snapshot()["extract"]["count"] == 2
+    # Temporary upload paths never recur, so they take no slot in the in-memory text cache
+    assert not [signature for signature in utils._text_cache if os.path.basename(signature[0]).startswith("upload.")]
+
+    # A restarted server finds the same uploads in the disk cache
+    service, url = start_server(text_cache=text_cache)
+    assert requests.post(f"{url}/analyze", json={"files": files}).status_code == 200
+    assert "extract" not in service.metrics.snapshot()
+
+def test_full_queue_answers_429(fake_provider, start_server):
+    fake_provider.latency = 0.5
+    _, url = start_server(workers=1, max_pending=1)
+    first = requests.post(f"{url}/jobs", json={"documents": [RESUME, JOB_DESCRIPTION]})
+    second = requests.post(f"{url}/jobs", json={"documents": [RESUME, JOB_DESCRIPTION]})
+    assert first.status_code == 202
+    assert second.status_code == 429
+    assert second.headers["Retry-After"] == "1"
+    assert requests.get(f"{url}/health").json()["pending"] == 1
+
+def test_bad_requests_are_rejected(start_server):
+    _, url = start_server()
+    assert requests.post(f"{url}/jobs", json={}).status_code == 400
+    assert requests.post(f"{url}/jobs", json={"documents": ["x"], "format": "rtf"}).status_code == 400
+    for mode in ("local", "detaild"):
+        response = requests.post(f"{url}/jobs", json={"documents": ["x"], "analysis_mode": mode})
+        assert response.status_code == 400 and "analysis_mode" in response.text
+    assert requests.get(f"{url}/jobs/missing").status_code == 404
+
+def test_serve_uses_the_configured_cache_dir(tmp_path, monkeypatch):
+    import main
+    import server
+    from click.testing import CliRunner
+
+    class StoppedServer:
+        server_address = ("127.0.0.1", 0)
+
+        def serve_forever(self):
+            raise KeyboardInterrupt
+
+        def server_close(self):
+            pass
+
+    monkeypatch.setattr(main, "load_config", lambda: {"cache_dir": str(tmp_path / "configured")})
+    monkeypatch.setattr(server, "create_server", lambda *args: StoppedServer())
+    monkeypatch.setattr("scheduler._schedulers", {})
+    result = CliRunner().invoke(server.serve, ["-m", "fake-model", "-p", "openrouter"])
+    assert result.exit_code == 0, result.output
+    assert sorted(path.name for path in (tmp_path / "configured").iterdir()) == ["ledger.sqlite3", "profiles", "responses", "text"]
@@ -0,0 +1,14 @@
+from benchmarks.bench_startup import HEAVY_MODULES, command_seconds, import_profile
+
+# Generous budgets: the eager imports took about 0.5 s for `import main` and 0.8 s for --version
+IMPORT_BUDGET_SECONDS = 0.3
+VERSION_BUDGET_SECONDS = 0.6
+
+def test_importing_main_skips_heavy_dependencies():
+    profile = import_profile("main")
+    assert [name for name in HEAVY_MODULES if name in profile] == []
+    assert profile["main"] / 1e6 < IMPORT_BUDGET_SECONDS
+
+def test_version_starts_within_budget():
+    # Best of three, to ignore a cold filesystem cache
+    assert min(command_seconds("--version") for _ in range(3)) < VERSION_BUDGET_SECONDS
@@ -0,0 +1,81 @@
+import json
+import os
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from click.testing import CliRunner
+from main import main
+from utils import call_provider, close_clients
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    close_clients()
+    yield
+    close_clients()
+
+def sse(payload):
+    return "data: " + json.dumps(payload)
+
+def test_openrouter_stream_yields_chunks_and_usage():
+    lines = [
+        ": OPENROUTER PROCESSING",
+        sse({"choices": [{"delta": {"content": "Hello"}}]}),
+        "",
+        sse({"choices": [{"delta": {"content": " there"}}]}),
+        sse({"choices": [{"delta": {}}], "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}}),
+        "data: [DONE]",
+    ]
+    chunks = []
+    with patch("utils.requests.Session") as mock_session_class:
+        response = mock_session_class.return_value.post.return_value
+        response.status_code = 200
+        response.iter_lines.return_value = iter(lines)
+        content, usage = call_provider("prompt", "test_key", "some/model", "openrouter", on_chunk=chunks.append)
+
+    assert chunks == ["Hello", " there"]
+    assert content == "Hello there"
+    assert usage["total_tokens"] == 7
+    assert mock_session_class.return_value.post.call_args.kwargs["stream"] is True
+
+def test_groq_stream_yields_chunks_and_usage():
+    def chunk(text, usage=None):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=text))],
+            x_groq=SimpleNamespace(usage=usage) if usage else None,
+        )
+
+    chunks = []
+    with patch("utils.Groq") as mock_groq_client:
+        mock_groq_client.return_value.chat.completions.create.return_value = iter([
+            chunk("Strong"), chunk(" fit"), chunk(None, usage={"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}),
+        ])
+        content, usage = call_provider("prompt", "test_key", "llama3-8b-8192", "groq", on_chunk=chunks.append)
+
+    assert chunks == ["Strong", " fit"]
+    assert content == "Strong fit"
+    assert usage == {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}
+    assert mock_groq_client.return_value.chat.completions.create.call_args.kwargs["stream"] is True
+
+def test_cli_stream_prints_chunks_and_saves_output(tmp_path):
+    job_description = tmp_path / "job_description.txt"
+    job_description.write_text("Sample job description content.")
+    output = tmp_path / "analysis.docx"
+
+    def fake_process_content(content, api_key, model, mode, token_usage, provider_name, **kwargs):
+        for text in ["Part one, ", "part two."]:
+            kwargs["on_chunk"](text)
+        return "Part one, part two.", {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3}
+
+    with patch("main.process_content", side_effect=fake_process_content), \
+         patch("main.generate_output") as mock_generate_output, \
+         patch.dict(os.environ, {"GROQ_API_KEY": "test_key"}):
+        result = CliRunner().invoke(main, [
+            "--model", "llama3-8b-8192", "--provider", "groq", "--stream", "--no-cache",
+            "--token-usage", "--output", str(output), str(job_description)
+        ])
+
+    assert result.exit_code == 0
+    assert "Part one, part two.\n" in result.output
+    assert "Total Tokens: 3" in result.output
+    mock_generate_output.assert_called_once()
+    assert mock_generate_output.call_args.args[0] == "Part one, part two."
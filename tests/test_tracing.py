@@ -0,0 +1,56 @@
+import json
+import pytest
+from click.testing import CliRunner
+import tracing
+from main import main
+from tracing import Metrics, add_metrics_hook, remove_metrics_hook, span, stop_trace
+
+def test_profile_writes_chrome_trace_of_every_stage(tmp_path, monkeypatch, fake_provider):
+    monkeypatch.chdir(tmp_path)
+    resume = tmp_path / "resume.txt"
+    resume.write_text("Jane Doe, Python developer.")
+    job_description = tmp_path / "job_description.txt"
+    job_description.write_text("Looking for a Python developer.")
+    trace_file = tmp_path / "trace.json"
+
+    result = CliRunner().invoke(main, [
+        "--model", "fake-model", "--provider", "openrouter", "--no-cache",
+        "--output", "report.pdf", "--profile", str(trace_file), str(resume), str(job_description)
+    ])
+    assert result.exit_code == 0, result.output
+
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    spans = {event["name"]: event for event in events if event["ph"] == "X"}
+    assert {"read_files", "extract", "prompt", "model_provider", "provider", "request", "parse", "render"} <= set(spans)
+    assert spans["read_files"]["args"]["files"] == 2
+    assert spans["prompt"]["args"]["estimated_tokens"] > 0
+    assert spans["request"]["args"]["status"] == 200
+    assert spans["request"]["args"]["ttfb_ms"] >= 0
+    assert spans["provider"]["args"]["attempts"] == 1
+    assert spans["render"]["args"]["bytes"] > 0
+    assert all(event["dur"] >= 0 for event in spans.values())
+
+def test_spans_are_not_recorded_when_tracing_is_off():
+    with span("idle") as current:
+        current.set(bytes=1)
+    assert stop_trace() == []
+
+def test_metrics_hook_counts_and_buckets_spans():
+    metrics = Metrics(buckets=(0.5, 1.0))
+    add_metrics_hook(metrics.observe)
+    try:
+        with span("request", bytes=10, stream=False):
+            pass
+        with pytest.raises(ValueError):
+            with span("request", bytes=5):
+                raise ValueError("boom")
+    finally:
+        remove_metrics_hook(metrics.observe)
+
+    stats = metrics.snapshot()["request"]
+    assert stats["count"] == 2
+    assert stats["errors"] == 1
+    assert stats["totals"] == {"bytes": 15}
+    assert stats["buckets"] == {"0.5": 2, "1.0": 2, "+Inf": 2}
+    assert 'tailor4job_span_seconds_count{span="request"} 2' in metrics.to_prometheus()
+    assert not tracing.enabled()
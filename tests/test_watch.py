@@ -0,0 +1,60 @@
+import threading
+import pytest
+from prompt import PROMPT_TEMPLATES
+from watch import analyze_sections, plan_sections, watch_files
+
+@pytest.fixture
+def fake_provider(start_fake_provider):
+    sections = []
+
+    def reply(request):
+        # Name the section from its instructions so the test can see what was requested
+        template = next(name for name, text in PROMPT_TEMPLATES.items() if text == request["messages"][0]["content"])
+        sections.append(template)
+        return f"Analysis for {template}."
+
+    provider = start_fake_provider(reply=reply)
+    provider.sections = sections
+    return provider
+
+def test_plan_sections_depend_only_on_their_documents():
+    plan = {name: documents for name, _, _, documents in plan_sections(["Resume.", "Letter.", "Job."], "detailed")}
+    assert plan == {"resume": ["Resume.", "Job."], "cover_letter": ["Letter.", "Job."], "summary": ["Resume.", "Letter.", "Job."]}
+    assert [name for name, _, _, _ in plan_sections(["Resume.", "Job."], "detailed")] == ["resume", "summary"]
+    assert plan_sections(["Resume.", "Job."], "basic") == [("analysis", None, "basic", ["Resume.", "Job."])]
+
+def test_edit_re_requests_only_changed_sections(fake_provider):
+    memo = {}
+    report, info = analyze_sections(["Resume.", "Letter.", "Job."], "key", "fake-model", "detailed", "openrouter", memo=memo)
+    assert info["sections"] == {"resume": "analyzed", "cover_letter": "analyzed", "summary": "analyzed"}
+    assert report.index("**Resume vs Job Description**") < report.index("**Cover Letter vs Job Description**") < report.index("**Summary**")
+    assert info["usage"]["total_tokens"] > 0
+
+    fake_provider.sections.clear()
+    report, info = analyze_sections(["Resume, edited.", "Letter.", "Job."], "key", "fake-model", "detailed", "openrouter", memo=memo)
+    assert sorted(fake_provider.sections) == ["resume_section", "summary_section"]
+    assert info["sections"]["cover_letter"] == "reused"
+    assert "Analysis for cover_letter_section." in report
+
+    fake_provider.sections.clear()
+    _, info = analyze_sections(["Resume, edited.", "Letter.", "Job."], "key", "fake-model", "detailed", "openrouter", memo=memo)
+    assert fake_provider.sections == []
+    assert info["usage"] is None
+
+def test_watch_files_debounces_bursts_of_writes(tmp_path):
+    resume, job = tmp_path / "resume.txt", tmp_path / "job.txt"
+    resume.write_text("Resume.")
+    job.write_text("Job.")
+    calls, stop = [], threading.Event()
+
+    def on_change(changed):
+        calls.append(changed)
+        stop.set()
+
+    watcher = threading.Thread(target=watch_files, args=([str(resume), str(job)], on_change), kwargs={"interval": 0.01, "debounce": 0.2, "stop": stop})
+    watcher.start()
+    for index in range(3):
+        resume.write_text("Resume." + " edited" * (index + 1))
+        stop.wait(0.05)
+    watcher.join(5)
+    assert calls == [[str(resume)]]
@@ -0,0 +1,181 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the latency histogram buckets kept by `Metrics`
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_events = None
+_events_lock = threading.Lock()
+_hooks = []
+_origin = time.perf_counter()
+
+
+class Span:
+    """One timed stage; `set` attaches counts (bytes, tokens, ...) to it."""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class _NoSpan:
+    """Stand-in yielded when nothing is recording, so spans cost almost nothing."""
+
+    def set(self, **args):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def enabled():
+    return _events is not None or bool(_hooks)
+
+
+@contextmanager
+def span(name, **args):
+    """
+    Time the enclosed block as stage `name`.
+
+    The span is recorded for `write_trace` while tracing is on and passed to
+    every metrics hook; otherwise the block just runs.
+    """
+    if not enabled():
+        yield _NO_SPAN
+        return
+    current = Span(name, args)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.args.setdefault('error', type(e).__name__)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _record({'name': name, 'ph': 'X', 'ts': (start - _origin) * 1e6, 'dur': duration * 1e6}, current.args)
+        for hook in list(_hooks):
+            hook(name, duration, current.args)
+
+
+def record_span(name, duration, **args):
+    """
+    Record a stage that ended `duration` seconds after it started, without
+    timing a block: for work abandoned before its own span could end.
+    """
+    if not enabled():
+        return
+    _record({'name': name, 'ph': 'X', 'ts': (time.perf_counter() - duration - _origin) * 1e6, 'dur': duration * 1e6}, args)
+    for hook in list(_hooks):
+        hook(name, duration, args)
+
+
+def mark(name, **args):
+    """Record an instant event, such as the first byte of a response."""
+    if _events is not None:
+        _record({'name': name, 'ph': 'i', 's': 't', 'ts': (time.perf_counter() - _origin) * 1e6}, args)
+
+
+def _record(event, args):
+    if _events is None:
+        return
+    event.update(pid=os.getpid(), tid=threading.get_ident(), args=dict(args))
+    with _events_lock:
+        _events.append(event)
+
+
+def start_trace():
+    """Start recording spans for `write_trace`, dropping any recorded before."""
+    global _events
+    with _events_lock:
+        _events = []
+
+
+def stop_trace():
+    """Stop recording and return the recorded events."""
+    global _events
+    with _events_lock:
+        events, _events = _events or [], None
+    return events
+
+
+def write_trace(path):
+    """Stop recording and write the spans as a Chrome trace (chrome://tracing, Perfetto)."""
+    events = stop_trace()
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+
+def add_metrics_hook(hook):
+    """Call `hook(name, duration_seconds, args)` whenever a span ends."""
+    _hooks.append(hook)
+    return hook
+
+
+def remove_metrics_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+class Metrics:
+    """
+    A metrics hook keeping per-span counters and latency histograms.
+
+    Register it with `add_metrics_hook(metrics.observe)`. Numeric span
+    arguments (bytes, tokens, ...) are summed as counters, and failed spans
+    are counted separately.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._spans = {}
+
+    def observe(self, name, duration, args):
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = {'count': 0, 'errors': 0, 'seconds': 0.0, 'buckets': [0] * (len(self.buckets) + 1), 'totals': {}}
+            stats['count'] += 1
+            stats['seconds'] += duration
+            stats['buckets'][bisect.bisect_left(self.buckets, duration)] += 1
+            if 'error' in args:
+                stats['errors'] += 1
+            for key, value in args.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stats['totals'][key] = stats['totals'].get(key, 0) + value
+
+    def snapshot(self):
+        """Return {span name: {count, errors, seconds, buckets, totals}} with cumulative bucket counts."""
+        with self._lock:
+            snapshot = {}
+            for name, stats in self._spans.items():
+                cumulative, running = {}, 0
+                for bound, count in zip(self.buckets + (float('inf'),), stats['buckets']):
+                    running += count
+                    cumulative['+Inf' if bound == float('inf') else str(bound)] = running
+                snapshot[name] = dict(stats, buckets=cumulative, totals=dict(stats['totals']))
+            return snapshot
+
+    def to_prometheus(self, prefix='tailor4job'):
+        """Render the snapshot in the Prometheus text exposition format."""
+        lines = [
+            f'# TYPE {prefix}_span_seconds histogram',
+            f'# TYPE {prefix}_span_errors_total counter',
+            f'# TYPE {prefix}_span_value_total counter',
+        ]
+        for name, stats in sorted(self.snapshot().items()):
+            for bound, count in stats['buckets'].items():
+                lines.append(f'{prefix}_span_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_span_seconds_sum{{span="{name}"}} {stats["seconds"]}')
+            lines.append(f'{prefix}_span_seconds_count{{span="{name}"}} {stats["count"]}')
+            lines.append(f'{prefix}_span_errors_total{{span="{name}"}} {stats["errors"]}')
+            for key, value in sorted(stats['totals'].items()):
+                lines.append(f'{prefix}_span_value_total{{span="{name}",key="{key}"}} {value}')
+        return '\n'.join(lines) + '\n'
@@ -1,139 +1,658 @@
 import os
-from groq import Groq
-import requests
+import re
+import sys
+import time
+import importlib
+import threading
+import shutil
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import json
-from docx import Document 
+from cache import make_key
+from prompt import estimate_tokens, prepare_prompt
+from scheduler import ProviderError, SingleFlight, get_scheduler, parse_retry_after
+from tracing import span, mark
 
-import pdfkit
+# Heavy dependencies are imported on first use, so `--help` and `--version`
+# start without loading the provider SDKs: name -> (module, attribute)
+_LAZY_IMPORTS = {
+    'Groq': ('groq', 'Groq'),
+    'requests': ('requests', None),
+    'Document': ('docx', 'Document'),
+    'pdfkit': ('pdfkit', None),
+    'render_pdf': ('pdf_render', 'render_pdf'),
+    'unsupported_characters': ('pdf_render', 'unsupported_characters'),
+    'substitute_symbols': ('pdf_render', 'substitute_symbols'),
+    'PdfReader': ('pypdf', 'PdfReader'),
+}
 
+def _lazy(name):
+    """Return a heavy dependency, importing it the first time it is needed."""
+    if name not in globals():
+        module_name, attribute = _LAZY_IMPORTS[name]
+        module = importlib.import_module(module_name)
+        globals()[name] = getattr(module, attribute) if attribute else module
+    return globals()[name]
 
-def process_files(files, api_key, model, mode, token_usage, provider_name):
+def __getattr__(name):
+    # Keeps `utils.Groq`, `utils.requests`, ... reachable (and patchable) before first use
+    if name in _LAZY_IMPORTS:
+        return _lazy(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_env_loaded = False
+
+def load_environment():
+    """Load variables from a .env file once, before the first API key lookup."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def get_api_key(provider_name):
+    """Fetch the correct API key based on the provider."""
+    load_environment()
+    if provider_name == 'groq':
+        return os.getenv('GROQ_API_KEY')
+    elif provider_name == 'openrouter':
+        return os.getenv('OPENROUTER_API_KEY')
+    else:
+        raise Exception(f"Unsupported provider: {provider_name}")
+
+# API roots of HTTP providers; OPENROUTER_BASE_URL overrides (the Groq SDK reads GROQ_BASE_URL itself)
+DEFAULT_BASE_URLS = {'openrouter': 'https://openrouter.ai/api/v1'}
+
+def provider_url(provider_name, path):
+    """Return the URL of `path` under the provider's API root."""
+    base_url = os.getenv(f'{provider_name.upper()}_BASE_URL') or DEFAULT_BASE_URLS[provider_name]
+    return base_url.rstrip('/') + path
+
+# Extracted text of recently read files, keyed by (path, size, mtime)
+_TEXT_CACHE_SIZE = 256
+_text_cache = OrderedDict()
+_text_cache_lock = threading.Lock()
+
+def read_documents(files, cache=None):
     """
-    Process input files using either the Groq API or OpenRouter API, depending on the provider.
+    Read and validate input files, returning one text per file.
+
+    Files are checked against the input size limits before any is parsed,
+    and many files are read concurrently. Each file is only parsed when its
+    path, size or modification time changed since it was last read; `cache`
+    optionally persists extracted text across runs.
     """
-    content = ''
-    
-    # Define supported file extensions
-    supported_extensions = ['.docx', '.txt']
-
-    # Read and validate content from input files
-    for file_path in files:
-        ext = os.path.splitext(file_path)[1].lower()
-        if ext not in supported_extensions:
-            raise Exception(f"Unsupported file format: {ext}. Supported formats are: {', '.join(supported_extensions)}")
-
-        if ext == '.docx':
-            # Read .docx file content
-            doc = Document(file_path)
-            for para in doc.paragraphs:
-                content += para.text + '\n'
+    with span('read_files', files=len(files)) as current:
+        _check_total_bytes(files)
+        if len(files) >= _CONCURRENT_READ_MIN_FILES:
+            with ThreadPoolExecutor(max_workers=min(_CONCURRENT_READS, len(files))) as executor:
+                documents = list(executor.map(lambda file_path: extract_text(file_path, cache=cache), files))
         else:
-            # Read text-based files
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                content += file.read() + '\n'
-
-    # Build the prompt based on the mode (detailed or basic)
-    if mode == 'detailed':
-        prompt = """
-        Attached are the Resume, Cover Letter, and Job Description for which the candidate is applying for the job.
-
-        What I want from you is to analyze the Resume and Cover Letter and compare them to the Job Description.
-
-        1. **Brief Introduction**:
-           - Introduce the job and the candidate (mention the name of the candidate from the Resume).
-
-        2. **Analysis Results**:
-           - Compare the Resume to the Job Description:
-             - Is the candidate a good fit or not?
-             - What are the candidate's strong points for this job?
-             - What are the candidate's weaknesses?
-             - How can the candidate improve the Resume?
-           - Compare the Cover Letter to the Job Description:
-             - Is the cover letter aligned with the job requirements?
-             - What improvements can be made?
-
-        3. **Summary**:
-           - Estimate the percentage chance that this Resume and Cover Letter can pass the ATS system for this job.
-           - List any important keywords that can be added to the Resume and Cover Letter.
-           - Suggest keywords that should be replaced with better alternatives.
-        """
+            documents = [extract_text(file_path, cache=cache) for file_path in files]
+        _check_total_tokens(files, documents)
+        current.set(chars=sum(len(document) for document in documents))
+    return documents
+
+def extract_text(file_path, cache=None, remember=True):
+    """
+    Return the normalized text of one input file, reusing earlier extractions.
+
+    With `remember=False` the file is always read and its text is not kept
+    in the in-memory or disk text caches, for one-off files such as
+    uploads copied to a temporary path that never recurs.
+    """
+    with span('extract', file=os.path.basename(file_path)) as current:
+        text = _extract_text(file_path, cache, current, remember)
+        current.set(chars=len(text))
+    return text
+
+def _extract_text(file_path, cache, current, remember=True):
+    ext = os.path.splitext(file_path)[1].lower()
+    extractor = _EXTRACTORS.get(ext)
+    if extractor is None:
+        raise Exception(f"Unsupported file format: {ext or '(no extension)'}. Supported formats are: {', '.join(supported_extensions())}")
+
+    signature = _file_signature(file_path)
+    if signature is not None:
+        current.set(bytes=signature[1])
+        _check_file_bytes(file_path, signature[1])
+        if not remember:
+            signature = None
+    if signature is not None:
+        with _text_cache_lock:
+            if signature in _text_cache:
+                _text_cache.move_to_end(signature)
+                current.set(source='memory')
+                return _text_cache[signature]
+        text = cache.get(make_key('text', _EXTRACTOR_VERSION, *signature)) if cache is not None else None
+        if text is not None:
+            _remember_text(signature, text)
+            current.set(source='disk_cache')
+            return text
+    current.set(source='file')
+
+    # Pull the text piece by piece so an oversized file is rejected before it is fully in memory
+    limit = _input_limits['max_file_tokens']
+    chunks, tokens = [], 0
+    for chunk in extractor(file_path):
+        chunks.append(chunk)
+        if limit is not None:
+            tokens += estimate_tokens(chunk)
+            if tokens > limit:
+                raise Exception(f"{file_path} has more than {limit} tokens, over the per-file limit (max_file_tokens).")
+    text = ''.join(chunks).replace('\r\n', '\n')
+
+    if signature is not None:
+        _remember_text(signature, text)
+        if cache is not None:
+            cache.set(make_key('text', _EXTRACTOR_VERSION, *signature), text)
+    return text
+
+# Text extractors by file extension: each yields the text of a file chunk by chunk
+_EXTRACTORS = {}
+
+# Bump when an extractor's output changes, so text cached on disk is extracted again
+_EXTRACTOR_VERSION = 2
+
+def register_extractor(*extensions):
+    """Register the decorated function as the text extractor for these file extensions."""
+    def decorator(extractor):
+        for ext in extensions:
+            _EXTRACTORS[ext.lower()] = extractor
+        return extractor
+    return decorator
+
+def supported_extensions():
+    """Return the file extensions that have a registered extractor."""
+    return sorted(_EXTRACTORS)
+
+@register_extractor('.txt')
+def extract_txt(file_path):
+    # Read line by line instead of loading the whole file at once
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
+        for line in file:
+            yield line
+    yield '\n'
+
+_MARKDOWN_SYNTAX = (
+    (re.compile(r'!?\[([^\]]*)\]\([^)]*\)'), r'\1'),
+    (re.compile(r'^\s{0,3}(?:#{1,6}\s+|>\s?)'), ''),
+    (re.compile(r'(\*\*|__|`)'), ''),
+)
+
+@register_extractor('.md', '.markdown')
+def extract_markdown(file_path):
+    # Keep the text of links, headings and emphasis without the markup
+    for line in extract_txt(file_path):
+        for pattern, replacement in _MARKDOWN_SYNTAX:
+            line = pattern.sub(replacement, line)
+        yield line
+
+@register_extractor('.docx')
+def extract_docx(file_path):
+    doc = _lazy('Document')(file_path)
+    header_lines = _docx_header_footer_lines(doc, 'header')
+    if header_lines:
+        yield '\n'.join(header_lines) + '\n'
+    for block in _docx_blocks(doc):
+        if hasattr(block, 'rows'):
+            yield ''.join(line + '\n' for line in _docx_table_lines(block))
+        else:
+            yield block.text + '\n'
+    footer_lines = _docx_header_footer_lines(doc, 'footer')
+    if footer_lines:
+        yield '\n'.join(footer_lines) + '\n'
+
+def _docx_blocks(doc):
+    # Paragraphs and tables in document order; python-docx before 1.0 only lists them apart
+    if getattr(type(doc), 'iter_inner_content', None) is None:
+        yield from doc.paragraphs
+        yield from doc.tables
     else:
-        prompt = """
-        Attached are the Resume, Cover Letter, and Job Description for which the candidate is applying for the job.
+        yield from doc.iter_inner_content()
 
-        Please provide:
-        1. A brief introduction to the job and candidate.
-        2. An estimated percentage chance of the resume and cover letter passing an ATS system.
-        """
-    
-    content = prompt + "\n" + content
+def _docx_table_lines(table):
+    """One line per table row, with merged cells (repeated by python-docx) listed once."""
+    for row in table.rows:
+        cells = []
+        for cell in row.cells:
+            text = cell.text.strip()
+            if text and text not in cells:
+                cells.append(text)
+        if cells:
+            yield ' | '.join(cells)
+
+def _docx_header_footer_lines(doc, part):
+    """Text of every section's header (or footer), skipping repeats of earlier sections."""
+    lines = []
+    for section in doc.sections:
+        container = getattr(section, part)
+        if container.is_linked_to_previous:
+            continue
+        for paragraph in container.paragraphs:
+            text = paragraph.text.strip()
+            if text and text not in lines:
+                lines.append(text)
+    return lines
+
+@register_extractor('.pdf')
+def extract_pdf(file_path):
+    try:
+        PdfReader = _lazy('PdfReader')
+    except ImportError:
+        raise Exception("Reading .pdf files needs the optional pypdf package: pip install pypdf")
+    for page in PdfReader(file_path).pages:
+        yield (page.extract_text() or '') + '\n'
+
+# Input size caps; None disables a cap. Set from the config file with `configure_input_limits`
+_input_limits = {'max_file_mb': 25, 'max_file_tokens': 200000, 'max_total_mb': None, 'max_total_tokens': None}
+
+# Inputs are read concurrently from this many files on
+_CONCURRENT_READ_MIN_FILES = 4
+_CONCURRENT_READS = 8
+
+def configure_input_limits(max_file_mb=None, max_file_tokens=None, max_total_mb=None, max_total_tokens=None):
+    """Set the per-file and total size caps (in megabytes and estimated tokens) of input files."""
+    for key, value in (('max_file_mb', max_file_mb), ('max_file_tokens', max_file_tokens),
+                       ('max_total_mb', max_total_mb), ('max_total_tokens', max_total_tokens)):
+        if value is not None:
+            _input_limits[key] = value
+
+def _check_file_bytes(file_path, size):
+    limit = _input_limits['max_file_mb']
+    if limit is not None and size > limit * 1024 * 1024:
+        raise Exception(f"{file_path} is {size / 1024 / 1024:.1f} MB, over the {limit} MB per-file limit (max_file_mb).")
 
-    # Process content using the appropriate provider
+def _check_total_bytes(files):
+    limit = _input_limits['max_total_mb']
+    if limit is None:
+        return
+    size = sum(signature[1] for signature in map(_file_signature, files) if signature is not None)
+    if size > limit * 1024 * 1024:
+        raise Exception(f"The input files are {size / 1024 / 1024:.1f} MB together, over the {limit} MB limit (max_total_mb).")
+
+def _check_total_tokens(files, documents):
+    limit = _input_limits['max_total_tokens']
+    if limit is None:
+        return
+    tokens = sum(estimate_tokens(document) for document in documents)
+    if tokens > limit:
+        raise Exception(f"The {len(files)} input files have about {tokens} tokens together, over the {limit} token limit (max_total_tokens).")
+
+def _file_signature(file_path):
+    """Return (absolute path, size, mtime) for a file, or None if it cannot be stat'ed."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+def _remember_text(signature, text):
+    with _text_cache_lock:
+        _text_cache[signature] = text
+        _text_cache.move_to_end(signature)
+        while len(_text_cache) > _TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+
+def process_files(files, api_key, model, mode, token_usage, provider_name, cache=None, on_chunk=None, timing=None, max_prompt_tokens=None):
+    """
+    Process input files using either the Groq API or OpenRouter API, depending on the provider.
+    """
+    documents = read_documents(files)
+    return process_content(documents, api_key, model, mode, token_usage, provider_name, cache=cache, on_chunk=on_chunk, timing=timing, max_prompt_tokens=max_prompt_tokens)
+
+def process_content(content, api_key, model, mode, token_usage, provider_name, cache=None, on_chunk=None, timing=None, max_prompt_tokens=None):
+    """
+    Analyze already-read file content with the given model and provider.
+
+    `content` is the text of one document or a list of document texts. The
+    prompt is compacted and trimmed to `max_prompt_tokens` (by default the
+    model's known context window) before it is sent.
+
+    When a `cache.DiskCache` is given, responses are looked up by a hash of the
+    final prompt, model, provider and mode before calling the provider.
+    When `on_chunk` is given, the response is streamed and each piece of text
+    is passed to it as it arrives; the full text is still returned.
+    Provider calls go through the provider's shared scheduler, which fills the
+    optional `timing` dict with queue wait and request time. Concurrent
+    identical requests share one provider call and all receive its result.
+    """
+    # Compact the documents and fit them to the model's context window
+    with span('prompt', documents=1 if isinstance(content, str) else len(content)) as current:
+        prompt, prompt_info = prepare_prompt(content, mode, model, max_prompt_tokens)
+        messages = prompt_info['messages']
+        current.set(chars=len(prompt), estimated_tokens=prompt_info['estimated_tokens'], trimmed=len(prompt_info['trimmed']))
+
+    # Serve byte-identical requests from the response cache
+    cache_key = None
+    if cache is not None:
+        with span('cache_lookup') as current:
+            cache_key = make_key(messages, model, provider_name, mode)
+            cached = cache.get(cache_key)
+            current.set(hit=cached is not None)
+        if cached is not None:
+            if on_chunk:
+                on_chunk(cached['content'])
+            return cached['content'], cached['usage'] if token_usage else None
+
+    def request():
+        # Wait for the provider's rate-limit budget and retry transient failures
+        scheduler = get_scheduler(provider_name)
+        estimated_tokens = prompt_info['estimated_tokens']
+        with span('provider', model=model, provider=provider_name, estimated_tokens=estimated_tokens) as current:
+            try:
+                tailored_content, usage = scheduler.run(
+                    lambda: call_provider(messages, api_key, model, provider_name, on_chunk=on_chunk, mode=mode),
+                    estimated_tokens=estimated_tokens,
+                    timing=timing,
+                )
+            finally:
+                current.set(**timing)
+            current.set(**(usage or {}))
+        scheduler.record_usage(estimated_tokens, (usage or {}).get('total_tokens'))
+
+        if cache is not None:
+            cache.set(cache_key, {'content': tailored_content, 'usage': usage})
+        return tailored_content, usage
+
+    # Identical requests already in flight share that provider call instead of paying for another
+    timing = {} if timing is None else timing
+    with span('coalesce', model=model, provider=provider_name) as current:
+        (tailored_content, usage), shared = _flights.do(cache_key or make_key(messages, model, provider_name, mode), request)
+        current.set(coalesced=int(shared))
+    if shared and on_chunk:
+        on_chunk(tailored_content)
+    return tailored_content, usage if token_usage else None
+
+# Provider calls in flight, shared by identical concurrent requests
+_flights = SingleFlight()
+
+def coalesce_stats():
+    """Return how many provider calls were made and how many requests shared one already in flight."""
+    return dict(_flights.stats)
+
+def provider_errors(function):
+    """
+    Decorator that turns SDK and HTTP failures into `ProviderError`s carrying
+    the status code and Retry-After hint the scheduler needs to retry them.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        except Exception as e:
+            error = _provider_error(e)
+            if error is None:
+                raise
+            raise error from e
+    return wrapper
+
+def _provider_error(error):
+    """Translate an SDK or HTTP exception into a ProviderError, or None if it is not one."""
+    # Only check libraries that are loaded: one never imported cannot have raised
+    groq = sys.modules.get('groq')
+    requests = sys.modules.get('requests')
+    if groq and isinstance(error, groq.APIStatusError):
+        return ProviderError(str(error), error.status_code, parse_retry_after(error.response.headers))
+    if (groq and isinstance(error, groq.APIConnectionError)) or \
+            (requests and isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))):
+        return ProviderError(f"Could not reach the provider: {error}")
+    return None
+
+@provider_errors
+def call_provider(content, api_key, model, provider_name, on_chunk=None, mode=None):
+    """
+    Send the prompt to the provider and return (response text, token usage dict).
+
+    `content` is the user prompt, or a list of chat messages. `mode` only
+    labels the request for tracing and the usage ledger.
+    """
+    messages = to_messages(content)
+    prompt_chars = sum(len(message['content']) for message in messages)
+    with span('request', model=model, provider=provider_name, mode=mode, stream=bool(on_chunk), prompt_chars=prompt_chars) as current:
+        if on_chunk:
+            tailored_content, usage = stream_provider(messages, api_key, model, provider_name, on_chunk, current)
+        else:
+            tailored_content, usage = _request(messages, api_key, model, provider_name, current)
+        current.set(response_chars=len(tailored_content or ''), **(usage or {}))
+    return tailored_content, usage
+
+def to_messages(content):
+    """Wrap a plain prompt in a single user message; lists of messages pass through."""
+    if isinstance(content, str):
+        return [{"role": "user", "content": content}]
+    return list(content)
+
+def _request(messages, api_key, model, provider_name, current):
     if provider_name == 'groq':
-        # Initialize Groq client
-        client = Groq(api_key=api_key)
+        # Reuse the long-lived Groq client for this API key
+        client = get_groq_client(api_key)
         response = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": content,
-                }
-            ],
+            messages=messages,
             model=model,
         )
-        tailored_content = response.choices[0].message.content
-        token_info = response.usage if token_usage else None
+        with span('parse'):
+            tailored_content = response.choices[0].message.content
+            usage = usage_to_dict(response.usage)
 
     elif provider_name == 'openrouter':
-        # Make OpenRouter API request
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-            },
+        # Make OpenRouter API request over the pooled keep-alive session
+        session = get_http_session('openrouter', api_key)
+        response = session.post(
+            url=provider_url('openrouter', '/chat/completions'),
             data=json.dumps({
                 "model": model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": content
-                    }
-                ]
-            })
+                "messages": messages,
+            }),
+            timeout=(_client_settings['connect_timeout'], _client_settings['read_timeout']),
         )
+        # `elapsed` runs from sending the request until the response headers arrived
+        current.set(status=response.status_code, ttfb_ms=round(response.elapsed.total_seconds() * 1000, 2), bytes=len(response.content))
         if response.status_code != 200:
-            raise Exception(f"OpenRouter API request failed with status code {response.status_code}: {response.text}")
-        result = response.json()
-        tailored_content = result['choices'][0]['message']['content']
-        token_info = result.get('usage', None) if token_usage else None
-    return tailored_content, token_info
+            raise ProviderError(f"OpenRouter API request failed with status code {response.status_code}: {response.text}", response.status_code, parse_retry_after(response.headers))
+        with span('parse', bytes=len(response.content)):
+            result = response.json()
+            tailored_content = result['choices'][0]['message']['content']
+            usage = usage_to_dict(result.get('usage', None))
+    else:
+        raise Exception(f"Unsupported provider: {provider_name}")
+    return tailored_content, usage
+
+def stream_provider(content, api_key, model, provider_name, on_chunk, current=None):
+    """
+    Stream the response, passing each text chunk to `on_chunk` as it arrives.
+
+    Returns the assembled text and the token usage reported at the end of the stream.
+    The time to the first chunk is recorded on the `current` tracing span.
+    """
+    messages = to_messages(content)
+    parts = []
+    usage = None
+    start = time.perf_counter()
+    emit = on_chunk
+    first_chunk = True
+
+    def on_chunk(text):
+        nonlocal first_chunk
+        if first_chunk:
+            first_chunk = False
+            if current is not None:
+                current.set(ttfb_ms=round((time.perf_counter() - start) * 1000, 2))
+            mark('first_chunk', provider=provider_name)
+        emit(text)
+
+    if provider_name == 'groq':
+        client = get_groq_client(api_key)
+        stream = client.chat.completions.create(messages=messages, model=model, stream=True)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                on_chunk(chunk.choices[0].delta.content)
+            # Groq reports usage on the final chunk
+            x_groq = getattr(chunk, 'x_groq', None)
+            if x_groq is not None and getattr(x_groq, 'usage', None) is not None:
+                usage = usage_to_dict(x_groq.usage)
 
-def generate_output(content, output_file):
+    elif provider_name == 'openrouter':
+        session = get_http_session('openrouter', api_key)
+        response = session.post(
+            url=provider_url('openrouter', '/chat/completions'),
+            data=json.dumps({
+                "model": model,
+                "messages": messages,
+                "stream": True,
+                "usage": {"include": True},
+            }),
+            timeout=(_client_settings['connect_timeout'], _client_settings['read_timeout']),
+            stream=True,
+        )
+        with response:
+            if response.status_code != 200:
+                raise ProviderError(f"OpenRouter API request failed with status code {response.status_code}: {response.text}", response.status_code, parse_retry_after(response.headers))
+            try:
+                for event in iter_sse_events(response):
+                    choices = event.get('choices') or []
+                    text = choices[0].get('delta', {}).get('content') if choices else None
+                    if text:
+                        parts.append(text)
+                        on_chunk(text)
+                    if event.get('usage'):
+                        usage = usage_to_dict(event['usage'])
+            except _lazy('requests').exceptions.RequestException as e:
+                # Text already shown cannot be retried without repeating it
+                raise Exception(f"OpenRouter stream interrupted: {e}") from e
+    else:
+        raise Exception(f"Unsupported provider: {provider_name}")
+    return ''.join(parts), usage
+
+def iter_sse_events(response):
+    """
+    Yield the JSON payloads of a server-sent events chat-completion stream.
+
+    Comment lines (used by OpenRouter as keep-alives) are skipped and the
+    stream ends at the `[DONE]` marker.
+    """
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith('data:'):
+            continue
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            break
+        event = json.loads(data)
+        if 'error' in event:
+            raise Exception(f"OpenRouter stream failed: {event['error']}")
+        yield event
+
+# Long-lived provider clients shared by every caller, keyed by (client type, api key)
+_clients = {}
+_clients_lock = threading.Lock()
+_client_settings = {'pool_size': 10, 'connect_timeout': 10.0, 'read_timeout': 120.0}
+
+def configure_clients(pool_size=None, connect_timeout=None, read_timeout=None):
+    """
+    Set the connection pool size and timeouts used by provider clients.
+
+    Existing clients are closed so the next request picks up the new settings.
+    """
+    for key, value in (('pool_size', pool_size), ('connect_timeout', connect_timeout), ('read_timeout', read_timeout)):
+        if value is not None:
+            _client_settings[key] = value
+    close_clients()
+
+def close_clients():
+    """Close and forget every pooled provider client."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        close = getattr(client, 'close', None)
+        if callable(close):
+            close()
+
+def get_groq_client(api_key):
+    """Return the shared Groq client for `api_key`, creating it on first use."""
+    Groq = _lazy('Groq')
+    key = (Groq, api_key)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            # The Groq SDK keeps its own keep-alive connection pool per client
+            # Retries are left to the request scheduler
+            client = _clients[key] = Groq(api_key=api_key, timeout=_client_settings['read_timeout'], max_retries=0)
+    return client
+
+def get_http_session(provider_name, api_key):
+    """Return the shared keep-alive requests.Session for a provider and API key."""
+    key = (provider_name, api_key)
+    with _clients_lock:
+        session = _clients.get(key)
+        if session is None:
+            requests = _lazy('requests')
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=_client_settings['pool_size'], pool_maxsize=_client_settings['pool_size'])
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({"Authorization": f"Bearer {api_key}"})
+            _clients[key] = session
+    return session
+
+def usage_to_dict(usage):
+    """
+    Convert provider token usage (a dict or an SDK object) into a plain dict.
+    """
+    if usage is None or isinstance(usage, dict):
+        return usage
+    return {key: getattr(usage, key, None) for key in ('prompt_tokens', 'completion_tokens', 'total_tokens')}
+
+def generate_output(content, output_file, pdf_backend=None):
     """
     Generate output file in either .docx or .pdf format.
     """
     if content is None:
         raise TypeError("Content must be a string, not NoneType.")
     
-    if output_file.endswith('.docx'):
-        generate_docx(content, output_file)
-    elif output_file.endswith('.pdf'):
-        generate_pdf(content, output_file)
-    else:
-        raise Exception('Unsupported file format. Please use .docx or .pdf.')
+    with span('render', file=os.path.basename(output_file), chars=len(content)) as current:
+        if output_file.endswith('.docx'):
+            generate_docx(content, output_file)
+        elif output_file.endswith('.pdf'):
+            generate_pdf(content, output_file, backend=pdf_backend)
+        else:
+            raise Exception('Unsupported file format. Please use .docx or .pdf.')
+        current.set(bytes=os.path.getsize(output_file))
 
 def generate_docx(content, output_file):
     """
     Generate a .docx file with the given content.
     """
-    doc = Document()
+    doc = _lazy('Document')()
     doc.add_paragraph(content)
     doc.save(output_file)
 
-def generate_pdf(content, output_file):
+def generate_pdf(content, output_file, backend=None):
     """
     Generate a .pdf file with the given content.
+
+    The default 'native' backend renders in-process; 'wkhtmltopdf' converts
+    HTML through pdfkit, which needs the wkhtmltopdf binary installed. The
+    native fonts only cover Western European text: common typographic symbols
+    such as arrows and check marks are shown as plain-text equivalents, and
+    other content goes through wkhtmltopdf when it is installed and is
+    rejected otherwise.
     """
-    # Create a temporary HTML file to convert to PDF
-    html_content = f'<html><body><p>{content}</p></body></html>'
-    pdfkit.from_string(html_content, output_file)
\ No newline at end of file
+    backend = backend or 'native'
+    missing = _lazy('unsupported_characters')(_lazy('substitute_symbols')(content)) if backend == 'native' else ''
+    if missing and shutil.which('wkhtmltopdf'):
+        backend = 'wkhtmltopdf'
+    if backend == 'native':
+        if missing:
+            raise Exception(f"The built-in PDF renderer only supports Western European (Windows-1252) text and cannot show: {', '.join(missing[:10])}. "
+                            "Save a .docx instead, or install wkhtmltopdf to render such text to PDF.")
+        _lazy('render_pdf')(content, output_file)
+    elif backend == 'wkhtmltopdf':
+        # Create a temporary HTML file to convert to PDF
+        html_content = f'<html><head><meta charset="utf-8"></head><body><p>{content}</p></body></html>'
+        _lazy('pdfkit').from_string(html_content, output_file)
+    else:
+        raise Exception(f"Unsupported PDF backend: {backend}. Please use 'native' or 'wkhtmltopdf'.")
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import make_key
+from utils import process_content
+
+# Sections of a detailed analysis, in report order: (name, title, prompt template)
+DETAILED_SECTIONS = (
+    ('resume', 'Resume vs Job Description', 'resume_section'),
+    ('cover_letter', 'Cover Letter vs Job Description', 'cover_letter_section'),
+    ('summary', 'Summary', 'summary_section'),
+)
+
+
+def plan_sections(documents, mode):
+    """
+    Split an analysis into sections, each with only the documents it depends on.
+
+    The first document is the resume and the last the job description; any
+    documents in between are cover letters. A basic analysis is one section
+    over every document. Returns a list of (name, title, template, documents).
+    """
+    documents = list(documents)
+    if mode != 'detailed' or len(documents) < 2:
+        return [('analysis', None, mode, documents)]
+    job_description = documents[-1]
+    plan = [('resume', DETAILED_SECTIONS[0][1], DETAILED_SECTIONS[0][2], [documents[0], job_description])]
+    if len(documents) > 2:
+        plan.append(('cover_letter', DETAILED_SECTIONS[1][1], DETAILED_SECTIONS[1][2], documents[1:]))
+    plan.append(('summary', DETAILED_SECTIONS[2][1], DETAILED_SECTIONS[2][2], documents))
+    return plan
+
+
+def assemble_report(sections):
+    """Join (title, text) pairs into one report; an untitled section is used as is."""
+    return '\n\n'.join(f"**{title}**\n\n{text}" if title else text for title, text in sections)
+
+
+def analyze_sections(documents, api_key, model, mode, provider_name, cache=None, memo=None, max_prompt_tokens=None):
+    """
+    Analyze the documents section by section, re-requesting only changed sections.
+
+    `memo` is a dict kept between calls; it holds the latest result of every
+    section keyed by a hash of the section's inputs, so a section whose
+    documents did not change is reused without a provider call. Sections
+    that need a request run concurrently, through the response `cache` when
+    one is given. Returns (report, info) where info maps `sections` to
+    'reused' or 'analyzed' and has the summed `usage` of the requests made.
+    """
+    memo = {} if memo is None else memo
+    plan = plan_sections(documents, mode)
+    results, info = {}, {'sections': {}, 'usage': None}
+
+    pending = []
+    for name, title, template, inputs in plan:
+        key = make_key('section', name, template, inputs, model, provider_name, max_prompt_tokens)
+        remembered = memo.get(name)
+        if remembered is not None and remembered[0] == key:
+            results[name] = remembered[1]
+            info['sections'][name] = 'reused'
+        else:
+            pending.append((name, template, inputs, key))
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            futures = [
+                (name, key, executor.submit(process_content, inputs, api_key, model, template, True, provider_name,
+                                            cache=cache, max_prompt_tokens=max_prompt_tokens))
+                for name, template, inputs, key in pending
+            ]
+            for name, key, future in futures:
+                text, usage = future.result()
+                memo[name] = (key, text)
+                results[name] = text
+                info['sections'][name] = 'analyzed'
+                if usage:
+                    total = info['usage'] or {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+                    for field in total:
+                        total[field] += usage.get(field) or 0
+                    info['usage'] = total
+
+    report = assemble_report([(title, results[name]) for name, title, _, _ in plan])
+    return report, info
+
+
+def file_signatures(files):
+    """Return the (mtime, size) of every file, or None for a file that is missing."""
+    signatures = []
+    for file_path in files:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            signatures.append(None)
+        else:
+            signatures.append((stat.st_mtime_ns, stat.st_size))
+    return signatures
+
+
+def watch_files(files, on_change, interval=0.5, debounce=1.0, stop=None):
+    """
+    Call `on_change(changed_files)` whenever files change, until `stop` is set.
+
+    The files are polled every `interval` seconds. Changes are collected
+    until the files have been quiet for `debounce` seconds, so an editor
+    saving in several writes triggers a single call.
+    """
+    stop = stop or threading.Event()
+    signatures = file_signatures(files)
+    changed, last_change = set(), None
+    while not stop.wait(interval):
+        current = file_signatures(files)
+        if current != signatures:
+            changed.update(file_path for file_path, old, new in zip(files, signatures, current) if old != new)
+            signatures, last_change = current, time.monotonic()
+        elif changed and time.monotonic() - last_change >= debounce:
+            on_change([file_path for file_path in files if file_path in changed])
+            changed = set()